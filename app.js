@@ -1,12 +1,18 @@
 const API_URL = "http://tip-solr.veldev.com/api"; // Base API URL
 // const API_URL = "http://localhost:8000"; For locally.
 const MAX_VISIBLE_GAUS = 5;
+const FIELD_PROFILE = "card"; // only the fields createResultCard renders
+const BULK_LOOKUP_THRESHOLD = 100; // more IDs than this go through /search/patent/bulk
 let currentResults = null; // Store search results for downloads
 let examiners = []; // Store examiner names
 let lawfirms = []; // Store law firm names
 let patentContext = null;
+let contextResults = null; // prefetched context result sets keyed by type
+let contextPrefetch = null; // the context batch request for the current patent, once started
 let lastQueryType = null;
 let prosecutors = []; // Store prosecutor names
+let nextCursor = null; // cursorMark for the next page of the executed query
+let loadingMore = false;
 // "patent" | "examiner" | "lawfirm" | "attorney"
 
 document.addEventListener("DOMContentLoaded", function () {
@@ -170,6 +176,7 @@ async function searchByProsecutor() {
         prosecutors,
         search_type: searchType,
         limit,
+        profile: FIELD_PROFILE,
       }),
     });
 
@@ -252,6 +259,57 @@ function removeLawFirm(index) {
   renderLawFirmTags();
 }
 
+// -------------------------------
+// Name Suggestions (typeahead)
+// -------------------------------
+// Fills a <datalist> under the input from /suggest/{type} as the user types;
+// picking a suggestion puts it in the input, Enter then adds it as a tag
+function attachSuggestions(inputId, type) {
+  const input = document.getElementById(inputId);
+  const list = document.createElement("datalist");
+  list.id = `${inputId}Suggestions`;
+  input.after(list);
+  input.setAttribute("list", list.id);
+  input.setAttribute("autocomplete", "off");
+
+  let timer = null;
+  let controller = null;
+  input.addEventListener("input", () => {
+    clearTimeout(timer);
+    const q = input.value.trim();
+    if (q.length < 2) {
+      list.innerHTML = "";
+      return;
+    }
+    timer = setTimeout(async () => {
+      // Drop the response of a request the user has already typed past
+      if (controller) controller.abort();
+      controller = new AbortController();
+      try {
+        const res = await fetch(
+          `${API_URL}/suggest/${type}?q=${encodeURIComponent(q)}&limit=10`,
+          { signal: controller.signal },
+        );
+        if (!res.ok) return;
+        const data = await res.json();
+        list.innerHTML = "";
+        data.suggestions.forEach((s) => {
+          const option = document.createElement("option");
+          option.value = s.value;
+          option.label = `${s.count} patents`;
+          list.appendChild(option);
+        });
+      } catch (e) {
+        // Aborted or suggestions unavailable: the input still works without them
+      }
+    }, 150);
+  });
+}
+
+attachSuggestions("examinerInput", "examiner");
+attachSuggestions("lawfirmInput", "lawfirm");
+attachSuggestions("prosecutorInput", "prosecutor");
+
 // -------------------------------
 // Search by Law Firm
 // -------------------------------
@@ -270,7 +328,12 @@ async function searchByLawFirm() {
     const res = await fetch(`${API_URL}/build/lawfirm-query`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ lawfirms, search_type: searchType, limit }),
+      body: JSON.stringify({
+        lawfirms,
+        search_type: searchType,
+        limit,
+        profile: FIELD_PROFILE,
+      }),
     });
 
     if (!res.ok) throw new Error("Failed to build law firm query");
@@ -329,12 +392,17 @@ async function searchByPatent() {
     return;
   }
 
+  if (patentIds.length > BULK_LOOKUP_THRESHOLD) {
+    await bulkLookupPatents();
+    return;
+  }
+
   try {
     lastQueryType = "patent";
     const res = await fetch(`${API_URL}/build/patent-query`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ patent_ids: patentIds }),
+      body: JSON.stringify({ patent_ids: patentIds, profile: FIELD_PROFILE }),
     });
 
     if (!res.ok) throw new Error("Failed to build patent query");
@@ -346,6 +414,41 @@ async function searchByPatent() {
     showError(error.message);
   }
 }
+
+// Portfolio-sized ID lists: fetched in chunks server-side, no single Solr URL
+async function bulkLookupPatents() {
+  showLoading(true);
+  try {
+    lastQueryType = "patent";
+    const res = await fetch(`${API_URL}/search/patent/bulk`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ patent_ids: patentIds, profile: FIELD_PROFILE }),
+    });
+
+    if (!res.ok) throw new Error("Failed to look up patent IDs");
+
+    const data = await res.json();
+    hideUrl();
+    currentResults = data;
+    nextCursor = null;
+    displayResults(data);
+    updateLoadMoreButton();
+    if (data.not_found.length) {
+      showError(
+        `${data.not_found.length} of ${data.total_requested} IDs not found: ` +
+          data.not_found.slice(0, 20).join(", ") +
+          (data.not_found.length > 20 ? ", ..." : ""),
+      );
+    }
+  } catch (error) {
+    console.error(error);
+    showError(error.message);
+  } finally {
+    showLoading(false);
+  }
+}
+
 // -------------------------------
 // Search by Examiner
 // -------------------------------
@@ -366,7 +469,13 @@ async function searchByExaminer() {
     const res = await fetch(`${API_URL}/build/examiner-query`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ examiners, search_type: searchType, limit }),
+      body: JSON.stringify({
+        examiners,
+        search_type: searchType,
+        limit,
+        profile: FIELD_PROFILE,
+        facets: true,
+      }),
     });
 
     if (!res.ok) throw new Error("Failed to build examiner query");
@@ -453,14 +562,16 @@ async function executeQuery() {
     const res = await fetch(`${API_URL}/execute-query`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ solr_query_url: url }),
+      body: JSON.stringify({ solr_query_url: url, cursor: "*" }),
     });
 
     if (!res.ok) throw new Error("Failed to execute Solr query");
     console.log("hi");
     const data = await res.json();
     currentResults = data;
+    nextCursor = data.next_cursor;
     displayResults(data);
+    updateLoadMoreButton();
   } catch (error) {
     console.error(error);
     alert(error.message);
@@ -470,6 +581,65 @@ async function executeQuery() {
   }
 }
 
+// -------------------------------
+// Load the next page (cursorMark pagination)
+// -------------------------------
+async function loadMoreResults() {
+  const url = document.getElementById("urlText").dataset.rawUrl;
+  if (!nextCursor || !url || loadingMore) return;
+
+  loadingMore = true;
+  showLoading(true);
+
+  try {
+    const res = await fetch(`${API_URL}/execute-query`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ solr_query_url: url, cursor: nextCursor }),
+    });
+
+    if (!res.ok) throw new Error("Failed to load more results");
+
+    const data = await res.json();
+    const offset = currentResults.results.length;
+    currentResults.results = currentResults.results.concat(data.results);
+    nextCursor = data.next_cursor;
+
+    document
+      .getElementById("resultsContainer")
+      .insertAdjacentHTML(
+        "beforeend",
+        data.results
+          .map((result, index) => createResultCard(result, offset + index + 1))
+          .join(""),
+      );
+    updateLoadMoreButton();
+  } catch (error) {
+    console.error(error);
+    showError(error.message);
+  } finally {
+    loadingMore = false;
+    showLoading(false);
+  }
+}
+
+function updateLoadMoreButton() {
+  const hasMore =
+    nextCursor &&
+    currentResults?.results?.length < currentResults?.total_found;
+  document.getElementById("loadMoreBtn").style.display = hasMore
+    ? "inline-block"
+    : "none";
+}
+
+// Fetch the next page when the results panel is scrolled to the bottom
+document.querySelector(".results-body").addEventListener("scroll", (e) => {
+  const el = e.target;
+  if (el.scrollTop + el.clientHeight >= el.scrollHeight - 50) {
+    loadMoreResults();
+  }
+});
+
 function executeQueryManually() {
   const url = document.getElementById("urlText").textContent;
   if (!url) {
@@ -531,9 +701,13 @@ function displayResults(data) {
         gaus: Array.isArray(r.gau) ? r.gau : [],
       };
 
+      contextResults = null;
+      contextPrefetch = null;
       showPatentContextActions();
     } else {
       patentContext = null;
+      contextResults = null;
+      contextPrefetch = null;
       hidePatentContextActions();
     }
   }
@@ -551,7 +725,8 @@ function displayResults(data) {
   }
 
   if (lastQueryType === "examiner") {
-    const gauCounts = extractGAUCounts(data.results);
+    // Exact counts over the whole match set when the server returned facets
+    const gauCounts = data.facets?.gau || extractGAUCounts(data.results);
 
     const gauSection = `
     <div class="gau-group">
@@ -665,6 +840,123 @@ async function downloadExcel() {
   }
 }
 
+// Export every match of the executed query as a background job, then download it
+async function exportAllMatches(format = "xlsx") {
+  const url = document.getElementById("urlText").dataset.rawUrl;
+  if (!url) return showError("Build and execute a query first");
+
+  const loadingText = document.querySelector("#loading p");
+  showLoading(true);
+  try {
+    const res = await fetch(`${API_URL}/export/jobs`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ solr_query_url: url, format }),
+    });
+    let job = await res.json();
+    if (!res.ok) throw new Error(job.detail || "Failed to start export");
+
+    while (job.status === "queued" || job.status === "running") {
+      const percent = job.progress == null ? "" : ` ${Math.round(job.progress * 100)}%`;
+      loadingText.textContent = `Exporting...${percent}`;
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+      job = await (await fetch(`${API_URL}/export/jobs/${job.job_id}`)).json();
+    }
+    if (job.status !== "done") throw new Error(job.error || "Export failed");
+
+    // A plain link lets the browser resume the download with Range requests
+    const a = document.createElement("a");
+    a.href = `${API_URL}/export/jobs/${job.job_id}/download`;
+    a.click();
+  } catch (error) {
+    console.error(error);
+    showError(error.message);
+  } finally {
+    loadingText.textContent = "Loading...";
+    showLoading(false);
+  }
+}
+
+// Fetch every context result set for the current patent in one batch request
+function contextQueries() {
+  const queries = [];
+  const options = { search_type: "latest_filed", limit: 10 };
+
+  if (patentContext.examiner) {
+    queries.push({
+      key: "examiner",
+      type: "examiner",
+      values: [patentContext.examiner],
+      facets: true,
+      ...options,
+    });
+  }
+  if (patentContext.lawfirm) {
+    queries.push({
+      key: "lawfirm",
+      type: "lawfirm",
+      values: [patentContext.lawfirm.toLowerCase()],
+      ...options,
+    });
+  }
+  if (patentContext.attorneys.length) {
+    queries.push({
+      key: "attorney",
+      type: "attorney",
+      values: [patentContext.attorneys[0]],
+      ...options,
+    });
+  }
+  if (patentContext.gaus.length) {
+    queries.push({
+      key: "gau",
+      type: "gau",
+      values: patentContext.gaus,
+      limit: 20,
+    });
+  }
+  return queries;
+}
+
+// Start the context batch the first time the user reaches for the context buttons,
+// rather than for every single-patent result
+function prefetchPatentContext() {
+  if (patentContext && !contextPrefetch) {
+    contextPrefetch = loadPatentContext(patentContext);
+  }
+  return contextPrefetch;
+}
+
+["mouseenter", "focusin"].forEach((event) =>
+  document
+    .getElementById("contextActions")
+    .addEventListener(event, prefetchPatentContext)
+);
+
+async function loadPatentContext(context) {
+  const queries = contextQueries();
+  if (!queries.length) return;
+
+  try {
+    const res = await fetch(`${API_URL}/search/batch`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ queries, profile: FIELD_PROFILE }),
+    });
+
+    if (!res.ok) throw new Error("Failed to load patent context");
+
+    const data = await res.json();
+    // Ignore a batch that finished after another patent was shown
+    if (context === patentContext) {
+      contextResults = Object.fromEntries(data.results.map((r) => [r.key, r]));
+    }
+  } catch (error) {
+    // Fall back to building each context query on demand
+    console.error(error);
+  }
+}
+
 async function exploreContext(type) {
   lastQueryType = type;
   if (!patentContext) {
@@ -672,6 +964,17 @@ async function exploreContext(type) {
     return;
   }
 
+  await prefetchPatentContext();
+  const prefetched = contextResults?.[type];
+  if (prefetched && !prefetched.error) {
+    displayUrl(prefetched.solr_query_url);
+    currentResults = prefetched;
+    nextCursor = null;
+    displayResults(prefetched);
+    updateLoadMoreButton();
+    return;
+  }
+
   if (type === "examiner" && patentContext.examiner) {
     await fetch(`${API_URL}/build/examiner-query`, {
       method: "POST",
@@ -680,6 +983,8 @@ async function exploreContext(type) {
         examiners: [patentContext.examiner],
         search_type: "latest_filed",
         limit: 10,
+        profile: FIELD_PROFILE,
+        facets: true,
       }),
     })
       .then((res) => res.json())
@@ -699,6 +1004,7 @@ async function exploreContext(type) {
         lawfirms: [lawfirm.toLowerCase()],
         search_type: "latest_filed",
         limit: 10,
+        profile: FIELD_PROFILE,
       }),
     })
       .then((res) => res.json())
@@ -713,6 +1019,7 @@ async function exploreContext(type) {
         attorneys: [patentContext.attorneys[0]],
         search_type: "latest_filed",
         limit: 10,
+        profile: FIELD_PROFILE,
       }),
     })
       .then((res) => res.json())
@@ -726,6 +1033,7 @@ async function exploreContext(type) {
       body: JSON.stringify({
         gaus: patentContext.gaus, // first GAU
         limit: 20,
+        profile: FIELD_PROFILE,
       }),
     })
       .then((res) => res.json())
@@ -784,6 +1092,7 @@ async function searchByGAU(gau) {
   const payload = {
     gaus: [gau],
     limit: 20,
+    profile: FIELD_PROFILE,
   };
 
   const res = await fetch(`${API_URL}/build/gau-query`, {
@@ -938,6 +1247,8 @@ function renderExaminerStats(data) {
     .join("");
 
   document.getElementById("downloadButtons").style.display = "none";
+  nextCursor = null;
+  updateLoadMoreButton();
 }
 
 async function searchStatsByDateRange() {
@@ -1070,4 +1381,6 @@ function renderStatsResults(data, type) {
   });
 
   document.getElementById("downloadButtons").style.display = "none";
+  nextCursor = null;
+  updateLoadMoreButton();
 }
@@ -2,26 +2,101 @@
 Simple Patent Search Application - POC
 Minimal backend for basic patent searches
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
-from pydantic import BaseModel
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from typing import Optional, List, Literal
 import httpx
+import hmac
 import json
 import io
 import pandas as pd
-from logger.logger import setup_logger
+from logger.logger import RequestIdMiddleware, setup_logger
 import traceback
 import os
+import tempfile
 from dotenv import load_dotenv
 from pathlib import Path
+from contextlib import asynccontextmanager
+from solr_client.solr_client import (
+    ORJSON_AVAILABLE,
+    SolrClient,
+    apply_cursor,
+    decode_json,
+    next_cursor_mark,
+    params_from_url,
+)
+from solr_client.streaming import SolrDocStream, iter_docs
+from solr_client.resilience import SolrDeadlineError, SolrOverloadedError, SolrUnavailableError
+from query_proxy.proxy import QueryPolicy, UnsafeQueryError
+from cache.cache import make_cache
+from exports.excel import XLSX_MEDIA_TYPE, export_query_to_xlsx
+from exports.json_stream import (
+    JSON_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPE,
+    gzip_chunks,
+    iter_query_json,
+    iter_results_json,
+)
+from exports.arrow import (
+    ARROW_AVAILABLE,
+    ARROW_STREAM_MEDIA_TYPE,
+    PARQUET_MEDIA_TYPE,
+    export_query_to_parquet,
+    iter_query_arrow,
+)
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from rollup.rollup import RollupStore, fill_rollups, rollup_group_buckets
+from metrics.metrics import Metrics, MetricsMiddleware, current_solr_seconds
+from lookup.lookup import lookup_ids
+from query_planner.planner import plan_gau_search, plan_patent_lookup, plan_search
+from trends.trends import iter_trend_json, plan_trend, shape_trend
+from suggest.suggest import SuggestService
+from entities.entities import expand_names
+from export_jobs.jobs import (
+    JOB_FORMATS,
+    ExportJobManager,
+    ExportLimitError,
+    iter_file_range,
+    parse_byte_range,
+)
+from fastapi.responses import PlainTextResponse
+import asyncio
 
 BASE_DIR = Path(__file__).resolve().parent
 load_dotenv(BASE_DIR / ".env")
-logger = setup_logger(logging_enabled=True)
+logger = setup_logger(logging_enabled=True, context_fields={"solr_seconds": current_solr_seconds})
 
-app = FastAPI(title="Patent Search POC")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create the shared Solr client on startup and close its pool on shutdown
+    """
+    await solr.start()
+    await export_jobs.start()
+    rollup_task = asyncio.create_task(rollup_refresh_loop()) if rollup_store else None
+    suggest_task = asyncio.create_task(suggest.refresh_loop()) if suggest else None
+    yield
+    if rollup_task:
+        rollup_task.cancel()
+    if suggest_task:
+        suggest_task.cancel()
+    await export_jobs.close()
+    await solr.close()
+
+
+app = FastAPI(
+    title="Patent Search POC",
+    lifespan=lifespan,
+    # orjson serializes large result lists several times faster than json.dumps
+    default_response_class=ORJSONResponse if ORJSON_AVAILABLE else JSONResponse,
+)
+metrics = Metrics()
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+app.add_middleware(RequestIdMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,6 +104,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Cache", "X-Request-ID", "Content-Range", "Accept-Ranges"],
 )
 
 STAT_TYPE_MAP = {
@@ -41,6 +117,50 @@ STAT_TYPE_MAP = {
     "entity": "small_entity_indicator",
     "action": "th_all_action",
 }
+# Fields rendered by createResultCard in app.js
+CARD_FIELDS = [
+    "id",
+    "title",
+    "app_date",
+    "disposal_type",
+    "application_status",
+    "first_named_inventor",
+    "law_firm",
+    "all_attorney_names",
+    "examiner",
+    "small_entity_indicator",
+    "lawfirm",
+    "law_firm_address",
+    "gau",
+    "app_date_year",
+]
+
+# Columns written by query-driven exports
+EXPORT_FIELDS = [
+    "id",
+    "title",
+    "app_date",
+    "app_date_year",
+    "disposal_type",
+    "application_status",
+    "examiner",
+    "law_firm",
+    "all_attorney_names",
+    "gau",
+    "cpc_classification",
+    "usc",
+    "assignee_last",
+    "small_entity_indicator",
+    "first_named_inventor",
+    "law_firm_address",
+]
+
+# Named fl profiles; "full" returns every stored field
+FIELD_PROFILES = {
+    "card": CARD_FIELDS,
+    "export": EXPORT_FIELDS,
+    "full": None,
+}
 # To run the project locally 
 #uvicorn app_advanced:app --host 0.0.0.0 --port 8000 --reload
 
@@ -49,13 +169,194 @@ load_dotenv()
 # Solr Configuration
 SOLR_BASE_URL = os.getenv("SOLR_BASE_URL") 
 SOLR_CORE = ""
+solr = SolrClient.from_env(SOLR_BASE_URL)
+solr.observer = metrics.observe_solr
+metrics.gauge(
+    "solr_breaker_open",
+    "1 while the Solr circuit breaker fails requests fast (0.5 half-open)",
+    (),
+    lambda: [((), {"closed": 0, "half_open": 0.5, "open": 1}[solr.breaker.state])],
+)
+metrics.gauge(
+    "solr_admission",
+    "Admission-limited Solr query classes: limit, active, waiting, rejected",
+    ("query_class", "field"),
+    lambda: [
+        ((name, field), value)
+        for name, limiter in solr.admission.items()
+        for field, value in limiter.stats().items()
+    ],
+)
+metrics.gauge(
+    "solr_pool_connections",
+    "Solr connection pool utilization",
+    ("state",),
+    lambda: [((state,), value) for state, value in solr.pool_stats().items()],
+)
+
+# Facet statistics cache; flush via /admin/cache/flush after a Solr re-index.
+# STATS_CACHE_BACKEND=sqlite shares it between worker processes (see serve.py)
+stats_cache = make_cache(
+    os.getenv("STATS_CACHE_BACKEND", "memory"),
+    path=os.getenv("STATS_CACHE_PATH", str(BASE_DIR / "stats_cache.sqlite3")),
+    max_entries=int(os.getenv("STATS_CACHE_MAX_ENTRIES", "256")),
+    max_bytes=int(os.getenv("STATS_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl=float(os.getenv("STATS_CACHE_TTL", "600")),
+)
+# /execute-query: client URLs are rebuilt under these limits and their responses cached
+query_policy = QueryPolicy(
+    SOLR_BASE_URL,
+    max_rows=int(os.getenv("EXECUTE_MAX_ROWS", "1000")),
+    max_start=int(os.getenv("EXECUTE_MAX_START", "10000")),
+    default_fl=os.getenv("EXECUTE_DEFAULT_FL", ",".join(CARD_FIELDS)),
+    time_allowed_ms=int(os.getenv("EXECUTE_TIME_ALLOWED_MS", "15000")),
+)
+query_cache = make_cache(
+    os.getenv("QUERY_CACHE_BACKEND", os.getenv("STATS_CACHE_BACKEND", "memory")),
+    path=os.getenv("QUERY_CACHE_PATH", str(BASE_DIR / "query_cache.sqlite3")),
+    max_entries=int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "512")),
+    max_bytes=int(os.getenv("QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl=float(os.getenv("QUERY_CACHE_TTL", "60")),
+)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# Max Solr requests a single /search/batch call runs at once
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+# Bulk patent ID lookup: IDs per Solr request, concurrent requests, IDs per call
+BULK_LOOKUP_CHUNK_SIZE = int(os.getenv("BULK_LOOKUP_CHUNK_SIZE", "1000"))
+BULK_LOOKUP_CONCURRENCY = int(os.getenv("BULK_LOOKUP_CONCURRENCY", "8"))
+BULK_LOOKUP_MAX_IDS = int(os.getenv("BULK_LOOKUP_MAX_IDS", "100000"))
+# Largest Solr page an export may ask for; one page is what an export holds in memory
+EXPORT_MAX_PAGE_SIZE = int(os.getenv("EXPORT_MAX_PAGE_SIZE", "5000"))
+metrics.gauge(
+    "stats_cache",
+    "Stats response cache entries, bytes, hits and misses",
+    ("field",),
+    lambda: [((field,), value) for field, value in stats_cache.stats().items()],
+)
+metrics.gauge(
+    "query_cache",
+    "/execute-query response cache entries, bytes, hits and misses",
+    ("field",),
+    lambda: [((field,), value) for field, value in query_cache.stats().items()],
+)
+
+# Monthly rollups for /stats/by-date-range; filled in the background when enabled
+ROLLUP_ENABLED = os.getenv("ROLLUP_ENABLED", "false").lower() == "true"
+ROLLUP_DB_PATH = os.getenv("ROLLUP_DB_PATH", str(BASE_DIR / "rollup.sqlite3"))
+ROLLUP_START_MONTH = os.getenv("ROLLUP_START_MONTH", "2010-01")
+ROLLUP_REFRESH_INTERVAL = float(os.getenv("ROLLUP_REFRESH_INTERVAL", "3600"))
+ROLLUP_DIMENSIONS = {
+    t: STAT_TYPE_MAP[t]
+    for t in os.getenv("ROLLUP_DIMENSIONS", ",".join(STAT_TYPE_MAP)).split(",")
+    if t in STAT_TYPE_MAP
+}
+rollup_store = RollupStore(ROLLUP_DB_PATH) if ROLLUP_ENABLED else None
+
+# Background export jobs: files under EXPORT_JOB_DIR, removed EXPORT_JOB_TTL seconds after finishing
+export_jobs = ExportJobManager(
+    solr,
+    os.getenv("EXPORT_JOB_DIR", os.path.join(tempfile.gettempdir(), "patent_export_jobs")),
+    workers=int(os.getenv("EXPORT_JOB_WORKERS", "2")),
+    ttl=float(os.getenv("EXPORT_JOB_TTL", "3600")),
+    per_user_limit=int(os.getenv("EXPORT_JOB_PER_USER", "2")),
+)
+export_jobs.on_error = lambda job, tb: logger.error(tb)
+# Key the per-user job limit on X-User-Id only when a trusted gateway sets that header;
+# otherwise any client could pick a fresh id per request. Default: the client address.
+EXPORT_TRUST_USER_HEADER = os.getenv("EXPORT_TRUST_USER_HEADER", "false").lower() == "true"
+
+# Typeahead index of examiner / law firm / attorney / assignee / GAU names, held in
+# memory per worker and rebuilt from Solr terms facets every SUGGEST_REFRESH_INTERVAL seconds.
+# One worker dumps the facets into SUGGEST_DUMP_DIR; the others build from those files
+SUGGEST_ENABLED = os.getenv("SUGGEST_ENABLED", "true").lower() == "true"
+suggest = SuggestService(
+    solr,
+    refresh_interval=float(os.getenv("SUGGEST_REFRESH_INTERVAL", "21600")),
+    page_size=int(os.getenv("SUGGEST_PAGE_SIZE", "50000")),
+    dump_dir=os.getenv("SUGGEST_DUMP_DIR", os.path.join(tempfile.gettempdir(), "patent_suggest")),
+    poll_interval=float(os.getenv("SUGGEST_POLL_INTERVAL", "60")),
+) if SUGGEST_ENABLED else None
+# Name searches also match the stored spellings each entered name resolves to;
+# the entity indexes are built alongside the suggest indexes
+ENTITY_MIN_SCORE = float(os.getenv("ENTITY_MIN_SCORE", "0.85"))
+ENTITY_MAX_VARIANTS = int(os.getenv("ENTITY_MAX_VARIANTS", "20"))
+if suggest:
+    suggest.on_error = lambda kind, tb: logger.error(tb)
+    metrics.gauge(
+        "suggest_index_values",
+        "Distinct names in each typeahead index",
+        ("type",),
+        lambda: [((kind,), info["values"]) for kind, info in suggest.stats().items()],
+    )
+
+
+async def rollup_refresh_loop():
+    """
+    Keep the rollup store filled: missing months first, then the recent ones.
+    With several workers only the one holding the refresh lock fills the store;
+    the others retry the lock each interval and take over if that worker exits.
+    """
+    while True:
+        if rollup_store.try_lock_refresh():
+            try:
+                await fill_rollups(solr, rollup_store, ROLLUP_DIMENSIONS, ROLLUP_START_MONTH)
+            except Exception:
+                logger.error(traceback.format_exc())
+        await asyncio.sleep(ROLLUP_REFRESH_INTERVAL)
 
 print(SOLR_BASE_URL)
-class PatentSearchRequest(BaseModel):
+
+
+def error_response(e: Exception) -> HTTPException:
+    """
+    HTTP error for a failed handler: 503 + Retry-After while Solr is shedding load or
+    the circuit breaker is open, 504 when a deadline ran out, 500 otherwise.
+    An HTTPException raised inside the handler is passed through unchanged.
+    """
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, (SolrUnavailableError, SolrOverloadedError)):
+        return HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after))}
+        )
+    if isinstance(e, httpx.ConnectError):
+        return HTTPException(status_code=503, detail=f"Solr is unreachable: {e}")
+    if isinstance(e, (SolrDeadlineError, httpx.TimeoutException)):
+        return HTTPException(status_code=504, detail=str(e) or "Solr did not answer in time")
+    return HTTPException(status_code=500, detail=str(e))
+
+# Search types understood by the query planner
+SearchType = Literal["latest_filed", "latest_approved", "count", "last_10_years", "latest_10_approved"]
+# Name types served by /suggest (suggest.SUGGEST_FIELDS)
+SuggestType = Literal["examiner", "lawfirm", "prosecutor", "assignee", "gau"]
+
+class ProjectionOptions(BaseModel):
+    """
+    This class is used to define the field projection shared by build/search requests.
+    """
+    profile: Literal["card", "export", "full"] = "full"
+    include_raw: bool = True  # search endpoints only: echo the raw Solr response
+
+class NameResolutionOptions(BaseModel):
+    """
+    Entity name resolution shared by examiner / law firm / attorney requests.
+    """
+    resolve_names: bool = True  # also match the stored spellings of each name
+    min_score: Optional[float] = Field(default=None, ge=0.0, le=1.0)  # default ENTITY_MIN_SCORE
+
+class PatentSearchRequest(ProjectionOptions):
     """
     This class is used to define the BaseModel for the Patents.
     """
     patent_ids: List[str]
+
+class BulkPatentLookupRequest(ProjectionOptions):
+    """
+    This class is used to define the BaseModel for bulk patent ID lookups.
+    """
+    patent_ids: List[str]
+    method: Literal["terms", "get"] = "terms"
+    chunk_size: Optional[int] = None  # defaults to BULK_LOOKUP_CHUNK_SIZE
     
 class StatsByDateRangeRequest(BaseModel):
     type: Literal[
@@ -70,54 +371,132 @@ class StatsByDateRangeRequest(BaseModel):
     ]             # examiner | prosecutor | lawfirm
     from_date: str
     to_date: str
-    limit: int = 10
+    limit: int = Field(default=10, ge=-1)  # -1 for every value, as in Solr
     sort_order: str = "desc"
     
+class TrendRequest(BaseModel):
+    """
+    Per-period counts for chosen values of a stats type, or for its top `limit` values.
+    """
+    type: Literal[
+        "examiner",
+        "prosecutor",
+        "lawfirm",
+        "gau",
+        "assignee",
+        "usc",
+        "entity",
+        "action",
+    ]
+    from_date: str  # YYYY-MM-DD
+    to_date: str    # YYYY-MM-DD
+    interval: Literal["day", "week", "month", "year"] = "month"
+    values: Optional[List[str]] = None  # omit for the top `limit` values in the window
+    limit: int = Field(default=10, ge=1)
+    status: Optional[Literal["issued"]] = None  # only count issued applications
+
 class ExaminerStatsByDateRequest(BaseModel):
     from_date: str  # YYYY-MM-DD
     to_date: str    # YYYY-MM-DD
     limit: int = 10
-
-class LawFirmSearchRequest(BaseModel):
+    gau_limit: int = -1         # max GAU buckets per examiner, -1 for all
+    cpc_limit: int = -1         # max CPC buckets per examiner, -1 for all
+    mincount: int = 1
+    other_bucket: bool = False  # add an "other" bucket for counts past the cap
+    unique_only: bool = False   # only unique GAU/CPC counts, no buckets
+    unique_method: Literal["unique", "hll"] = "unique"  # hll is approximate but cheaper
+
+class LawFirmSearchRequest(ProjectionOptions, NameResolutionOptions):
     """
     This class is used to define the BaseModel for the Lawfirms.
     """
     lawfirms: List[str]
-    search_type: str
+    search_type: SearchType
     limit: int = 10
+    facets: bool = False  # add GAU / CPC counts over the whole match set
+    facet_limit: int = 50
     
-class ProsecutorSearchRequest(BaseModel):
+class ProsecutorSearchRequest(ProjectionOptions, NameResolutionOptions):
     """
     This class is used to define the BaseModel For the Prosecutor Request.
     """
     prosecutors: List[str]
-    search_type: str = "latest_filed"
+    search_type: SearchType = "latest_filed"
     limit: int = 10
+    cursor: Optional[str] = None  # "*" for the first page, then next_cursor
+    facets: bool = False  # add GAU / CPC counts over the whole match set
+    facet_limit: int = 50
 
-class ExaminerSearchRequest(BaseModel):
+class ExaminerSearchRequest(ProjectionOptions, NameResolutionOptions):
     """
     This class is used to define the BaseModel for the Examiners.
     """
     examiners: List[str]
-    search_type: str  # "latest_filed", "latest_approved", "count", "last_10_years", "latest_10_approved"
+    search_type: SearchType
     limit: int = 10
+    cursor: Optional[str] = None  # "*" for the first page, then next_cursor
+    facets: bool = False  # add GAU / CPC counts over the whole match set
+    facet_limit: int = 50
 
-class GAUSearchRequest(BaseModel):
+class GAUSearchRequest(ProjectionOptions):
     gaus: List[str]
     limit: int = 10
     sort: Optional[str] = "app_date desc"
+    cursor: Optional[str] = None  # "*" for the first page, then next_cursor
 
 class ExecuteQueryRequest(BaseModel):
     """
     This class is used to define the BaseModel for executing the queries.
     """
     solr_query_url: str
+    cursor: Optional[str] = None  # "*" for the first page, then next_cursor
 
-class AttorneySearchRequest(BaseModel):
+class ExportQueryRequest(BaseModel):
+    """
+    This class is used to define the BaseModel for query-driven exports.
+    Either a built solr_query_url or raw Solr params (e.g. {"q": ..., "fq": [...]}).
+    """
+    solr_query_url: Optional[str] = None
+    params: Optional[dict] = None
+    fl: Optional[str] = None
+    max_rows: Optional[int] = Field(default=None, ge=1)
+    page_size: int = Field(default=1000, ge=1, le=EXPORT_MAX_PAGE_SIZE)
+
+class JsonExportRequest(ExportQueryRequest):
+    format: Literal["ndjson", "json"] = "ndjson"
+    gzip: bool = False
+
+class ExportJobRequest(ExportQueryRequest):
+    format: Literal["xlsx", "csv", "ndjson", "parquet"] = "xlsx"
+
+class AttorneySearchRequest(ProjectionOptions, NameResolutionOptions):
     attorneys: List[str]
-    search_type: Optional[str] = "latest_filed"
+    search_type: Optional[SearchType] = "latest_filed"
     limit: int = 10
   
+class BatchSubQuery(BaseModel):
+    """
+    One typed sub-query of a batch search.
+    """
+    type: Literal["patent", "examiner", "lawfirm", "prosecutor", "attorney", "gau"]
+    values: List[str]
+    search_type: SearchType = "latest_filed"
+    limit: int = 10
+    key: Optional[str] = None  # label echoed back in the result; defaults to type
+    facets: bool = False  # examiner / lawfirm / prosecutor only: GAU / CPC counts
+
+class ResolveNamesRequest(BaseModel):
+    """
+    Names to resolve to their stored Solr values.
+    """
+    type: Literal["examiner", "lawfirm", "prosecutor"]
+    names: List[str]
+    min_score: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+    limit: int = 20
+
+class BatchSearchRequest(ProjectionOptions):
+    queries: List[BatchSubQuery]
+
 class AdvancedFilter(BaseModel):
     field: str
     operator: Literal["equals", "contains", "starts_with", "range"]
@@ -128,7 +507,7 @@ class SortOption(BaseModel):
     field: str
     order: Literal["asc", "desc"]
       
-class AdvancedSearchRequest(BaseModel):
+class AdvancedSearchRequest(ProjectionOptions):
     filters: List[AdvancedFilter]
     limit: int = 10
     sort: Optional[SortOption] = None
@@ -145,106 +524,111 @@ async def search_by_patent(request: PatentSearchRequest):
     Returns: Patent details + Solr URL
     """
     try:
-        
-        patent_ids = [pid.strip() for pid in request.patent_ids if pid.strip()]
-
-
-        if not patent_ids:
-            raise HTTPException(status_code=400, detail="No valid patent IDs provided")
+        params = plan_patent_lookup(request.patent_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    try:
+        apply_profile(params, request.profile)
 
-        # Build Solr query
-        if len(patent_ids) == 1:
-            q = f"id:{patent_ids[0]}"
-        else:
-            joined_ids = " OR ".join(patent_ids)
-            q = f"id:({joined_ids})"
-            
-        # Build Solr query
-        params = {
-            "q": q,
-            "wt": "json",
-            "indent": "true"
-        }
-        
-        solr_url = f"{SOLR_BASE_URL}/select"
-        
         # Execute query
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(solr_url, params=params)
-            response.raise_for_status()
-            data = response.json()
+        response = await solr.get("/select", params=params, query_class="lookup")
+        with metrics.stage("json_decode"):
+            data = decode_json(response)
         
-        return {
+        result = {
             "solr_query_url": str(response.url),
             "total_found": data["response"]["numFound"],
             "results": data["response"]["docs"],
-            "raw_response": data
         }
+        if request.include_raw:
+            result["raw_response"] = data
+        return result
         
     except Exception as e:
         logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_response(e)
 
 
 
+@app.post("/search/patent/bulk")
+async def search_by_patent_bulk(request: BulkPatentLookupRequest):
+    """
+    Look up thousands of patent IDs in concurrent chunks
+    Returns: documents in input order + the IDs that were not found
+    """
+    if not any(pid.strip() for pid in request.patent_ids):
+        raise HTTPException(status_code=400, detail="No valid patent IDs provided")
+    if len(request.patent_ids) > BULK_LOOKUP_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {BULK_LOOKUP_MAX_IDS} patent IDs per lookup",
+        )
+
+    try:
+        fl = apply_profile({}, request.profile).get("fl")
+        results, not_found, chunks = await lookup_ids(
+            solr,
+            request.patent_ids,
+            method=request.method,
+            fl=fl,
+            chunk_size=max(1, request.chunk_size or BULK_LOOKUP_CHUNK_SIZE),
+            concurrency=BULK_LOOKUP_CONCURRENCY,
+        )
+
+        return {
+            "total_requested": len(results) + len(not_found),
+            "total_found": len(results),
+            "results": results,
+            "not_found": not_found,
+            "chunks": chunks,
+        }
+
+    except Exception as e:
+        logger.error(traceback.format_exc())
+        raise error_response(e)
+
+
 @app.post("/search/examiner")
 async def search_by_examiner(request: ExaminerSearchRequest):
     """
     Search by examiner name with different options
     """
     try:
-        # Build base query
-        q = build_examiner_q(request.examiners)
-        
-        params = {
-            "q": q,
-            "wt": "json",
-            "indent": "true"
-        }
-        
-        # Handle different search types
-        if request.search_type == "latest_filed":
-            params["sort"] = "app_date desc"
-            params["rows"] = request.limit
-            
-        elif request.search_type == "latest_approved":
-            params["fq"] = "disposal_type:iss"
-            params["sort"] = "app_date desc"
-            params["rows"] = request.limit
-            
-        elif request.search_type == "count":
-            params["rows"] = 0
-            
-        elif request.search_type == "last_10_years":
-            params["fq"] = "app_date_year:[2014 TO 2024]"
-            params["sort"] = "app_date desc"
-            params["rows"] = request.limit
-            
-        elif request.search_type == "latest_10_approved":
-            params["fq"] = "disposal_type:iss"
-            params["sort"] = "app_date desc"
-            params["rows"] = 10
-        
-        solr_url = f"{SOLR_BASE_URL}/select"
-        
+        names, resolved = resolve_entity_names("examiner", request.examiners, request)
+        params = plan_search("examiner", names, request.search_type, request.limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        apply_profile(params, request.profile)
+        if request.facets:
+            apply_gau_facets(params, request.facet_limit)
+        if request.cursor:
+            params = apply_cursor(params, request.cursor)
+
         # Execute query
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(solr_url, params=params)
-            response.raise_for_status()
-            data = response.json()
+        response = await solr.get("/select", params=params)
+        with metrics.stage("json_decode"):
+            data = decode_json(response)
         
-        return {
+        result = {
             "solr_query_url": str(response.url),
             "search_type": request.search_type,
             "total_found": data["response"]["numFound"],
             "results": data["response"]["docs"],
-            "raw_response": data
+            "next_cursor": next_cursor_mark(data, request.cursor),
+            "resolved_names": resolved,
         }
+        if request.facets:
+            result["facets"] = shape_facets(data)
+        if request.include_raw:
+            result["raw_response"] = data
+        return result
         
     except Exception as e:
         logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_response(e)
 
 
 @app.post("/download/json")
@@ -263,6 +647,37 @@ async def download_json(data: dict):
         logger.error(traceback.format_exc())
 
 
+@app.post("/download/json/query")
+async def download_json_query(request: JsonExportRequest):
+    """
+    Stream every document matched by a Solr query as NDJSON or a JSON array.
+    Pages through Solr with cursorMark; only one page is held in memory.
+    """
+    params, _ = export_params(request, default_fields=None)
+    try:
+        chunks = iter_query_json(
+            solr, params,
+            fmt=request.format,
+            page_size=request.page_size,
+            max_rows=request.max_rows,
+        )
+        extension = "ndjson" if request.format == "ndjson" else "json"
+        headers = {"Content-Disposition": f"attachment; filename=patent_results.{extension}"}
+        if request.gzip:
+            chunks = gzip_chunks(chunks)
+            headers["Content-Encoding"] = "gzip"
+
+        return StreamingResponse(
+            logged_stream(chunks),
+            media_type=NDJSON_MEDIA_TYPE if request.format == "ndjson" else JSON_MEDIA_TYPE,
+            headers=headers,
+        )
+
+    except Exception as e:
+        logger.error(traceback.format_exc())
+        raise error_response(e)
+
+
 @app.post("/download/excel")
 async def download_excel(data: dict):
     """
@@ -274,11 +689,12 @@ async def download_excel(data: dict):
             raise HTTPException(status_code=400, detail="No results to convert")
         
         # Convert to DataFrame
-        df = pd.DataFrame(results)
+        with metrics.stage("dataframe"):
+            df = pd.DataFrame(results)
         
         # Create Excel file in memory
         output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        with metrics.stage("excel_write"), pd.ExcelWriter(output, engine='openpyxl') as writer:
             df.to_excel(writer, index=False, sheet_name='Patent Results')
         
         output.seek(0)
@@ -291,42 +707,253 @@ async def download_excel(data: dict):
         
     except Exception as e:
         logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_response(e)
+
+
+def export_params(request: ExportQueryRequest, default_fields=EXPORT_FIELDS):
+    """
+    Turn an export request into Solr params and the ordered list of exported columns.
+    Paging params are dropped; iter_cursor sets rows / sort / cursorMark itself.
+    With default_fields=None and no fl given, every stored field is returned.
+    The query must pass the same host, handler and param checks as /execute-query.
+    """
+    try:
+        if request.solr_query_url:
+            query_policy.handler_path(request.solr_query_url)
+            items = query_policy.check_params(params_from_url(request.solr_query_url))
+        elif request.params:
+            items = query_policy.check_params(request.params)
+        else:
+            raise HTTPException(status_code=400, detail="Provide solr_query_url or params")
+    except UnsafeQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    fl = request.fl or next((v for k, v in items if k == "fl"), None)
+    columns = [f.strip() for f in (fl or "").split(",") if f.strip()]
+    if not columns or "*" in columns:
+        columns = default_fields
+
+    params = [(k, v) for k, v in items if k not in ("fl", "wt", "indent")]
+    if columns:
+        params.append(("fl", ",".join(columns)))
+    params.append(("wt", "json"))
+    return params, columns
+
+
+async def logged_stream(chunks):
+    """
+    Log failures that happen after a streaming response has started.
+    """
+    try:
+        async for chunk in chunks:
+            yield chunk
+    except Exception:
+        logger.error(traceback.format_exc())
+        raise
+
+
+@app.post("/download/excel/query")
+async def download_excel_query(request: ExportQueryRequest):
+    """
+    Export every document matched by a Solr query to Excel.
+    Pages through Solr with cursorMark, so memory stays bounded by page_size.
+    """
+    params, columns = export_params(request)
+    try:
+        fd, path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(fd)
+        try:
+            await export_query_to_xlsx(
+                solr, params, columns, path,
+                page_size=request.page_size,
+                max_rows=request.max_rows,
+            )
+        except Exception:
+            os.remove(path)
+            raise
+
+        return FileResponse(
+            path,
+            media_type=XLSX_MEDIA_TYPE,
+            filename="patent_results.xlsx",
+            background=BackgroundTask(os.remove, path),
+        )
+
+    except Exception as e:
+        logger.error(traceback.format_exc())
+        raise error_response(e)
+
+
+@app.post("/download/parquet/query")
+async def download_parquet_query(request: ExportQueryRequest):
+    """
+    Export every document matched by a Solr query to a typed Parquet file.
+    One row group per Solr page; no intermediate DataFrame.
+    """
+    if not ARROW_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Parquet export needs pyarrow installed")
+    params, columns = export_params(request)
+    try:
+        fd, path = tempfile.mkstemp(suffix=".parquet")
+        os.close(fd)
+        try:
+            await export_query_to_parquet(
+                solr, params, columns, path,
+                page_size=request.page_size,
+                max_rows=request.max_rows,
+            )
+        except Exception:
+            os.remove(path)
+            raise
+
+        return FileResponse(
+            path,
+            media_type=PARQUET_MEDIA_TYPE,
+            filename="patent_results.parquet",
+            background=BackgroundTask(os.remove, path),
+        )
+
+    except Exception as e:
+        logger.error(traceback.format_exc())
+        raise error_response(e)
+
+
+@app.post("/download/arrow/query")
+async def download_arrow_query(request: ExportQueryRequest):
+    """
+    Stream every document matched by a Solr query in the Arrow IPC stream format,
+    one record batch per Solr page.
+    """
+    if not ARROW_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Arrow export needs pyarrow installed")
+    params, columns = export_params(request)
+    try:
+        chunks = iter_query_arrow(
+            solr, params, columns,
+            page_size=request.page_size,
+            max_rows=request.max_rows,
+        )
+        return StreamingResponse(
+            logged_stream(chunks),
+            media_type=ARROW_STREAM_MEDIA_TYPE,
+            headers={"Content-Disposition": "attachment; filename=patent_results.arrows"},
+        )
+
+    except Exception as e:
+        logger.error(traceback.format_exc())
+        raise error_response(e)
+
+
+@app.post("/export/jobs", status_code=202)
+async def submit_export_job(
+    request: ExportJobRequest,
+    http_request: Request,
+    x_user_id: Optional[str] = Header(default=None),
+):
+    """
+    Queue a background export of every document matched by a Solr query.
+    Returns the job; identical submissions share the same job and file.
+    """
+    if request.format not in JOB_FORMATS:
+        raise HTTPException(status_code=501, detail=f"{request.format} export needs pyarrow installed")
+    params, columns = export_params(request)
+    client = http_request.client.host if http_request.client else "anonymous"
+    user = (x_user_id if EXPORT_TRUST_USER_HEADER else None) or client
+    try:
+        job, deduplicated = await export_jobs.submit(
+            params,
+            request.format,
+            columns,
+            max_rows=request.max_rows,
+            page_size=request.page_size,
+            user=user,
+        )
+    except ExportLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {**job.to_dict(), "deduplicated": deduplicated}
+
+
+@app.get("/export/jobs/{job_id}")
+async def get_export_job(job_id: str):
+    """
+    Status and progress of an export job.
+    """
+    job = await export_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found or expired")
+    return job.to_dict()
+
+
+@app.get("/export/jobs/{job_id}/download")
+async def download_export_job(job_id: str, range: Optional[str] = Header(default=None)):
+    """
+    Download a finished export; a Range header resumes an interrupted download.
+    """
+    job = await export_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found or expired")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Export job is {job.status}")
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"attachment; filename={job.filename}",
+    }
+    try:
+        byte_range = parse_byte_range(range, job.size)
+    except ValueError:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{job.size}"},
+        )
+    if byte_range is None:
+        return FileResponse(job.path, media_type=job.media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{job.size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        iter_file_range(job.path, start, end),
+        status_code=206,
+        media_type=job.media_type,
+        headers=headers,
+    )
 
 
 @app.get("/stats/total")
-async def get_total_stats():
+async def get_total_stats(from_date: Optional[str] = None, to_date: Optional[str] = None):
     """
-    Get total counts for reports
+    Get total counts for reports in a single Solr round-trip.
+    Optional from_date / to_date (YYYY-MM-DD) restrict counts to an app_date window.
     """
     try:
-        solr_url = f"{SOLR_BASE_URL}/solr/{SOLR_CORE}/select"
-        
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # Total patents
-            total_response = await client.get(solr_url, params={"q": "*:*", "rows": 0, "wt": "json"})
-            total_data = total_response.json()
-            total_patents = total_data["response"]["numFound"]
-            
-            # Approved patents
-            approved_response = await client.get(solr_url, params={
-                "q": "disposal_type:iss",
-                "rows": 0,
-                "wt": "json"
-            })
-            approved_data = approved_response.json()
-            total_approved = approved_data["response"]["numFound"]
-            
-            # Pending patents
-            pending_response = await client.get(solr_url, params={
-                "q": "disposal_type:pend",
-                "rows": 0,
-                "wt": "json"
-            })
-            pending_data = pending_response.json()
-            total_pending = pending_data["response"]["numFound"]
-        
+        solr_path = f"/solr/{SOLR_CORE}/select"
+
+        params = {
+            "q": "*:*",
+            "rows": 0,
+            "wt": "json",
+            "json.facet": json.dumps({
+                "approved": {"type": "query", "q": "disposal_type:iss"},
+                "pending": {"type": "query", "q": "disposal_type:pend"},
+            }),
+        }
+        if from_date or to_date:
+            params["fq"] = build_date_fq(from_date, to_date)
+
+        response = await solr.get(solr_path, params=params)
+        with metrics.stage("json_decode"):
+            data = decode_json(response)
+
+        facets = data.get("facets", {})
+        total_patents = data["response"]["numFound"]
+        total_approved = facets.get("approved", {}).get("count", 0)
+        total_pending = facets.get("pending", {}).get("count", 0)
+
         return {
+            "from_date": from_date,
+            "to_date": to_date,
             "total_patents": total_patents,
             "total_approved": total_approved,
             "total_pending": total_pending,
@@ -335,104 +962,70 @@ async def get_total_stats():
         
     except Exception as e:
         logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_response(e)
 
 @app.post("/build/attorney-query")
 async def build_attorney_query(request: AttorneySearchRequest):
     try: 
-        q = " OR ".join([f'all_attorney_names:"{a}"' for a in request.attorneys])
-
-        params = {
-            "q": q,
-            "rows": request.limit,
-            "wt": "json",
-            "indent": "true",
-        }
-
-        solr_url = httpx.URL(f"{SOLR_BASE_URL}/select", params=params)
+        names, resolved = resolve_entity_names("attorney", request.attorneys, request)
+        params = plan_search(
+            "attorney", names, request.search_type or "latest_filed", request.limit
+        )
+        apply_profile(params, request.profile)
+        solr_url = solr.build_url("/select", params=params)
 
-        return {"solr_query_url": str(solr_url)}
+        return {"solr_query_url": str(solr_url), "resolved_names": resolved}
     
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_response(e)
 
 @app.post("/build/patent-query")
 async def build_patent_query(request: PatentSearchRequest):
-    
-    try:
-        patent_ids = [p.strip() for p in request.patent_ids if p.strip()]
-        if not patent_ids:
-            raise HTTPException(status_code=400, detail="No valid patent IDs provided")
-
-        # Build Solr query
-        if len(patent_ids) == 1:
-            q = f'id:"{patent_ids[0]}"'
-        else:
-            q = " OR ".join([f'id:"{pid}"' for pid in patent_ids])
-
-        params = {
-            "q": q,
-            "wt": "json",
-            "indent": "true",
-        }
+    patent_ids = [p.strip() for p in request.patent_ids if p.strip()]
+    if not patent_ids:
+        raise HTTPException(status_code=400, detail="No valid patent IDs provided")
 
-        solr_url = httpx.URL(f"{SOLR_BASE_URL}/select", params=params)
+    try:
+        params = plan_patent_lookup(patent_ids)
+        apply_profile(params, request.profile)
+        solr_url = solr.build_url("/select", params=params)
 
         return {
             "solr_query_url": str(solr_url),
             "query_type": "patent",
             "searched_ids": patent_ids,
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(traceback.format_exc())
+        raise error_response(e)
 
 @app.post("/build/examiner-query")
 async def build_examiner_query(request: ExaminerSearchRequest):
     
     try:
-        q = build_examiner_q(request.examiners)
-
-        params = {
-        "q": q,
-        "rows": request.limit or 10,
-        "wt": "json",
-        "indent": "true",
-        }
-        
-        if request.search_type == "latest_filed":
-            params["sort"] = "app_date desc"
-            params["rows"] = request.limit
-            
-        elif request.search_type == "latest_approved":
-            params["fq"] = "disposal_type:iss"
-            params["sort"] = "app_date desc"
-            params["rows"] = request.limit
-            
-        elif request.search_type == "count":
-            params["rows"] = 0
-            
-        elif request.search_type == "last_10_years":
-            params["fq"] = "app_date_year:[2015 TO 2025]"
-            params["sort"] = "app_date desc"
-            params["rows"] = request.limit
-            
-        elif request.search_type == "latest_10_approved":
-            params["fq"] = "disposal_type:iss"
-            params["sort"] = "app_date desc"
-            params["rows"] = request.limit
-
-
-
-        solr_url = httpx.URL(f"{SOLR_BASE_URL}/select", params=params)
+        names, resolved = resolve_entity_names("examiner", request.examiners, request)
+        params = plan_search("examiner", names, request.search_type, request.limit)
+        apply_profile(params, request.profile)
+        if request.facets:
+            apply_gau_facets(params, request.facet_limit)
+        solr_url = solr.build_url("/select", params=params)
 
         return {
             "solr_query_url": str(solr_url),
             "query_type": "examiner",
             "normalized_name": request.examiners,
+            "resolved_names": resolved,
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(traceback.format_exc())
+        raise error_response(e)
 
 
 
@@ -440,186 +1033,225 @@ async def build_examiner_query(request: ExaminerSearchRequest):
 async def build_lawfirm_query(request: LawFirmSearchRequest):
 
     try: 
-        q = build_lawfirm_q(request.lawfirms)
-
-        params = {
-            "q": q,
-            "rows": request.limit or 10,
-            "wt": "json",
-            "indent": "true",
-        }
-        
-        
-        if request.search_type == "latest_filed":
-            params["sort"] = "app_date desc"
-            params["rows"] = request.limit
-            
-        elif request.search_type == "latest_approved":
-            params["fq"] = "disposal_type:iss"
-            params["sort"] = "app_date desc"
-            params["rows"] = request.limit
-            
-        elif request.search_type == "count":
-            params["rows"] = 0
-            
-        elif request.search_type == "last_10_years":
-            params["fq"] = "app_date_year:[2015 TO 2025]"
-            params["sort"] = "app_date desc"
-            params["rows"] = request.limit
-            
-        elif request.search_type == "latest_10_approved":
-            params["fq"] = "disposal_type:iss"
-            params["sort"] = "app_date desc"
-            params["rows"] = 10
-
-        solr_url = httpx.URL(f"{SOLR_BASE_URL}/select", params=params)
+        names, resolved = resolve_entity_names("lawfirm", request.lawfirms, request)
+        params = plan_search("lawfirm", names, request.search_type, request.limit)
+        apply_profile(params, request.profile)
+        if request.facets:
+            apply_gau_facets(params, request.facet_limit)
+        solr_url = solr.build_url("/select", params=params)
 
         return {
             "solr_query_url": str(solr_url),
             "query_type": "lawfirm",
             "normalized_names": request.lawfirms,
+            "resolved_names": resolved,
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(traceback.format_exc())
+        raise error_response(e)
 
 
 @app.post("/execute-query")
-async def execute_query(request: ExecuteQueryRequest):
+async def execute_query(request: ExecuteQueryRequest, response: Response):
+    """
+    Run a built Solr URL through the query policy; identical queries are served from cache
+    """
+    path, params = execute_params(request)
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(request.solr_query_url)
-            response.raise_for_status()
-            data = response.json()
-
-        return {
-            "solr_query_url": request.solr_query_url,
-            "total_found": data["response"]["numFound"],
-            "results": data["response"]["docs"],
-        }
+        key = query_cache.make_key("execute", {"path": path, "params": params})
+        result, hit = await query_cache.get_or_compute(
+            key,
+            lambda: fetch_query(path, params, request.cursor),
+            # Results cut short by timeAllowed are not kept
+            cacheable=lambda result: not result["partial_results"],
+        )
+        response.headers["X-Cache"] = "HIT" if hit else "MISS"
+        return result
 
     except Exception as e:
         logger.error(traceback.format_exc())
-        return {
-            "solr_query_url": "",
-            "total_found": "",
-            "results": "",
-        }
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_response(e)
 
-def build_lawfirm_q(lawfirms: List[str]) -> str:
-    try:
-        clauses = [
-        f'law_firm:"{name.strip().lower()}"'
-            for name in lawfirms
-            if name.strip()
-        ]
-        return " OR ".join(clauses)
-    
-    except Exception as e:
-        logger.error(traceback.format_exc())
-    
-    return ""
 
+def execute_params(request: ExecuteQueryRequest):
+    """
+    (handler path, canonical params) for an execute request; 400 when the policy refuses it
+    """
+    try:
+        path, params = query_policy.normalize(request.solr_query_url, cursor=bool(request.cursor))
+        if request.cursor:
+            if request.cursor != "*":
+                # Facet counts cover the whole match set; later pages reuse the first page's
+                params = [(k, v) for k, v in params if k != "json.facet"]
+            params = query_policy.apply(apply_cursor(params, request.cursor), cursor=True)
+    except UnsafeQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return path, params
+
+
+async def fetch_query(path: str, params, cursor: Optional[str]):
+    response = await solr.get(path, params=params)
+    with metrics.stage("json_decode"):
+        data = decode_json(response)
+
+    return {
+        "solr_query_url": query_policy.url(path, params),
+        "total_found": data["response"]["numFound"],
+        "results": data["response"]["docs"],
+        "next_cursor": next_cursor_mark(data, cursor),
+        "facets": shape_facets(data),
+        "partial_results": bool(data.get("responseHeader", {}).get("partialResults")),
+    }
 
+@app.post("/execute-query/stream")
+async def execute_query_stream(request: ExecuteQueryRequest):
+    """
+    Same response shape as /execute-query, but documents are parsed as Solr sends them
+    and forwarded immediately; the full Solr body is never held in memory.
+    """
+    path, params = execute_params(request)
+    parser = SolrDocStream()
+    docs = iter_docs(solr, path, params=params, parser=parser)
 
-def build_examiner_q(examiners: List[str]) -> str:
+    # Read up to the first document so Solr errors still surface as a 500
     try:
-        
-        clauses = [
-            f'examiner:"{name.strip().lower()}"'
-            for name in examiners
-            if name.strip()
-        ]
-        return " OR ".join(clauses)
+        first = await docs.__anext__()
+    except StopAsyncIteration:
+        first = None
     except Exception as e:
         logger.error(traceback.format_exc())
-    
-    return ""
+        raise error_response(e)
 
-@app.post("/build/prosecutor-query")
-async def build_prosecutor_query(request: ProsecutorSearchRequest):
-    try:
-        q = build_prosecutor_q(request.prosecutors)
+    async def all_docs():
+        if first is None:
+            return
+        yield first
+        async for doc in docs:
+            yield doc
 
-        params = {
-            "q": q,
-            "rows": request.limit or 10,
-            "wt": "json",
-            "indent": "true",
-        }
+    return StreamingResponse(
+        iter_results_json(all_docs(), parser, query_policy.url(path, params), request.cursor),
+        media_type=JSON_MEDIA_TYPE,
+    )
 
-        if request.search_type == "latest_filed":
-            params["sort"] = "app_date desc"
-            params["rows"] = request.limit
 
-        elif request.search_type == "latest_approved":
-            params["fq"] = "disposal_type:iss"
-            params["sort"] = "app_date desc"
-            params["rows"] = request.limit
+def resolve_entity_names(entity: str, names: List[str], options: NameResolutionOptions):
+    """
+    The entered names plus the stored Solr values they resolve to, and the per-name
+    matches; (names, None) when resolution is off or the entity index is not built yet
+    """
+    kind = "prosecutor" if entity == "attorney" else entity
+    index = suggest.resolver(kind) if suggest and options.resolve_names else None
+    if index is None:
+        return names, None
+    min_score = ENTITY_MIN_SCORE if options.min_score is None else options.min_score
+    return expand_names(index, names, min_score, ENTITY_MAX_VARIANTS)
+
+
+def apply_profile(params: dict, profile: str) -> dict:
+    """
+    Set fl from a named field profile; "full" leaves fl unset.
+    """
+    fields = FIELD_PROFILES.get(profile)
+    if fields:
+        params["fl"] = ",".join(fields)
+    return params
+
+
+def apply_gau_facets(params: dict, limit: int = 50) -> dict:
+    """
+    Add json.facet terms facets on gau and cpc_classification over the whole match set.
+    """
+    params["json.facet"] = json.dumps({
+        "gau": {"type": "terms", "field": "gau", "limit": limit},
+        "cpc": {"type": "terms", "field": "cpc_classification", "limit": limit},
+    }, separators=(",", ":"))
+    return params
 
-        elif request.search_type == "count":
-            params["rows"] = 0
 
-        elif request.search_type == "last_10_years":
-            params["fq"] = "app_date_year:[2015 TO 2025]"
-            params["sort"] = "app_date desc"
-            params["rows"] = request.limit
+def shape_facets(data: dict) -> Optional[dict]:
+    """
+    Compact {"gau": {value: count}, "cpc": {value: count}} block, or None without facets.
+    """
+    facets = data.get("facets")
+    if not facets:
+        return None
+    return {
+        key: {str(b["val"]): b["count"] for b in facets.get(key, {}).get("buckets", [])}
+        for key in ("gau", "cpc")
+    }
 
-        elif request.search_type == "latest_10_approved":
-            params["fq"] = "disposal_type:iss"
-            params["sort"] = "app_date desc"
-            params["rows"] = 10
 
-        solr_url = httpx.URL(f"{SOLR_BASE_URL}/select", params=params)
+def build_date_fq(from_date: Optional[str], to_date: Optional[str]) -> str:
+    """
+    Build an app_date filter; a missing bound is left open.
+    """
+    start = f"{from_date}T00:00:00Z" if from_date else "*"
+    end = f"{to_date}T23:59:59Z" if to_date else "*"
+    return f"app_date:[{start} TO {end}]"
+
+
+@app.post("/build/prosecutor-query")
+async def build_prosecutor_query(request: ProsecutorSearchRequest):
+    try:
+        names, resolved = resolve_entity_names("prosecutor", request.prosecutors, request)
+        params = plan_search("prosecutor", names, request.search_type, request.limit)
+        apply_profile(params, request.profile)
+        if request.facets:
+            apply_gau_facets(params, request.facet_limit)
+        solr_url = solr.build_url("/select", params=params)
 
         return {
             "solr_query_url": str(solr_url),
             "query_type": "prosecutor",
             "normalized_names": request.prosecutors,
+            "resolved_names": resolved,
         }
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_response(e)
 
 
 @app.post("/search/prosecutor")
 async def search_by_prosecutor(request: ProsecutorSearchRequest):
     try:
-        q = build_prosecutor_q(request.prosecutors)
+        names, resolved = resolve_entity_names("prosecutor", request.prosecutors, request)
+        params = plan_search("prosecutor", names, request.search_type, request.limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        params = {
-            "q": q,
-            "wt": "json",
-            "indent": "true",
-        }
-
-        if request.search_type == "latest_filed":
-            params["sort"] = "app_date desc"
-            params["rows"] = request.limit
-
-        elif request.search_type == "latest_approved":
-            params["fq"] = "disposal_type:iss"
-            params["sort"] = "app_date desc"
-            params["rows"] = request.limit
-
-        solr_url = f"{SOLR_BASE_URL}/select"
+    try:
+        apply_profile(params, request.profile)
+        if request.facets:
+            apply_gau_facets(params, request.facet_limit)
+        if request.cursor:
+            params = apply_cursor(params, request.cursor)
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(solr_url, params=params)
-            response.raise_for_status()
-            data = response.json()
+        response = await solr.get("/select", params=params)
+        with metrics.stage("json_decode"):
+            data = decode_json(response)
 
-        return {
+        result = {
             "solr_query_url": str(response.url),
             "total_found": data["response"]["numFound"],
             "results": data["response"]["docs"],
-            "raw_response": data,
+            "next_cursor": next_cursor_mark(data, request.cursor),
+            "resolved_names": resolved,
         }
+        if request.facets:
+            result["facets"] = shape_facets(data)
+        if request.include_raw:
+            result["raw_response"] = data
+        return result
 
     except Exception as e:
         logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_response(e)
 
 @app.post("/build/advanced-query")
 async def build_advanced_query(request: AdvancedSearchRequest):
@@ -650,35 +1282,17 @@ async def build_advanced_query(request: AdvancedSearchRequest):
     if request.sort:
         params["sort"] = f"{request.sort.field} {request.sort.order}"
 
-    solr_url = httpx.URL(f"{SOLR_BASE_URL}/select", params=params)
+    apply_profile(params, request.profile)
+    solr_url = solr.build_url("/select", params=params)
     return { "solr_query_url": str(solr_url) }
 
 
-def build_prosecutor_q(prosecutors: List[str]) -> str:
-    try:
-        clauses = [
-            f'all_attorney_names:"{name.strip().lower()}"'
-            for name in prosecutors
-            if name.strip()
-        ]
-        return " OR ".join(clauses)
-    except Exception as e:
-        logger.error(traceback.format_exc())
-        return ""
-
 @app.post("/build/gau-query")
 async def build_gau_query(request: GAUSearchRequest):
     try:
-        gau_query = " OR ".join(f'"{g}"' for g in request.gaus)
-        params = {
-            "q": f'gau:({gau_query})',
-            "rows": request.limit,
-            "wt": "json",
-            "indent": "true",
-            "sort": request.sort,
-        }
-
-        solr_url = httpx.URL(f"{SOLR_BASE_URL}/select", params=params)
+        params = plan_gau_search(request.gaus, request.limit, request.sort)
+        apply_profile(params, request.profile)
+        solr_url = solr.build_url("/select", params=params)
 
         return {
             "solr_query_url": str(solr_url),
@@ -686,216 +1300,470 @@ async def build_gau_query(request: GAUSearchRequest):
             "gau": request.gaus,
         }
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_response(e)
 
 @app.post("/search/gau")
 async def search_by_gau(request: GAUSearchRequest):
     try:
-        params = {
-            "q": f'gau:"{request.gau}"',
-            "rows": request.limit,
-            "wt": "json",
-            "indent": "true",
-            "sort": request.sort,
-        }
+        params = plan_gau_search(request.gaus, request.limit, request.sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        apply_profile(params, request.profile)
+        if request.cursor:
+            params = apply_cursor(params, request.cursor)
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(f"{SOLR_BASE_URL}/select", params=params)
-            response.raise_for_status()
-            data = response.json()
+        response = await solr.get("/select", params=params)
+        with metrics.stage("json_decode"):
+            data = decode_json(response)
 
         return {
             "solr_query_url": str(response.url),
             "total_found": data["response"]["numFound"],
             "results": data["response"]["docs"],
+            "next_cursor": next_cursor_mark(data, request.cursor),
         }
 
     except Exception as e:
         logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_response(e)
+
+
+@app.post("/search/batch")
+async def search_batch(request: BatchSearchRequest):
+    """
+    Run several typed sub-queries concurrently and return every result set in one response.
+    A failing sub-query reports its error without failing the batch.
+    """
+    try:
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+        results = await asyncio.gather(
+            *(run_batch_sub_query(sub, request, semaphore) for sub in request.queries)
+        )
+        return {"total_queries": len(results), "results": results}
+
+    except Exception as e:
+        logger.error(traceback.format_exc())
+        raise error_response(e)
+
+
+async def build_sub_query_url(sub: BatchSubQuery, request: BatchSearchRequest):
+    """
+    Build the Solr URL for a sub-query through the matching /build/* handler
+    """
+    options = {"profile": request.profile, "limit": sub.limit}
+    faceted = {**options, "facets": sub.facets}
+    if sub.type == "patent":
+        built = await build_patent_query(PatentSearchRequest(patent_ids=sub.values, profile=request.profile))
+    elif sub.type == "examiner":
+        built = await build_examiner_query(
+            ExaminerSearchRequest(examiners=sub.values, search_type=sub.search_type, **faceted)
+        )
+    elif sub.type == "lawfirm":
+        built = await build_lawfirm_query(
+            LawFirmSearchRequest(lawfirms=sub.values, search_type=sub.search_type, **faceted)
+        )
+    elif sub.type == "prosecutor":
+        built = await build_prosecutor_query(
+            ProsecutorSearchRequest(prosecutors=sub.values, search_type=sub.search_type, **faceted)
+        )
+    elif sub.type == "attorney":
+        built = await build_attorney_query(
+            AttorneySearchRequest(attorneys=sub.values, search_type=sub.search_type, **options)
+        )
+    else:
+        built = await build_gau_query(GAUSearchRequest(gaus=sub.values, **options))
+
+    if not built:
+        raise ValueError(f"Could not build {sub.type} query")
+    return built["solr_query_url"]
+
+
+async def run_batch_sub_query(sub: BatchSubQuery, request: BatchSearchRequest, semaphore):
+    result = {"key": sub.key or sub.type, "type": sub.type}
+    try:
+        solr_query_url = await build_sub_query_url(sub, request)
+        async with semaphore:
+            response = await solr.get(solr_query_url)
+        with metrics.stage("json_decode"):
+            data = decode_json(response)
+
+        result.update({
+            "solr_query_url": solr_query_url,
+            "total_found": data["response"]["numFound"],
+            "results": data["response"]["docs"],
+            "facets": shape_facets(data),
+        })
+    except Exception as e:
+        # Report the status a standalone request would get; only server errors are logged
+        error = error_response(e)
+        if error.status_code >= 500:
+            logger.error(traceback.format_exc())
+        result["error"] = str(error.detail) or type(e).__name__
+        result["status"] = error.status_code
+    return result
 
 
 @app.post("/stats/examiners-by-date")
-async def examiner_stats_by_date(request: ExaminerStatsByDateRequest):
+async def examiner_stats_by_date(request: ExaminerStatsByDateRequest, response: Response):
     try:
-       
-        params = {
-            "q": "*:*",
-            "fq": f'app_date:[{request.from_date}T00:00:00Z TO {request.to_date}T23:59:59Z]',
-            "rows": 0,   
-            "wt": "json",
-           "json.facet": json.dumps({
+        key = stats_cache.make_key("examiners-by-date", request.model_dump())
+        result, hit = await stats_cache.get_or_compute(
+            key, lambda: fetch_examiner_stats_by_date(request)
+        )
+        response.headers["X-Cache"] = "HIT" if hit else "MISS"
+        return result
+
+    except Exception as e:
+        logger.error(traceback.format_exc())
+        raise error_response(e)
+
+
+async def fetch_examiner_stats_by_date(request: ExaminerStatsByDateRequest):
+    """
+    Run the examiner json.facet query against Solr and reshape the buckets
+    """
+    params = {
+        "q": "*:*",
+        "fq": build_date_fq(request.from_date, request.to_date),
+        "rows": 0,   
+        "wt": "json",
+        "json.facet": json.dumps({
             "examiners": {
                 "type": "terms",
                 "field": "examiner",
                 "limit": request.limit,
                 "sort": "count desc",
-                "facet": {
-                    "gaus": { 
-                        "type": "terms", 
-                        "field": "gau", 
-                        "limit": -1, 
-                        "sort": "count desc" 
-                    },
-                     "cpcs": {   # NEW FACET
-                        "type": "terms",
-                        "field": "cpc_classification",
-                        "limit": -1,
-                        "sort": "count desc",
-                        "mincount": 1
-                    }
-                }
+                "facet": build_examiner_sub_facets(request),
             }
-            })
-        }
+        })
+    }
+
+    response = await solr.get("/select", params=params, query_class="heavy_stats")
+    with metrics.stage("json_decode"):
+        data = decode_json(response)
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.get(f"{SOLR_BASE_URL}/select", params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            
+    with metrics.stage("facet_reshape"):
         buckets = data["facets"]["examiners"]["buckets"]
-        
+
         examiners = []
 
         for b in buckets:
-            gau_buckets = b.get("gaus", {}).get("buckets", [])
-            cpc_buckets = b.get("cpcs",{}).get("buckets",[])
-
-            gaus = [
-                {
-                    "gau": g["val"],
-                    "application_count": g["count"],
-                }
-                for g in gau_buckets
-            ]
-            
-            # CPC
-            
-            
-            cpcs = [
-                {
-                    
-                    "cpc":c["val"],
-                    "application_count":c["count"]
-               } for c in cpc_buckets
-            ]
+            if request.unique_only:
+                gaus, unique_gau_count = [], b.get("unique_gaus", 0)
+                cpcs, unique_cpc_count = [], b.get("unique_cpcs", 0)
+            else:
+                gaus, unique_gau_count = shape_sub_facet(b.get("gaus", {}), "gau", request.other_bucket)
+                cpcs, unique_cpc_count = shape_sub_facet(b.get("cpcs", {}), "cpc", request.other_bucket)
 
             examiners.append({
                 "examiner": b["val"],
                 "application_count": b["count"],
-                "unique_gau_count": len(gaus),
-                "unique_cpc_count":len(cpcs),
+                "unique_gau_count": unique_gau_count,
+                "unique_cpc_count": unique_cpc_count,
                 "gaus": gaus,
-                "cpcs":cpcs,
+                "cpcs": cpcs,
             })
 
+    return {
+        "from_date": request.from_date,
+        "to_date": request.to_date,
+        "total_examiners": len(examiners),
+        "examiners": examiners,
+    }
+
+
+def build_examiner_sub_facets(request: ExaminerStatsByDateRequest) -> dict:
+    """
+    Per-examiner GAU / CPC sub-facets: capped terms buckets, or unique()/hll() counts only
+    """
+    if request.unique_only:
         return {
-            "from_date": request.from_date,
-            "to_date": request.to_date,
-            "total_examiners": len(examiners),
-            "examiners": examiners,
+            "unique_gaus": f"{request.unique_method}(gau)",
+            "unique_cpcs": f"{request.unique_method}(cpc_classification)",
         }
 
-    except Exception as e:
-        logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
+    sub_facets = {}
+    for name, field, limit in (
+        ("gaus", "gau", request.gau_limit),
+        ("cpcs", "cpc_classification", request.cpc_limit),
+    ):
+        facet = {
+            "type": "terms",
+            "field": field,
+            "limit": limit,
+            "sort": "count desc",
+            "mincount": request.mincount,
+        }
+        if limit != -1:
+            # Keep the unique count exact even though only the top buckets come back
+            facet["numBuckets"] = True
+            if request.other_bucket:
+                facet["allBuckets"] = True
+        sub_facets[name] = facet
+    return sub_facets
+
+
+def shape_sub_facet(facet: dict, key: str, other_bucket: bool = False):
+    """
+    Turn a terms sub-facet into (items, unique count), with an optional "other" rollup
+    """
+    buckets = facet.get("buckets", [])
+    items = [{key: g["val"], "application_count": g["count"]} for g in buckets]
+    unique_count = facet.get("numBuckets", len(items))
+
+    if other_bucket and "allBuckets" in facet:
+        other = facet["allBuckets"]["count"] - sum(g["count"] for g in buckets)
+        if other > 0:
+            items.append({key: "other", "application_count": other})
+    return items, unique_count
 
 
 @app.post("/stats/by-date-range")
-async def stats_by_date_range(request: StatsByDateRangeRequest):
+async def stats_by_date_range(request: StatsByDateRangeRequest, response: Response):
     try:
-        # Map type → Solr field
-        field = STAT_TYPE_MAP.get(request.type)
-        if not field:
-            raise HTTPException(status_code=400, detail="Invalid stats type")
+        key = stats_cache.make_key("by-date-range", request.model_dump())
+        result, hit = await stats_cache.get_or_compute(
+            key, lambda: fetch_stats_by_date_range(request)
+        )
+        response.headers["X-Cache"] = "HIT" if hit else "MISS"
+        return result
 
-        # group_field = field_map[request.type]
+    except Exception as e:
+        logger.error(traceback.format_exc())
+        raise error_response(e)
 
-        facet_sort = f"count {request.sort_order}"
-        
-        params = {
-            "q": "*:*",
-            "fq": f'app_date:[{request.from_date}T00:00:00Z TO {request.to_date}T23:59:59Z]',
-            "rows": 0,
-            "wt": "json",
-            "json.facet": json.dumps({
-                "groups": {
-                    "type": "terms",
-                    "field": field,
-                    "limit": request.limit,
-                    "sort": facet_sort,
-                    "facet": {
-                        "gaus": {
-                            "type": "terms",
-                            "field": "gau",
-                            "limit": -1,
-                            "sort": facet_sort
-                        },
-                        "cpcs": {   # NEW FACET
-                            "type": "terms",
-                            "field": "cpc_classification",
-                            "limit": 20,
-                            "sort": "count desc",
-                            "mincount": 1
-                    }
-                    }
-                }
-            })
-        }
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.get(f"{SOLR_BASE_URL}/select", params=params)
-            response.raise_for_status()
-            data = response.json()
+async def fetch_stats_by_date_range(request: StatsByDateRangeRequest):
+    """
+    Answer from the monthly rollups when they cover the range,
+    otherwise run the grouped json.facet query against Solr
+    """
+    # Map type → Solr field
+    field = STAT_TYPE_MAP.get(request.type)
+    if not field:
+        raise HTTPException(status_code=400, detail="Invalid stats type")
+
+    buckets = None
+    if rollup_store and request.type in ROLLUP_DIMENSIONS:
+        buckets = await rollup_group_buckets(
+            solr, rollup_store, request.type, field,
+            request.from_date, request.to_date,
+            request.limit, request.sort_order,
+        )
+    if buckets is None:
+        buckets = await fetch_group_buckets(request, field)
 
-        buckets = data["facets"]["groups"]["buckets"]
+    with metrics.stage("facet_reshape"):
+        return shape_group_buckets(request, buckets)
 
-        results = []
 
-        for b in buckets:
-            gau_buckets = b.get("gaus", {}).get("buckets", [])
-            cpc_buckets = b.get("cpcs",{}).get("buckets",[])
+async def fetch_group_buckets(request: StatsByDateRangeRequest, field: str):
+    """
+    Run the grouped json.facet query against Solr and return the raw buckets
+    """
+    # group_field = field_map[request.type]
 
-            gaus = [
-                {
-                    "gau": g["val"],
-                    "application_count": g["count"],
+    facet_sort = f"count {request.sort_order}"
+
+    params = {
+        "q": "*:*",
+        "fq": build_date_fq(request.from_date, request.to_date),
+        "rows": 0,
+        "wt": "json",
+        "json.facet": json.dumps({
+            "groups": {
+                "type": "terms",
+                "field": field,
+                "limit": request.limit,
+                "sort": facet_sort,
+                "facet": {
+                    "gaus": {
+                        "type": "terms",
+                        "field": "gau",
+                        "limit": -1,
+                        "sort": facet_sort
+                    },
+                    "cpcs": {   # NEW FACET
+                        "type": "terms",
+                        "field": "cpc_classification",
+                        "limit": 20,
+                        "sort": "count desc",
+                        "mincount": 1
                 }
-                for g in gau_buckets
-            ]
-            
-            cpcs = [
-                {
-                    "cpc":g["val"],
-                    "application_count":g["count"],
                 }
-                for g in cpc_buckets
-            ]
+            }
+        })
+    }
 
-            results.append({
-                request.type: b["val"],                     # dynamic key
-                "application_count": b["count"],
-                "unique_gau_count": len(gaus),
-                "unique_cpc_count":len(cpcs),
-                "gaus": gaus,
-                "cpcs":cpcs,
-            })
+    response = await solr.get("/select", params=params, query_class="stats")
+    with metrics.stage("json_decode"):
+        data = decode_json(response)
 
-        return {
-            "type": request.type,
-            "from_date": request.from_date,
-            "to_date": request.to_date,
-            f"total_{request.type}s": len(results),
-            f"{request.type}s": results,
-        }
+    return data["facets"]["groups"]["buckets"]
+
+
+def shape_group_buckets(request: StatsByDateRangeRequest, buckets):
+    """
+    Reshape grouped terms buckets (from Solr or the rollups) into the API response
+    """
+    results = []
+
+    for b in buckets:
+        gau_buckets = b.get("gaus", {}).get("buckets", [])
+        cpc_buckets = b.get("cpcs",{}).get("buckets",[])
+
+        gaus = [
+            {
+                "gau": g["val"],
+                "application_count": g["count"],
+            }
+            for g in gau_buckets
+        ]
+
+        cpcs = [
+            {
+                "cpc":g["val"],
+                "application_count":g["count"],
+            }
+            for g in cpc_buckets
+        ]
+
+        results.append({
+            request.type: b["val"],                     # dynamic key
+            "application_count": b["count"],
+            "unique_gau_count": len(gaus),
+            "unique_cpc_count":len(cpcs),
+            "gaus": gaus,
+            "cpcs":cpcs,
+        })
+
+    return {
+        "type": request.type,
+        "from_date": request.from_date,
+        "to_date": request.to_date,
+        f"total_{request.type}s": len(results),
+        f"{request.type}s": results,
+    }
+
+@app.post("/stats/trend")
+async def stats_trend(request: TrendRequest):
+    """
+    Filing trend over time for one or more values of a stats type, from a single Solr
+    request: a date range facet nested under a query facet per value (or a terms facet
+    for the top values). Streams a columnar payload: one period axis, one count array
+    per series, plus the total per period.
+    """
+    try:
+        params, periods, values = plan_trend(
+            STAT_TYPE_MAP[request.type],
+            request.from_date,
+            request.to_date,
+            interval=request.interval,
+            values=request.values,
+            limit=request.limit,
+            status=request.status,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        key = stats_cache.make_key("trend", request.model_dump())
+        result, hit = await stats_cache.get_or_compute(
+            key, lambda: fetch_trend(request, params, periods, values)
+        )
+        return StreamingResponse(
+            iter_trend_json(result),
+            media_type=JSON_MEDIA_TYPE,
+            headers={"X-Cache": "HIT" if hit else "MISS"},
+        )
 
     except Exception as e:
         logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_response(e)
+
+
+async def fetch_trend(request: TrendRequest, params: dict, periods, values):
+    response = await solr.get("/select", params=params, query_class="stats")
+    with metrics.stage("json_decode"):
+        data = decode_json(response)
+
+    with metrics.stage("facet_reshape"):
+        trend = shape_trend(data.get("facets", {}), periods, values)
+    return {
+        "type": request.type,
+        "interval": request.interval,
+        "from_date": request.from_date,
+        "to_date": request.to_date,
+        **trend,
+    }
+
+
+@app.get("/suggest/{kind}")
+async def suggest_names(kind: SuggestType, q: str = "", limit: int = 10):
+    """
+    Typeahead suggestions: names with a word starting with q, most patents first
+    """
+    if not suggest:
+        raise HTTPException(status_code=404, detail="Suggestions are disabled")
+    if not suggest.ready(kind):
+        raise HTTPException(status_code=503, detail=f"The {kind} suggest index is still loading")
+
+    return {
+        "type": kind,
+        "q": q,
+        "suggestions": [
+            {"value": value, "count": count} for value, count in suggest.search(kind, q, limit)
+        ],
+    }
+
+
+@app.post("/resolve")
+async def resolve_names(request: ResolveNamesRequest):
+    """
+    Stored Solr values for each entered name, with similarity scores (1.0 = same normalized name)
+    """
+    index = suggest.resolver(request.type) if suggest else None
+    if index is None:
+        raise HTTPException(status_code=503, detail=f"The {request.type} entity index is not available")
+
+    min_score = ENTITY_MIN_SCORE if request.min_score is None else request.min_score
+    _, resolved = expand_names(index, request.names, min_score, max(1, min(request.limit, 100)))
+    return {"type": request.type, "min_score": min_score, "resolved": resolved}
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus text-format metrics
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/admin/cache/flush")
+async def flush_cache(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Drop every cached stats and /execute-query response and every stored rollup month,
+    e.g. after a Solr re-index. The rollups are filled again by the background refresh.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN")
+    if not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+    flushed = stats_cache.clear() + query_cache.clear()
+    rollup_months = await run_in_threadpool(rollup_store.clear) if rollup_store else 0
+    return {
+        "flushed": flushed,
+        "rollup_months": rollup_months,
+        "cache": stats_cache.stats(),
+        "query_cache": query_cache.stats(),
+    }
 
 if __name__ == "__main__":
     import uvicorn
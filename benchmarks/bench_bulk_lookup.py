@@ -0,0 +1,51 @@
+"""
+Bulk lookup benchmark: a portfolio of patent IDs fetched in concurrent chunks
+Usage: python -m benchmarks.bench_bulk_lookup [ids] [chunk_size] [concurrency]
+"""
+import asyncio
+import os
+import sys
+import time
+
+# The stub only holds STUB_SOLR_NUM_FOUND documents; size it for the portfolio
+os.environ.setdefault("STUB_SOLR_NUM_FOUND", "60000")
+
+from benchmarks.stub_solr import ID_OFFSET, start_in_thread  # noqa: E402
+from lookup.lookup import lookup_ids  # noqa: E402
+from solr_client.solr_client import SolrClient  # noqa: E402
+
+STUB_PORT = 18985
+BASE_URL = f"http://127.0.0.1:{STUB_PORT}"
+FL = "id,title,app_date,examiner"
+
+
+async def main(total, chunk_size, concurrency):
+    # Every tenth ID is outside the stub index, so not_found is exercised too
+    ids = [str(ID_OFFSET + i * 10 // 9) if i % 10 else f"X{i}" for i in range(total)]
+
+    solr = SolrClient(BASE_URL)
+    await solr.start()
+    try:
+        for method in ("terms", "get"):
+            start = time.perf_counter()
+            found, not_found, chunks = await lookup_ids(
+                solr, ids, method=method, fl=FL, chunk_size=chunk_size, concurrency=concurrency
+            )
+            elapsed = time.perf_counter() - start
+            print(
+                f"{method:<6} ids={total:<7} chunks={chunks:<5} found={len(found):<7} "
+                f"not_found={len(not_found):<6} {elapsed * 1000:8.1f}ms"
+            )
+    finally:
+        await solr.close()
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    server = start_in_thread(STUB_PORT)
+    try:
+        asyncio.run(main(total, chunk_size, concurrency))
+    finally:
+        server.should_exit = True
@@ -0,0 +1,310 @@
+"""
+Endpoint load test: drives every API route against the stub Solr
+Starts the stub and the app (uvicorn) as subprocesses, runs each scenario at each
+concurrency level, and reports throughput, latency percentiles, errors and the app's RSS
+Usage: python -m benchmarks.bench_endpoints [--requests N] [--concurrency 1,10,50]
+           [--only search,stats] [--latency-ms 5] [--payload-bytes 0]
+           [--save results.json] [--baseline results.json --max-regression 0.2]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_solr_client import percentile
+from benchmarks.stub_solr import ID_OFFSET
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUB_PORT = 18985
+APP_PORT = 18986
+STUB_URL = f"http://127.0.0.1:{STUB_PORT}"
+APP_URL = f"http://127.0.0.1:{APP_PORT}"
+
+SELECT_URL = f"{STUB_URL}/select?q=examiner:%22examiner%201%22&rows=50&wt=json"
+EXPORT_URL = f"{STUB_URL}/select?q=*:*&wt=json"
+# Seconds between status polls of an export job scenario
+JOB_POLL_INTERVAL = 0.05
+# Makes every export job submission distinct, so none is deduplicated into an earlier job
+JOB_SEQUENCE = itertools.count()
+RESULTS = [
+    {"id": str(ID_OFFSET + i), "title": f"Synthetic patent application {i}", "gau": ["3600"]}
+    for i in range(200)
+]
+
+
+def date_window(i):
+    # A different window per request, so the stats cache mostly misses
+    year = 2010 + i % 15
+    return {"from_date": f"{year}-01-01", "to_date": f"{year}-{1 + i % 12:02d}-28"}
+
+
+def patent_ids(count, i=0):
+    return [str(ID_OFFSET + (i * 7 + n) % 1000) for n in range(count)]
+
+
+# (name, method, path, body(i) or None); the name prefix is the --only group.
+# Method "JOB" submits an export job to path, polls its status and downloads the file
+SCENARIOS = [
+    ("search/patent", "POST", "/search/patent",
+     lambda i: {"patent_ids": patent_ids(10, i), "profile": "card", "include_raw": False}),
+    ("search/patent/bulk", "POST", "/search/patent/bulk",
+     lambda i: {"patent_ids": patent_ids(1000, i), "profile": "card", "include_raw": False}),
+    ("search/patent/bulk (get)", "POST", "/search/patent/bulk",
+     lambda i: {"patent_ids": patent_ids(1000, i), "method": "get", "profile": "card",
+                "include_raw": False}),
+    ("search/examiner", "POST", "/search/examiner",
+     lambda i: {"examiners": [f"examiner {i % 50}"], "search_type": "latest_filed",
+                "limit": 50, "profile": "card", "include_raw": False}),
+    ("search/examiner+facets", "POST", "/search/examiner",
+     lambda i: {"examiners": [f"examiner {i % 50}"], "search_type": "latest_filed",
+                "limit": 50, "profile": "card", "include_raw": False, "facets": True}),
+    ("search/prosecutor", "POST", "/search/prosecutor",
+     lambda i: {"prosecutors": [f"attorney {i % 80}"], "limit": 50,
+                "profile": "card", "include_raw": False}),
+    ("search/gau", "POST", "/search/gau",
+     lambda i: {"gaus": [str(3600 + i % 90)], "limit": 50, "profile": "card", "include_raw": False}),
+    ("search/batch", "POST", "/search/batch",
+     lambda i: {"profile": "card", "include_raw": False, "queries": [
+         {"type": "patent", "values": patent_ids(5, i)},
+         {"type": "examiner", "values": [f"examiner {i % 50}"], "limit": 20},
+         {"type": "lawfirm", "values": [f"law firm {i % 30}"], "limit": 20},
+         {"type": "gau", "values": [str(3600 + i % 90)], "limit": 20},
+     ]}),
+    ("build/patent-query", "POST", "/build/patent-query",
+     lambda i: {"patent_ids": patent_ids(10, i)}),
+    ("build/examiner-query", "POST", "/build/examiner-query",
+     lambda i: {"examiners": [f"examiner {i % 50}"], "search_type": "last_10_years"}),
+    ("build/lawfirm-query", "POST", "/build/lawfirm-query",
+     lambda i: {"lawfirms": [f"law firm {i % 30}"], "search_type": "latest_10_approved"}),
+    ("build/prosecutor-query", "POST", "/build/prosecutor-query",
+     lambda i: {"prosecutors": [f"attorney {i % 80}"]}),
+    ("build/attorney-query", "POST", "/build/attorney-query",
+     lambda i: {"attorneys": [f"attorney {i % 80}"]}),
+    ("build/gau-query", "POST", "/build/gau-query",
+     lambda i: {"gaus": [str(3600 + i % 90)]}),
+    ("build/advanced-query", "POST", "/build/advanced-query",
+     lambda i: {"filters": [{"field": "examiner", "operator": "equals", "value": f"examiner {i % 50}"}],
+                "limit": 20}),
+    ("execute-query", "POST", "/execute-query",
+     lambda i: {"solr_query_url": SELECT_URL}),
+    ("execute-query/stream", "POST", "/execute-query/stream",
+     lambda i: {"solr_query_url": SELECT_URL}),
+    ("stats/total", "GET", "/stats/total", None),
+    ("stats/by-date-range", "POST", "/stats/by-date-range",
+     lambda i: {"type": "examiner", "limit": 20, **date_window(i)}),
+    ("stats/by-date-range (cached)", "POST", "/stats/by-date-range",
+     lambda i: {"type": "lawfirm", "limit": 20, "from_date": "2015-01-01", "to_date": "2020-12-31"}),
+    ("stats/examiners-by-date", "POST", "/stats/examiners-by-date",
+     lambda i: {"limit": 10, "gau_limit": 20, "cpc_limit": 20, **date_window(i)}),
+    ("stats/trend", "POST", "/stats/trend",
+     lambda i: {"type": "examiner", "values": [f"examiner {i % 50}", f"examiner {(i + 1) % 50}"],
+                "interval": "month", **date_window(i)}),
+    ("suggest", "GET", "/suggest/examiner?q=exam&limit=10", None),
+    ("download/json", "POST", "/download/json",
+     lambda i: {"results": RESULTS}),
+    ("download/excel", "POST", "/download/excel",
+     lambda i: {"results": RESULTS}),
+    ("download/json/query", "POST", "/download/json/query",
+     lambda i: {"solr_query_url": EXPORT_URL, "max_rows": 1000}),
+    ("download/excel/query", "POST", "/download/excel/query",
+     lambda i: {"solr_query_url": EXPORT_URL, "max_rows": 1000}),
+    ("download/parquet/query", "POST", "/download/parquet/query",
+     lambda i: {"solr_query_url": EXPORT_URL, "max_rows": 1000}),
+    ("download/arrow/query", "POST", "/download/arrow/query",
+     lambda i: {"solr_query_url": EXPORT_URL, "max_rows": 1000}),
+    ("export/jobs", "JOB", "/export/jobs",
+     lambda i: {"solr_query_url": f"{EXPORT_URL}&fq=-id:job{next(JOB_SEQUENCE)}",
+                "format": "csv", "max_rows": 1000}),
+]
+
+
+def rss_kib(pid):
+    """
+    (current RSS, peak RSS) of a process in KiB, from /proc; (None, None) elsewhere.
+    """
+    values = {}
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    values[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return values.get("VmRSS"), values.get("VmHWM")
+
+
+def start_process(args, env, ready_url, timeout=30.0):
+    process = subprocess.Popen(args, cwd=ROOT, env={**os.environ, **env})
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{args} exited with {process.returncode}")
+        try:
+            httpx.get(ready_url, timeout=1.0)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{args} did not start within {timeout}s")
+
+
+async def send(client, scenario, i):
+    """
+    One scenario request; for an export job the final download, after its status polls.
+    """
+    name, method, path, body = scenario
+    if method != "JOB":
+        return await client.request(method, path, json=body(i) if body else None)
+    response = await client.post(path, json=body(i))
+    if response.status_code >= 400:
+        return response
+    job_url = f"{path}/{response.json()['job_id']}"
+    while response.json()["status"] in ("queued", "running"):
+        await asyncio.sleep(JOB_POLL_INTERVAL)
+        response = await client.get(job_url)
+        if response.status_code >= 400:
+            return response
+    return await client.get(f"{job_url}/download")
+
+
+async def run_scenario(client, scenario, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await send(client, scenario, i)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+    return {
+        "rps": total / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "errors": errors,
+    }
+
+
+async def run_all(scenarios, total, levels, app_pid):
+    results = {}
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=APP_URL, limits=limits, timeout=120.0) as client:
+        for scenario in scenarios:
+            name = scenario[0]
+            warmup = await send(client, scenario, 0)
+            if warmup.status_code == 501:
+                print(f"{name:<30} skipped: {warmup.json().get('detail')}")
+                continue
+            results[name] = {}
+            for concurrency in levels:
+                row = await run_scenario(client, scenario, total, concurrency)
+                row["rss_kib"], _ = rss_kib(app_pid)
+                results[name][str(concurrency)] = row
+                rss = f"{row['rss_kib'] / 1024:7.1f}MiB" if row["rss_kib"] else "      n/a"
+                print(
+                    f"{name:<30} c={concurrency:<4} rps={row['rps']:8.1f} "
+                    f"p50={row['p50']:8.2f}ms p95={row['p95']:8.2f}ms p99={row['p99']:8.2f}ms "
+                    f"errors={row['errors']:<4} rss={rss}"
+                )
+    return results
+
+
+def compare(results, baseline, max_regression):
+    """
+    Regressions against a saved run: p95 slower or throughput lower by more than max_regression.
+    """
+    regressions = []
+    for name, levels in results.items():
+        for concurrency, row in levels.items():
+            before = baseline.get(name, {}).get(concurrency)
+            if not before:
+                continue
+            if row["p95"] > before["p95"] * (1 + max_regression):
+                regressions.append(f"{name} c={concurrency}: p95 {before['p95']:.2f}ms -> {row['p95']:.2f}ms")
+            if row["rps"] < before["rps"] * (1 - max_regression):
+                regressions.append(f"{name} c={concurrency}: rps {before['rps']:.1f} -> {row['rps']:.1f}")
+            if row["errors"] > before["errors"]:
+                regressions.append(f"{name} c={concurrency}: errors {before['errors']} -> {row['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and level")
+    parser.add_argument("--concurrency", default="1,10,50", help="comma-separated levels")
+    parser.add_argument("--only", default="", help="comma-separated scenario name prefixes")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="stub Solr latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="stub Solr latency jitter")
+    parser.add_argument("--payload-bytes", type=int, default=0, help="extra abstract text per doc")
+    parser.add_argument("--num-found", type=int, default=1000, help="stub Solr result count")
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare against a saved run; exit 1 on regression")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(",")]
+    prefixes = [p for p in args.only.split(",") if p]
+    scenarios = [s for s in SCENARIOS if not prefixes or s[0].startswith(tuple(prefixes))]
+
+    stub_env = {
+        "STUB_SOLR_LATENCY_MS": str(args.latency_ms),
+        "STUB_SOLR_JITTER_MS": str(args.jitter_ms),
+        "STUB_SOLR_PAYLOAD_BYTES": str(args.payload_bytes),
+        "STUB_SOLR_NUM_FOUND": str(args.num_found),
+    }
+    with tempfile.TemporaryDirectory() as job_dir:
+        # Every export job scenario request comes from the same (anonymous) user
+        app_env = {"SOLR_BASE_URL": STUB_URL, "EXPORT_JOB_DIR": job_dir, "EXPORT_JOB_PER_USER": "100000"}
+        stub = start_process(
+            [sys.executable, "-m", "uvicorn", "benchmarks.stub_solr:app", "--host", "127.0.0.1",
+             "--port", str(STUB_PORT), "--log-level", "warning"],
+            stub_env, f"{STUB_URL}/select",
+        )
+        try:
+            app = start_process(
+                [sys.executable, "-m", "uvicorn", "app_advanced:app", "--host", "127.0.0.1",
+                 "--port", str(APP_PORT), "--log-level", "warning"],
+                app_env, f"{APP_URL}/",
+            )
+            try:
+                print(f"app rss at start: {(rss_kib(app.pid)[0] or 0) / 1024:.1f}MiB")
+                results = asyncio.run(run_all(scenarios, args.requests, levels, app.pid))
+                peak = rss_kib(app.pid)[1]
+                print(f"app peak rss: {peak / 1024:.1f}MiB" if peak else "app peak rss: n/a")
+            finally:
+                app.terminate()
+                app.wait()
+        finally:
+            stub.terminate()
+            stub.wait()
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Entity resolution benchmark: EntityIndex build time, resident size and resolve latency
+for names entered as users type them: other case and punctuation, or missing a letter
+Usage: python -m benchmarks.bench_entities [value counts...]
+"""
+import os
+import random
+import sys
+import time
+
+from benchmarks.bench_endpoints import rss_kib
+from benchmarks.bench_suggest import make_names, percentile
+from entities.entities import EntityIndex
+
+LOOKUPS = 5000
+
+
+def variant(name, rng):
+    if rng.random() < 0.5:
+        return name.lower().replace(".", "").replace("&", "and")
+    i = rng.randrange(len(name))
+    return name[:i] + name[i + 1:]
+
+
+def main(sizes, min_score=0.85):
+    rng = random.Random(1)
+    for size in sizes:
+        items = make_names(size)
+        before, _ = rss_kib(os.getpid())
+        start = time.perf_counter()
+        index = EntityIndex(items)
+        build = time.perf_counter() - start
+        after, _ = rss_kib(os.getpid())
+        resident = f"{(after - before) / 1024:.0f}MiB" if before else "n/a"
+
+        names = [variant(rng.choice(items)[0], rng) for _ in range(LOOKUPS)]
+        samples = []
+        matched = 0
+        for name in names:
+            start = time.perf_counter()
+            matched += bool(index.resolve(name, min_score))
+            samples.append(time.perf_counter() - start)
+        samples.sort()
+
+        print(
+            f"values={size} keys={len(index.keys)} build={build:.1f}s index_rss={resident}  "
+            f"matched={matched / LOOKUPS:.0%} p50={percentile(samples, 0.5) * 1e3:.2f}ms "
+            f"p99={percentile(samples, 0.99) * 1e3:.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [10000, 100000, 300000])
@@ -0,0 +1,70 @@
+"""
+Export format benchmark: xlsx vs Parquet for the same synthetic patent rows
+Reports write time, file size and pandas load time per format
+Usage: python -m benchmarks.bench_export_formats [rows] [page_size]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.stub_solr import make_doc
+from exports.arrow import ARROW_AVAILABLE, ParquetStreamWriter
+from exports.csv_stream import CsvStreamWriter
+from exports.excel import XlsxStreamWriter
+
+COLUMNS = [
+    "id",
+    "title",
+    "app_date",
+    "app_date_year",
+    "disposal_type",
+    "examiner",
+    "law_firm",
+    "all_attorney_names",
+    "gau",
+    "cpc_classification",
+]
+
+FORMATS = [
+    ("xlsx", XlsxStreamWriter, pd.read_excel),
+    ("csv", CsvStreamWriter, pd.read_csv),
+]
+if ARROW_AVAILABLE:
+    FORMATS.append(("parquet", ParquetStreamWriter, pd.read_parquet))
+
+
+def main(rows, page_size):
+    pages = [
+        [make_doc(i) for i in range(start, min(start + page_size, rows))]
+        for start in range(0, rows, page_size)
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        for name, writer_class, reader in FORMATS:
+            path = os.path.join(directory, f"export.{name}")
+
+            start = time.perf_counter()
+            writer = writer_class(path, COLUMNS)
+            for docs in pages:
+                writer.append(docs)
+            writer.close()
+            write_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            frame = reader(path)
+            read_ms = (time.perf_counter() - start) * 1000
+
+            print(
+                f"{name:<8} rows={len(frame):<7} size={os.path.getsize(path) / 1024:9.1f}KiB "
+                f"write={write_ms:9.1f}ms read={read_ms:9.1f}ms"
+            )
+    if not ARROW_AVAILABLE:
+        print("parquet  skipped: pyarrow is not installed")
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    main(rows, page_size)
@@ -0,0 +1,78 @@
+"""
+Solr response decode benchmark: json vs orjson vs the incremental doc parser
+Reports decode time and peak Python heap (tracemalloc) per page size for a
+synthetic /select body delivered in 64KB network chunks
+Usage: python -m benchmarks.bench_json_decode [page sizes...]
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from benchmarks.stub_solr import make_doc
+from solr_client.streaming import SolrDocStream
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CHUNK_SIZE = 64 * 1024
+
+
+def solr_body(rows):
+    return json.dumps({
+        "responseHeader": {"status": 0, "QTime": 3, "params": {"q": "*:*", "rows": str(rows)}},
+        "response": {"numFound": rows, "start": 0, "docs": [make_doc(i) for i in range(rows)]},
+    }).encode()
+
+
+def buffered(decode):
+    def run(body):
+        # response.json(): join the chunks, then decode the whole tree
+        chunks = [body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)]
+        count = 0
+        for _ in decode(b"".join(chunks))["response"]["docs"]:
+            count += 1
+        return count
+    return run
+
+
+def streamed(body):
+    # Each doc is handled and dropped as soon as its chunk arrives
+    parser = SolrDocStream()
+    count = 0
+    for i in range(0, len(body), CHUNK_SIZE):
+        count += len(parser.feed(body[i:i + CHUNK_SIZE]))
+    parser.close()
+    return count
+
+
+def measure(fn, body):
+    start = time.perf_counter()
+    count = fn(body)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    fn(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, seconds, peak
+
+
+def main(page_sizes):
+    decoders = [("json", buffered(json.loads))]
+    if orjson is not None:
+        decoders.append(("orjson", buffered(orjson.loads)))
+    decoders.append(("streamed", streamed))
+
+    for rows in page_sizes:
+        body = solr_body(rows)
+        print(f"rows={rows} body={len(body) / 1024:.0f}KiB")
+        for name, fn in decoders:
+            count, seconds, peak = measure(fn, body)
+            assert count == rows, (name, count)
+            print(f"  {name:<9} {seconds * 1000:8.1f}ms  peak={peak / 1024:8.0f}KiB")
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [100, 1000, 10000, 50000])
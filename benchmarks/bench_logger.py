@@ -0,0 +1,87 @@
+"""
+Logger micro-benchmark: per-record cost of sanitization and of a logger.error call
+Compares the previous implementation (8 re.sub passes per message and per arg,
+synchronous RotatingFileHandler) with the current one (single precompiled
+alternation with a substring pre-check, QueueHandler / QueueListener)
+Usage: python -m benchmarks.bench_logger [records]
+"""
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+import traceback
+from logging.handlers import RotatingFileHandler
+
+from logger.logger import SENSITIVE_PATTERNS, sanitize_message, setup_logger, stop_logging
+
+CLEAN = "Solr request failed for examiner query q=examiner:\"john smith\" rows=10 " * 4
+DIRTY = 'payload {"password": "hunter2", "token": "abc"} Authorization: Bearer abc.def.ghi ' * 2
+
+
+def legacy_sanitize(message):
+    """The previous sanitize_message: patterns rebuilt and re.sub'd one by one."""
+    if not isinstance(message, str):
+        message = str(message)
+    for _, pattern, replacement in SENSITIVE_PATTERNS:
+        message = re.sub(pattern, replacement, message, flags=re.IGNORECASE)
+    return message
+
+
+class LegacyFilter(logging.Filter):
+    def filter(self, record):
+        if record.msg:
+            record.msg = legacy_sanitize(record.msg)
+        if record.args:
+            record.args = tuple(legacy_sanitize(str(arg)) for arg in record.args)
+        return True
+
+
+def legacy_logger(path):
+    handler = RotatingFileHandler(path, maxBytes=10 * 1024 * 1024, backupCount=5)
+    handler.addFilter(LegacyFilter())
+    handler.setFormatter(logging.Formatter(
+        "%(asctime)s | %(levelname)s | %(name)s:%(funcName)s:%(lineno)d | %(message)s"
+    ))
+    logger = logging.getLogger("bench.legacy")
+    logger.handlers = [handler]
+    logger.setLevel(logging.ERROR)
+    logger.propagate = False
+    return logger
+
+
+def per_call_us(fn, records):
+    start = time.perf_counter()
+    for _ in range(records):
+        fn()
+    return (time.perf_counter() - start) / records * 1e6
+
+
+def traceback_text():
+    try:
+        raise RuntimeError("Solr returned 500")
+    except RuntimeError:
+        return traceback.format_exc()
+
+
+def main(records):
+    print("sanitize_message (per message)")
+    for name, message in (("clean", CLEAN), ("sensitive", DIRTY)):
+        before = per_call_us(lambda: legacy_sanitize(message), records)
+        after = per_call_us(lambda: sanitize_message(message), records)
+        print(f"  {name:<10} before={before:7.2f}us after={after:7.2f}us")
+
+    print("logger.error (time spent in the calling coroutine)")
+    message = traceback_text()
+    with tempfile.TemporaryDirectory() as directory:
+        legacy = legacy_logger(os.path.join(directory, "legacy.txt"))
+        before = per_call_us(lambda: legacy.error(message), records)
+        current = setup_logger(logging_enabled=True, log_filename=os.path.join(directory, "current.txt"))
+        after = per_call_us(lambda: current.error(message), records)
+        stop_logging()
+        print(f"  traceback  before={before:7.2f}us after={after:7.2f}us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,81 @@
+"""
+Load benchmark: per-request httpx.AsyncClient vs the shared pooled SolrClient
+Usage: python -m benchmarks.bench_solr_client [requests] [concurrency]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+
+from benchmarks.stub_solr import start_in_thread
+from solr_client.solr_client import SolrClient
+
+STUB_PORT = 18983
+BASE_URL = f"http://127.0.0.1:{STUB_PORT}"
+PARAMS = {"q": "*:*", "rows": 10, "wt": "json"}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(call, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+async def per_request_client():
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        response = await client.get(f"{BASE_URL}/select", params=PARAMS)
+        response.raise_for_status()
+        response.json()
+
+
+def report(name, latencies, elapsed):
+    print(
+        f"{name:<22} n={len(latencies):<6} "
+        f"p50={statistics.median(latencies):7.2f}ms "
+        f"p99={percentile(latencies, 99):7.2f}ms "
+        f"rps={len(latencies) / elapsed:8.1f}"
+    )
+
+
+async def main(total, concurrency):
+    report("per-request client", *await run(per_request_client, total, concurrency))
+
+    solr = SolrClient(BASE_URL)
+    await solr.start()
+
+    async def pooled():
+        response = await solr.get("/select", params=PARAMS)
+        response.json()
+
+    try:
+        report("shared SolrClient", *await run(pooled, total, concurrency))
+    finally:
+        await solr.close()
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    server = start_in_thread(STUB_PORT)
+    try:
+        asyncio.run(main(total, concurrency))
+    finally:
+        server.should_exit = True
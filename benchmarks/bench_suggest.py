@@ -0,0 +1,72 @@
+"""
+Typeahead suggest benchmark: PrefixIndex build time, resident size and lookup latency
+over synthetic "First Last" / firm names with Zipf-like document counts.
+Prefixes are 1-4 characters, the lengths a user has typed when suggestions matter
+Usage: python -m benchmarks.bench_suggest [value counts...]
+"""
+import os
+import random
+import sys
+import time
+
+from benchmarks.bench_endpoints import rss_kib
+from suggest.suggest import PrefixIndex
+
+FIRST = ["John", "Mary", "Wei", "Ana", "Rajesh", "Olga", "Kenji", "Fatima", "Luis", "Emma"]
+SUFFIX = ["LLP", "PC", "PLLC", "& Associates", "Law Group", "IP"]
+LOOKUPS = 20000
+
+
+def syllable(rng):
+    return rng.choice("bcdfghjklmnprstvwz") + rng.choice("aeiou") + rng.choice("lnrstkm")
+
+
+def make_names(count, seed=7):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        last = "".join(syllable(rng) for _ in range(rng.randint(1, 3))).title()
+        if rng.random() < 0.2:
+            names.add(f"{last} {rng.choice(SUFFIX)}")
+        else:
+            names.add(f"{rng.choice(FIRST)} {rng.choice('ABCDEFGHJKLMNPRSTW')}. {last}")
+    return [(name, int(10000 / (rank + 1)) + 1) for rank, name in enumerate(sorted(names))]
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def main(sizes):
+    rng = random.Random(1)
+    for size in sizes:
+        items = make_names(size)
+        before, _ = rss_kib(os.getpid())
+        start = time.perf_counter()
+        index = PrefixIndex(items)
+        build = time.perf_counter() - start
+        after, _ = rss_kib(os.getpid())
+        resident = f"{(after - before) / 1024:.0f}MiB" if before else "n/a"
+
+        prefixes = []
+        for _ in range(LOOKUPS):
+            name = rng.choice(items)[0]
+            word = rng.choice(name.split())
+            prefixes.append(word[:rng.randint(1, 4)])
+        samples = []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            index.search(prefix, 10)
+            samples.append(time.perf_counter() - start)
+        samples.sort()
+
+        print(
+            f"values={size} keys={len(index.keys)} precomputed={len(index.top)} "
+            f"build={build:.1f}s index_rss={resident}  "
+            f"p50={percentile(samples, 0.5) * 1e3:.3f}ms p99={percentile(samples, 0.99) * 1e3:.3f}ms "
+            f"max={samples[-1] * 1e3:.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [10000, 100000, 1000000])
@@ -0,0 +1,214 @@
+"""
+Local Solr stand-in for benchmarks
+Serves /select and /get with synthetic patent documents and json.facet responses,
+with configurable latency, latency jitter, result count and per-document payload size
+"""
+import asyncio
+import json
+import os
+import random
+import re
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI, Request
+
+STUB_LATENCY_MS = float(os.getenv("STUB_SOLR_LATENCY_MS", "5"))
+STUB_JITTER_MS = float(os.getenv("STUB_SOLR_JITTER_MS", "0"))
+STUB_NUM_FOUND = int(os.getenv("STUB_SOLR_NUM_FOUND", "1000"))
+# Extra characters of abstract text per document, to model larger stored fields
+STUB_PAYLOAD_BYTES = int(os.getenv("STUB_SOLR_PAYLOAD_BYTES", "0"))
+# Distinct values of every terms-faceted field; terms facets page through them with offset
+STUB_TERMS = int(os.getenv("STUB_SOLR_TERMS", "25"))
+
+ABSTRACT_WORDS = "a method and system for processing data in a networked device ".split()
+
+app = FastAPI(title="Stub Solr")
+
+
+ID_OFFSET = 16000000
+
+
+def make_doc(i):
+    doc = {
+        "id": f"{ID_OFFSET + i}",
+        "title": f"Synthetic patent application {i}",
+        "app_date": f"20{10 + i % 15}-0{1 + i % 9}-1{i % 9}T00:00:00Z",
+        "app_date_year": 2010 + i % 15,
+        "disposal_type": random.choice(["iss", "pend", "abn"]),
+        "examiner": f"examiner {i % 50}",
+        "law_firm": [f"law firm {i % 30}"],
+        "all_attorney_names": [f"attorney {i % 80}"],
+        "gau": [f"{3600 + i % 90}"],
+        "cpc_classification": [f"G06F{i % 20}/{i % 7}"],
+    }
+    if STUB_PAYLOAD_BYTES:
+        doc["abstract"] = make_abstract(i, STUB_PAYLOAD_BYTES)
+    return doc
+
+
+def make_abstract(i, size):
+    words = []
+    length = 0
+    while length < size:
+        word = ABSTRACT_WORDS[(i + len(words)) % len(ABSTRACT_WORDS)]
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+
+async def simulate_latency():
+    delay = STUB_LATENCY_MS
+    if STUB_JITTER_MS:
+        delay += random.uniform(0, STUB_JITTER_MS)
+    await asyncio.sleep(delay / 1000)
+
+
+def make_facets(spec):
+    """
+    Answer a json.facet request: counts for query facets, buckets for terms and range
+    facets, a number for aggregation strings such as "unique(gau)".
+    """
+    result = {"count": 1000}
+    for name, facet in spec.items():
+        if isinstance(facet, dict) and facet.get("type") == "query":
+            result[name] = {
+                **make_facets(facet.get("facet", {})),
+                "count": random.randint(0, 500),
+            }
+        elif isinstance(facet, dict) and facet.get("type") == "range":
+            result[name] = {"buckets": [
+                {"val": start, "count": random.randint(0, 50)}
+                for start in range_starts(facet["start"], facet["end"], facet["gap"])
+            ]}
+        elif isinstance(facet, dict) and facet.get("type") == "terms":
+            limit = facet.get("limit", 10)
+            offset = facet.get("offset", 0)
+            end = STUB_TERMS if limit == -1 else min(offset + limit, STUB_TERMS)
+            buckets = []
+            for i in range(offset, end):
+                bucket = {"val": f"{facet['field']} {i}", "count": 1000 // (i + 1)}
+                bucket.update(
+                    {k: v for k, v in make_facets(facet.get("facet", {})).items() if k != "count"}
+                )
+                buckets.append(bucket)
+            result[name] = {"buckets": buckets}
+            if facet.get("numBuckets"):
+                result[name]["numBuckets"] = STUB_TERMS
+            if facet.get("allBuckets"):
+                result[name]["allBuckets"] = {"count": sum(1000 // (i + 1) for i in range(STUB_TERMS))}
+        elif isinstance(facet, str):
+            result[name] = random.randint(1, 50)
+    return result
+
+
+def range_starts(start, end, gap):
+    """
+    Bucket start values of a date range facet; gap is +NDAY(S), +NMONTH(S) or +NYEAR(S).
+    """
+    amount, unit = re.fullmatch(r"\+(\d+)(DAY|MONTH|YEAR)S?", gap).groups()
+    amount = int(amount)
+    current = datetime.strptime(start, "%Y-%m-%dT%H:%M:%SZ")
+    last = datetime.strptime(end, "%Y-%m-%dT%H:%M:%SZ")
+    starts = []
+    while current < last:
+        starts.append(current.strftime("%Y-%m-%dT%H:%M:%SZ"))
+        if unit == "DAY":
+            current += timedelta(days=amount)
+        else:
+            months = current.month - 1 + amount * (12 if unit == "YEAR" else 1)
+            current = current.replace(year=current.year + months // 12, month=months % 12 + 1)
+    return starts
+
+
+def project(doc, query):
+    fl = [f.strip() for f in query.get("fl", "").split(",") if f.strip() and f.strip() != "*"]
+    return {k: v for k, v in doc.items() if k in fl} if fl else doc
+
+
+def docs_for_ids(ids):
+    """
+    Synthetic documents for the requested IDs that exist in the stub index.
+    """
+    docs = []
+    for pid in ids:
+        i = int(pid) - ID_OFFSET if pid.strip().isdigit() else -1
+        if 0 <= i < STUB_NUM_FOUND:
+            docs.append(make_doc(i))
+    return docs
+
+
+async def request_params(request):
+    """
+    Query-string params, merged with form params for POST requests.
+    """
+    params = dict(request.query_params)
+    if request.method == "POST":
+        params.update(await request.form())
+    return params
+
+
+@app.api_route("/get", methods=["GET", "POST"])
+@app.api_route("/solr/{core}/get", methods=["GET", "POST"])
+async def real_time_get(request: Request, core: str = ""):
+    await simulate_latency()
+    query = await request_params(request)
+    docs = [project(d, query) for d in docs_for_ids(query.get("ids", "").split(","))]
+    return {"response": {"numFound": len(docs), "start": 0, "docs": docs}}
+
+
+@app.api_route("/select", methods=["GET", "POST"])
+@app.api_route("/solr//select", methods=["GET", "POST"])
+@app.api_route("/solr/{core}/select", methods=["GET", "POST"])
+async def select(request: Request, core: str = ""):
+    await simulate_latency()
+    query = await request_params(request)
+    terms = re.match(r"\{!terms f=id\}(.*)", query.get("q", ""), re.S)
+    if terms:
+        docs = [project(d, query) for d in docs_for_ids(terms.group(1).split(","))]
+        return {
+            "responseHeader": {"status": 0, "QTime": int(STUB_LATENCY_MS)},
+            "response": {"numFound": len(docs), "start": 0, "docs": docs},
+        }
+
+    rows = int(query.get("rows", 10))
+    cursor = query.get("cursorMark")
+    if cursor is not None:
+        start = 0 if cursor == "*" else int(cursor)
+    else:
+        start = int(query.get("start", 0))
+
+    docs = [project(make_doc(i), query) for i in range(start, min(start + rows, STUB_NUM_FOUND))]
+
+    body = {
+        "responseHeader": {"status": 0, "QTime": int(STUB_LATENCY_MS)},
+        "response": {"numFound": STUB_NUM_FOUND, "start": start, "docs": docs},
+    }
+    if cursor is not None:
+        body["nextCursorMark"] = str(start + len(docs)) if docs else cursor
+    if "json.facet" in query:
+        body["facets"] = make_facets(json.loads(query["json.facet"]))
+    return body
+
+
+def start_in_thread(port):
+    """
+    Run the stub on 127.0.0.1:<port> in a daemon thread; returns the uvicorn server.
+    """
+    import threading
+    import time
+    import uvicorn
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("STUB_SOLR_PORT", "8983")))
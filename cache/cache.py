@@ -0,0 +1,223 @@
+"""
+Response caches
+In-process LRU cache, or a SQLite file shared by every worker process; both
+are bounded by entry count and approximate bytes, expire entries after a TTL and
+deduplicate concurrent identical requests (single flight, per process)
+"""
+import asyncio
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import closing
+
+from starlette.concurrency import run_in_threadpool
+
+CACHE_BACKENDS = ("memory", "sqlite")
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL,
+    stored_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_entries_stored_at ON cache_entries (stored_at);
+"""
+
+
+class ResponseCache:
+    """
+    Caches JSON-serializable endpoint results keyed by the canonical request.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, ttl=600.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._inflight = {}            # key -> asyncio.Future
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(namespace, payload):
+        """
+        Canonical cache key: namespace plus the request fields in sorted order.
+        """
+        return f"{namespace}:{json.dumps(payload, sort_keys=True, separators=(',', ':'))}"
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, size, value = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        size = len(json.dumps(value, separators=(",", ":"), default=str))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, size, value)
+        self._bytes += size
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    async def _load(self, key):
+        return self.get(key)
+
+    async def _store(self, key, value):
+        self.set(key, value)
+
+    def clear(self):
+        flushed = len(self._entries)
+        self._entries.clear()
+        self._bytes = 0
+        return flushed
+
+    async def get_or_compute(self, key, compute, cacheable=None):
+        """
+        Return (value, hit). Concurrent misses for the same key share one compute() call.
+        A value for which cacheable(value) is false is returned but not stored.
+        """
+        value = await self._load(key)
+        if value is not None:
+            self.hits += 1
+            return value, True
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            return await asyncio.shield(inflight), True
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            if cacheable is None or cacheable(value):
+                await self._store(key, value)
+            future.set_result(value)
+            return value, False
+        finally:
+            self._inflight.pop(key, None)
+            if not future.done():
+                future.cancel()
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "inflight": len(self._inflight),
+        }
+
+
+class SqliteResponseCache(ResponseCache):
+    """
+    ResponseCache stored in a SQLite file, so a result computed by one worker process
+    is served by all of them. Eviction drops the oldest-stored entries first, which
+    keeps reads free of writes. Database calls run on a worker thread.
+    """
+
+    def __init__(self, path, max_entries=256, max_bytes=64 * 1024 * 1024, ttl=600.0):
+        super().__init__(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+        self.path = str(path)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SQLITE_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        # WAL without an fsync per commit; a crash can only lose recent cache entries
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def get(self, key):
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT value FROM cache_entries WHERE key = ? AND expires_at >= ?",
+                (key, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value):
+        encoded = json.dumps(value, separators=(",", ":"), default=str)
+        size = len(encoded)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?)",
+                (key, now + self.ttl, now, size, encoded),
+            )
+            count, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries"
+            ).fetchone()
+            for old_key, old_size in conn.execute(
+                "SELECT key, size FROM cache_entries ORDER BY stored_at"
+            ).fetchall():
+                if count <= self.max_entries and total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM cache_entries WHERE key = ?", (old_key,))
+                count -= 1
+                total -= old_size
+
+    async def _load(self, key):
+        return await run_in_threadpool(self.get, key)
+
+    async def _store(self, key, value):
+        await run_in_threadpool(self.set, key, value)
+
+    def clear(self):
+        with closing(self._connect()) as conn, conn:
+            return conn.execute("DELETE FROM cache_entries").rowcount
+
+    def stats(self):
+        with closing(self._connect()) as conn:
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries"
+            ).fetchone()
+        # hits / misses / inflight count this worker process only
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "inflight": len(self._inflight),
+        }
+
+
+def make_cache(backend="memory", path=None, **options):
+    """
+    Build the cache for a backend name: "memory" (per process) or "sqlite" (shared).
+    """
+    if backend == "sqlite":
+        return SqliteResponseCache(path, **options)
+    if backend == "memory":
+        return ResponseCache(**options)
+    raise ValueError(f"Unknown cache backend {backend!r}; expected one of {CACHE_BACKENDS}")
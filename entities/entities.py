@@ -0,0 +1,162 @@
+"""
+Entity name resolution
+Maps a user-entered examiner / law firm / attorney name to the distinct values
+Solr actually holds for it. Values are grouped under a normalized key (case,
+accents, punctuation, "&", legal suffixes and word order removed), and keys are
+matched fuzzily through a character trigram index scored by Dice similarity.
+"""
+import heapq
+import math
+import re
+import unicodedata
+from array import array
+from collections import Counter
+
+# Tokens that never distinguish two names
+STOP_TOKENS = {"and", "the", "of"}
+# Legal-form suffixes, compared after punctuation is removed (l.l.p. -> llp)
+LEGAL_SUFFIXES = {
+    "llp", "lllp", "llc", "pllc", "pc", "pa", "plc", "lp", "ltd", "inc", "co", "corp",
+    "esq", "gmbh", "ag", "sa", "bv", "kk",
+}
+
+PUNCTUATION_RE = re.compile(r"[^\w\s]")
+DOTTED_RE = re.compile(r"\b(?:\w\.){2,}")
+GRAM_SIZE = 3
+# Extra postings lists read per lookup to prune candidates (see EntityIndex._candidates)
+CANDIDATE_SLACK = 2
+
+
+def name_key(name):
+    """
+    Normalized form shared by every spelling of a name:
+    "Smith & Jones, L.L.P." and "jones and smith llp" both give "jones smith".
+    """
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    text = text.replace("&", " and ")
+    text = DOTTED_RE.sub(lambda m: m.group(0).replace(".", ""), text)
+    tokens = PUNCTUATION_RE.sub(" ", text).split()
+    kept = [t for t in tokens if t not in STOP_TOKENS and t not in LEGAL_SUFFIXES]
+    return " ".join(sorted(kept or tokens))
+
+
+def grams(key):
+    padded = f" {key} "
+    return {padded[i:i + GRAM_SIZE] for i in range(len(padded) - GRAM_SIZE + 1)}
+
+
+def dice(a, b):
+    return 2 * len(a & b) / (len(a) + len(b)) if a or b else 0.0
+
+
+def shape(key):
+    """
+    What a fuzzy match must keep: the token count and every token with a digit.
+    Typos are tolerated inside words, but "john smith" never becomes "john a smith"
+    and "examiner 3" never becomes "examiner 13".
+    """
+    tokens = key.split()
+    return len(tokens), sorted(t for t in tokens if any(c.isdigit() for c in t))
+
+
+class EntityIndex:
+    """
+    Distinct values of one field grouped by name_key, with a trigram -> key postings index.
+    Immutable once built.
+    """
+
+    def __init__(self, items):
+        self.values = []
+        self.counts = array("I")
+        self.keys = []
+        self.key_values = []
+        key_ids = {}
+        for value, count in items:
+            key = name_key(value)
+            if not key:
+                continue
+            key_id = key_ids.get(key)
+            if key_id is None:
+                key_id = key_ids[key] = len(self.keys)
+                self.keys.append(key)
+                self.key_values.append([])
+            self.key_values[key_id].append(len(self.values))
+            self.values.append(str(value))
+            self.counts.append(min(int(count), 0xFFFFFFFF))
+        self.key_ids = key_ids
+
+        postings = {}
+        for key_id, key in enumerate(self.keys):
+            for gram in grams(key):
+                postings.setdefault(gram, []).append(key_id)
+        self.postings = {gram: array("I", ids) for gram, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.values)
+
+    def _candidates(self, query_grams, min_score):
+        """
+        Keys that can reach min_score. A key scoring >= t shares at least
+        m = ceil(t * |Q| / (2 - t)) grams with the query, so among the query's k rarest
+        grams it has at least m - (|Q| - k). Only those k postings lists are read; k is
+        the minimum |Q| - m + 1 plus CANDIDATE_SLACK, which raises the required hit count
+        and leaves far fewer candidates to score.
+        """
+        needed = math.ceil(min_score * len(query_grams) / (2 - min_score))
+        rarest = sorted(query_grams, key=lambda g: len(self.postings.get(g, ())))
+        scanned = min(len(rarest), len(rarest) - needed + 1 + CANDIDATE_SLACK)
+        required = max(1, needed - (len(rarest) - scanned))
+        hits = Counter()
+        for gram in rarest[:scanned]:
+            hits.update(self.postings.get(gram, ()))
+        return [key_id for key_id, count in hits.items() if count >= required]
+
+    def resolve(self, name, min_score=0.85, limit=20):
+        """
+        [(value, score)] for the stored values matching a name, best first; score 1.0 is
+        an exact match of the normalized key, lower scores are same-shape near misses.
+        Ties go to the value with more documents.
+        """
+        key = name_key(name)
+        if not key:
+            return []
+        scored = Counter()
+        exact = self.key_ids.get(key)
+        if exact is not None:
+            scored[exact] = 1.0
+        if min_score < 1.0:
+            query_grams = grams(key)
+            query_shape = shape(key)
+            for key_id in self._candidates(query_grams, min_score):
+                if key_id == exact:
+                    continue
+                score = dice(query_grams, grams(self.keys[key_id]))
+                if score >= min_score and shape(self.keys[key_id]) == query_shape:
+                    scored[key_id] = score
+
+        matches = (
+            (round(score, 3), self.counts[p], self.values[p])
+            for key_id, score in scored.items()
+            for p in self.key_values[key_id]
+        )
+        return [(value, score) for score, _, value in heapq.nlargest(limit, matches)]
+
+
+def expand_names(index, names, min_score=0.85, limit=20):
+    """
+    The names plus every stored value each one resolves to, and the per-name matches
+    ({name: [{"value", "score"}]}) to report back. The entered names are always kept,
+    so resolution only ever widens a search.
+    """
+    expanded = []
+    resolved = {}
+    for name in names:
+        name = str(name).strip()
+        if not name:
+            continue
+        matches = index.resolve(name, min_score, limit)
+        resolved[name] = [{"value": value, "score": score} for value, score in matches]
+        expanded.append(name)
+        expanded.extend(value for value, _ in matches)
+    return expanded, resolved
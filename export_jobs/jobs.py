@@ -0,0 +1,407 @@
+"""
+Background export jobs
+Submitted exports run on a bounded worker pool that pages through Solr and
+writes the file to local disk. Jobs report progress, identical submissions
+share one artifact, and finished files expire after a TTL. Job state is kept in
+a JSON record next to the file, so every worker process sharing the directory
+can report on, deduplicate and serve any job.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import socket
+import threading
+import time
+import traceback
+import uuid
+
+from starlette.concurrency import run_in_threadpool
+
+from exports.arrow import ARROW_AVAILABLE, PARQUET_MEDIA_TYPE, ParquetStreamWriter
+from exports.csv_stream import CSV_MEDIA_TYPE, CsvStreamWriter
+from exports.excel import XLSX_MEDIA_TYPE, XlsxStreamWriter
+from exports.json_stream import NDJSON_MEDIA_TYPE, NdjsonFileWriter
+from solr_client.solr_client import decode_json
+
+# format -> (writer class, file extension, media type)
+JOB_FORMATS = {
+    "xlsx": (XlsxStreamWriter, "xlsx", XLSX_MEDIA_TYPE),
+    "csv": (CsvStreamWriter, "csv", CSV_MEDIA_TYPE),
+    "ndjson": (NdjsonFileWriter, "ndjson", NDJSON_MEDIA_TYPE),
+}
+if ARROW_AVAILABLE:
+    JOB_FORMATS["parquet"] = (ParquetStreamWriter, "parquet", PARQUET_MEDIA_TYPE)
+
+ACTIVE_STATES = ("queued", "running")
+
+RECORD_SUFFIX = ".job.json"
+JOB_ID_RE = re.compile(r"[0-9a-f]{32}")
+HOSTNAME = socket.gethostname()
+
+
+class ExportLimitError(Exception):
+    """
+    Raised when a user already has the maximum number of active export jobs.
+    """
+
+
+class ExportJob:
+    def __init__(self, key, user, fmt, params, columns, max_rows, page_size):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.user = user
+        self.format = fmt
+        self.params = params
+        self.columns = columns
+        self.max_rows = max_rows
+        self.page_size = page_size
+        self.status = "queued"
+        self.total = None
+        self.rows_written = 0
+        self.path = None
+        self.size = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        # host:pid of the worker process running the job
+        self.owner = f"{HOSTNAME}:{os.getpid()}"
+
+    @property
+    def media_type(self):
+        return JOB_FORMATS[self.format][2]
+
+    @property
+    def filename(self):
+        return f"patent_export_{self.id[:8]}.{JOB_FORMATS[self.format][1]}"
+
+    def to_dict(self):
+        progress = None
+        if self.total:
+            progress = round(min(self.rows_written / self.total, 1.0), 4)
+        elif self.status == "done":
+            progress = 1.0
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "format": self.format,
+            "rows_written": self.rows_written,
+            "total": self.total,
+            "progress": progress,
+            "size": self.size,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    def to_record(self):
+        return {
+            **self.to_dict(),
+            "key": self.key,
+            "user": self.user,
+            "path": self.path,
+            "owner": self.owner,
+        }
+
+    @classmethod
+    def from_record(cls, record):
+        """
+        Read-only view of a job stored by any worker; params are not kept in the record.
+        """
+        job = cls(record["key"], record["user"], record["format"], None, None, None, None)
+        job.id = record["job_id"]
+        for name in ("status", "total", "rows_written", "path", "size", "error",
+                     "created_at", "finished_at", "owner"):
+            setattr(job, name, record[name])
+        return job
+
+
+def job_key(params, fmt, columns, max_rows):
+    """
+    Identity of an export: the same query, format, columns and row cap give the same file.
+    """
+    payload = json.dumps(
+        [sorted([str(k), str(v)] for k, v in params), fmt, columns, max_rows],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def owner_alive(owner):
+    """
+    False only when the owning process is known to be gone (same host, no such pid).
+    """
+    host, _, pid = owner.rpartition(":")
+    if host != HOSTNAME or os.name == "nt":
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (OSError, ValueError):
+        return True
+    return True
+
+
+class ExportJobManager:
+    """
+    Job queue and worker pool for this process. Files and job records live under
+    `directory`, which worker processes may share.
+    """
+
+    def __init__(self, solr, directory, workers=2, ttl=3600.0, per_user_limit=2):
+        self.solr = solr
+        self.directory = str(directory)
+        self.workers = workers
+        self.ttl = ttl
+        self.per_user_limit = per_user_limit
+        # Jobs run by this process; other workers' jobs are read from their records
+        self.jobs = {}
+        # Optional callable(job, formatted traceback) run when a job fails
+        self.on_error = None
+        self._queue = None
+        self._tasks = []
+
+    async def start(self):
+        await run_in_threadpool(self._clean_directory)
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweeper()))
+
+    async def close(self):
+        # A cancellation that lands while a thread call or Solr request is finishing
+        # can be lost; cancel again until every task has stopped
+        pending = set(self._tasks)
+        while pending:
+            for task in pending:
+                task.cancel()
+            _, pending = await asyncio.wait(pending, timeout=1.0)
+        self._tasks = []
+
+    async def get(self, job_id):
+        """
+        A job run by any worker, or None once it has expired. Another worker's record is
+        read in a worker thread; expired jobs are deleted by the periodic sweep.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            job = await run_in_threadpool(self._load, job_id)
+        if job is None or self._expired(job, time.time()):
+            return None
+        return job
+
+    async def submit(self, params, fmt, columns, max_rows=None, page_size=1000, user="anonymous"):
+        """
+        Queue an export, or return the live job that already produces the same file.
+        Returns (job, deduplicated).
+        """
+        key = job_key(params, fmt, columns, max_rows)
+        now = time.time()
+        stored = {job.id: job for job in await run_in_threadpool(self._all_jobs)}
+        # Jobs this process queued while the directory was being read count too
+        stored.update(self.jobs)
+        jobs = [job for job in stored.values() if not self._expired(job, now)]
+        for job in jobs:
+            if job.key == key and job.status != "failed":
+                return job, True
+
+        active = sum(1 for j in jobs if j.user == user and j.status in ACTIVE_STATES)
+        if active >= self.per_user_limit:
+            raise ExportLimitError(
+                f"At most {self.per_user_limit} export jobs may run at once per user"
+            )
+
+        job = ExportJob(key, user, fmt, params, columns, max_rows, page_size)
+        self.jobs[job.id] = job
+        await run_in_threadpool(self._save, job)
+        self._queue.put_nowait(job)
+        return job, False
+
+    def sweep(self):
+        """
+        Drop finished jobs older than the TTL and delete their files; fail active jobs
+        whose worker process has exited.
+        """
+        now = time.time()
+        for job in self._all_jobs():
+            if self._expired(job, now):
+                self.jobs.pop(job.id, None)
+                if job.path:
+                    self._remove(job.path)
+                self._remove(self._record_path(job.id))
+            elif job.status in ACTIVE_STATES and job.id not in self.jobs and not owner_alive(job.owner):
+                job.status = "failed"
+                job.error = "The worker process running this export stopped"
+                job.finished_at = now
+                self._remove(self._partial_path(job))
+                self._save(job)
+
+    def _expired(self, job, now):
+        return job.finished_at is not None and now - job.finished_at > self.ttl
+
+    def _clean_directory(self):
+        """
+        Create the job directory, sweep it, and delete files that have no job record:
+        they belong to no job any worker can report on.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.sweep()
+        job_ids = {job.id for job in self._all_jobs()}
+        for name in os.listdir(self.directory):
+            if not name.endswith(RECORD_SUFFIX) and name.split(".")[0] not in job_ids:
+                self._remove(os.path.join(self.directory, name))
+
+    def _record_path(self, job_id):
+        return os.path.join(self.directory, job_id + RECORD_SUFFIX)
+
+    def _partial_path(self, job):
+        return os.path.join(self.directory, f"{job.id}.{JOB_FORMATS[job.format][1]}.part")
+
+    def _save(self, job):
+        path = self._record_path(job.id)
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp, "w") as f:
+            json.dump(job.to_record(), f)
+        os.replace(temp, path)
+
+    @staticmethod
+    def _publish(partial, path):
+        """
+        Move a finished export into place; returns its size in bytes.
+        """
+        os.replace(partial, path)
+        return os.path.getsize(path)
+
+    def _load(self, job_id):
+        if not JOB_ID_RE.fullmatch(job_id):
+            return None
+        try:
+            with open(self._record_path(job_id)) as f:
+                return ExportJob.from_record(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _all_jobs(self):
+        """
+        Every job with a record in the directory; this process's own jobs take precedence.
+        """
+        jobs = dict(self.jobs)
+        for name in os.listdir(self.directory):
+            if name.endswith(RECORD_SUFFIX):
+                job_id = name[: -len(RECORD_SUFFIX)]
+                if job_id not in jobs:
+                    job = self._load(job_id)
+                    if job is not None:
+                        jobs[job_id] = job
+        return list(jobs.values())
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    async def _sweeper(self):
+        # Directory scans and record reads stay off the event loop
+        while True:
+            await asyncio.sleep(min(self.ttl, 60.0))
+            await run_in_threadpool(self.sweep)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _count(self, params):
+        items = [(k, v) for k, v in params if k not in ("rows", "start")]
+        response = await self.solr.get("/select", params=items + [("rows", 0)], query_class="export")
+        return decode_json(response)["response"]["numFound"]
+
+    async def _run(self, job):
+        writer_class, extension, _ = JOB_FORMATS[job.format]
+        path = os.path.join(self.directory, f"{job.id}.{extension}")
+        partial = path + ".part"
+        job.status = "running"
+        await run_in_threadpool(self._save, job)
+        try:
+            found = await self._count(job.params)
+            job.total = found if job.max_rows is None else min(found, job.max_rows)
+            await run_in_threadpool(self._save, job)
+
+            writer = await run_in_threadpool(writer_class, partial, job.columns)
+            try:
+                async for docs in self.solr.iter_cursor(job.params, page_size=job.page_size):
+                    if job.max_rows is not None:
+                        docs = docs[: job.max_rows - job.rows_written]
+                    await run_in_threadpool(writer.append, docs)
+                    job.rows_written += len(docs)
+                    await run_in_threadpool(self._save, job)
+                    if job.max_rows is not None and job.rows_written >= job.max_rows:
+                        break
+            finally:
+                await run_in_threadpool(writer.close)
+
+            job.size = await run_in_threadpool(self._publish, partial, path)
+            job.path = path
+            job.status = "done"
+        except asyncio.CancelledError:
+            # Worker process shutting down (e.g. a rolling reload): record the failure
+            # before the cancellation propagates instead of awaiting a thread
+            job.status = "failed"
+            job.error = "The export was interrupted by a server shutdown"
+            job.finished_at = time.time()
+            self._remove(partial)
+            self._save(job)
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            self._remove(partial)
+            if self.on_error:
+                self.on_error(job, traceback.format_exc())
+        job.finished_at = time.time()
+        await run_in_threadpool(self._save, job)
+
+
+def parse_byte_range(header, size):
+    """
+    (start, end) inclusive for a single "bytes=" range, None without a header.
+    Raises ValueError for a range that cannot be satisfied.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        raise ValueError("Only a single bytes range is supported")
+    first, _, last = spec.strip().partition("-")
+    if first:
+        start = int(first)
+        end = int(last) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def iter_file_range(path, start, end, chunk_size=64 * 1024):
+    """
+    Yield bytes start..end (inclusive) of a file.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
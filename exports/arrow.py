@@ -0,0 +1,163 @@
+"""
+Columnar Arrow / Parquet export
+Each Solr page becomes one Arrow record batch with a typed schema (multi-valued
+fields as list<string>, app_date as a timestamp), written to a Parquet file or
+streamed in the Arrow IPC format. Needs the optional `pyarrow` package.
+"""
+import io
+import json
+
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Field -> Arrow type name; fields not listed are exported as strings
+FIELD_TYPES = {
+    "id": "string",
+    "title": "string",
+    "app_date": "timestamp",
+    "app_date_year": "int32",
+    "disposal_type": "string",
+    "application_status": "string",
+    "examiner": "string",
+    "law_firm": "list",
+    "all_attorney_names": "list",
+    "gau": "list",
+    "cpc_classification": "list",
+    "usc": "list",
+    "assignee_last": "string",
+    "small_entity_indicator": "string",
+    "first_named_inventor": "string",
+    "law_firm_address": "string",
+}
+
+
+def _arrow_type(kind):
+    return {
+        "string": pa.string(),
+        "int32": pa.int32(),
+        "timestamp": pa.timestamp("ms", tz="UTC"),
+        "list": pa.list_(pa.string()),
+    }[kind]
+
+
+def export_schema(columns):
+    """
+    Arrow schema for the exported columns, in column order.
+    """
+    return pa.schema([(c, _arrow_type(FIELD_TYPES.get(c, "string"))) for c in columns])
+
+
+def _as_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(v) for v in value)
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return str(value)
+
+
+def _column(docs, name, kind):
+    values = [doc.get(name) for doc in docs]
+    if kind == "list":
+        # A multi-valued field may come back as a bare value for single-valued docs
+        return pa.array(
+            [None if v is None else [str(x) for x in (v if isinstance(v, list) else [v])] for v in values],
+            type=pa.list_(pa.string()),
+        )
+    if kind == "int32":
+        return pa.array([None if v is None else int(v) for v in values], type=pa.int32())
+    strings = pa.array([_as_text(v) for v in values], type=pa.string())
+    if kind == "timestamp":
+        return pc.cast(strings, pa.timestamp("ms", tz="UTC"))
+    return strings
+
+
+def docs_to_batch(docs, schema):
+    """
+    One record batch built column by column from a page of Solr docs.
+    """
+    arrays = [_column(docs, f.name, FIELD_TYPES.get(f.name, "string")) for f in schema]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class ParquetStreamWriter:
+    """
+    Parquet file writer with the same append / close interface as XlsxStreamWriter;
+    each appended page becomes a row group.
+    """
+
+    def __init__(self, path, columns):
+        self.schema = export_schema(columns)
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def append(self, docs):
+        if docs:
+            self.writer.write_batch(docs_to_batch(docs, self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+async def export_query_to_parquet(solr, params, columns, path, page_size=1000, max_rows=None):
+    """
+    Write every document matched by params to a Parquet file at path; returns the row count.
+    """
+    writer = await run_in_threadpool(ParquetStreamWriter, path, columns)
+    written = 0
+    try:
+        async for docs in solr.iter_cursor(params, page_size=page_size):
+            if max_rows is not None:
+                docs = docs[: max_rows - written]
+            await run_in_threadpool(writer.append, docs)
+            written += len(docs)
+            if max_rows is not None and written >= max_rows:
+                break
+    finally:
+        await run_in_threadpool(writer.close)
+    return written
+
+
+async def iter_query_arrow(solr, params, columns, page_size=1000, max_rows=None):
+    """
+    Yield the documents matched by params as an Arrow IPC stream, one record batch per page.
+    """
+    schema = export_schema(columns)
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def drain():
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    def encode(docs):
+        writer.write_batch(docs_to_batch(docs, schema))
+        return drain()
+
+    def finish():
+        writer.close()
+        return drain()
+
+    written = 0
+    async for docs in solr.iter_cursor(params, page_size=page_size):
+        if max_rows is not None:
+            docs = docs[: max_rows - written]
+        if docs:
+            # Batch building and IPC encoding run in a worker thread, like the file exports
+            yield await run_in_threadpool(encode, docs)  # schema message precedes the first batch
+        written += len(docs)
+        if max_rows is not None and written >= max_rows:
+            break
+    yield await run_in_threadpool(finish)  # schema if no rows matched, then the end-of-stream marker
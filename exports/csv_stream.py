@@ -0,0 +1,28 @@
+"""
+Streaming CSV export
+Rows are written to disk as each Solr page arrives
+"""
+import csv
+
+from exports.excel import cell_value
+
+CSV_MEDIA_TYPE = "text/csv"
+
+
+class CsvStreamWriter:
+    """
+    CSV file writer with the same append / close interface as XlsxStreamWriter.
+    """
+
+    def __init__(self, path, columns):
+        self.columns = list(columns)
+        # utf-8-sig so Excel detects the encoding when the file is opened directly
+        self.file = open(path, "w", newline="", encoding="utf-8-sig")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.columns)
+
+    def append(self, docs):
+        self.writer.writerows([cell_value(doc.get(c)) for c in self.columns] for doc in docs)
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,84 @@
+"""
+Streaming Excel export
+Pages through Solr with cursorMark and writes rows with openpyxl's write-only
+workbook in a worker thread, so peak memory is one Solr page
+"""
+import json
+import os
+
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from starlette.concurrency import run_in_threadpool
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def cell_value(value):
+    """
+    Flatten a Solr field value into something a worksheet cell accepts.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        value = ", ".join(str(v) for v in value)
+    elif isinstance(value, dict):
+        value = json.dumps(value)
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub("", value)
+    return value
+
+
+class XlsxStreamWriter:
+    """
+    Write-only workbook: rows are flushed to a temp XML part as they are appended.
+    """
+
+    def __init__(self, path, columns, sheet_name="Patent Results"):
+        self.path = path
+        self.columns = list(columns)
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(sheet_name)
+        self.sheet.append(self.columns)
+
+    def append(self, docs):
+        for doc in docs:
+            self.sheet.append([cell_value(doc.get(c)) for c in self.columns])
+
+    def close(self):
+        self.workbook.save(self.path)
+
+    def discard(self):
+        """
+        Abandon an unfinished workbook: stop the sheet's row writer and delete the temp
+        XML part it was streaming to. Nothing is written to path.
+        """
+        if self.sheet._rows is not None:
+            self.sheet._rows.close()
+        writer = self.sheet._writer
+        if writer is not None:
+            writer.close()
+            if os.path.exists(writer.out):
+                writer.cleanup()
+
+
+async def export_query_to_xlsx(solr, params, columns, path, page_size=1000, max_rows=None):
+    """
+    Write every document matched by params to an xlsx file at path; returns the row count.
+    """
+    writer = await run_in_threadpool(XlsxStreamWriter, path, columns)
+    written = 0
+    saved = False
+    try:
+        async for docs in solr.iter_cursor(params, page_size=page_size):
+            if max_rows is not None:
+                docs = docs[: max_rows - written]
+            await run_in_threadpool(writer.append, docs)
+            written += len(docs)
+            if max_rows is not None and written >= max_rows:
+                break
+        await run_in_threadpool(writer.close)
+        saved = True
+    finally:
+        if not saved:
+            await run_in_threadpool(writer.discard)
+    return written
@@ -0,0 +1,121 @@
+"""
+Streaming JSON / NDJSON export
+Pages through Solr with cursorMark and yields encoded chunks, one page at a time
+"""
+import json
+import zlib
+
+from solr_client.solr_client import next_cursor_mark
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+JSON_MEDIA_TYPE = "application/json"
+
+# Flush the streamed search response once this many bytes are pending
+RESULTS_FLUSH_BYTES = 64 * 1024
+
+
+def dumps_compact(obj):
+    """
+    Compact JSON bytes; orjson when installed, else the standard library.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def _encode_ndjson(docs):
+    return b"".join(dumps_compact(doc) + b"\n" for doc in docs)
+
+
+def _encode_array_items(docs, first):
+    body = b",\n".join(dumps_compact(doc) for doc in docs)
+    return body if first else b",\n" + body
+
+
+class NdjsonFileWriter:
+    """
+    NDJSON file writer with the same append / close interface as XlsxStreamWriter.
+    """
+
+    def __init__(self, path, columns=None):
+        self.file = open(path, "wb")
+
+    def append(self, docs):
+        self.file.write(_encode_ndjson(docs))
+
+    def close(self):
+        self.file.close()
+
+
+async def iter_query_json(solr, params, fmt="ndjson", page_size=1000, max_rows=None):
+    """
+    Yield the documents matched by params as NDJSON lines or as one JSON array.
+    """
+    if fmt == "json":
+        yield b"[\n"
+    written = 0
+    async for docs in solr.iter_cursor(params, page_size=page_size):
+        if max_rows is not None:
+            docs = docs[: max_rows - written]
+        if docs:
+            if fmt == "json":
+                yield _encode_array_items(docs, first=written == 0)
+            else:
+                yield _encode_ndjson(docs)
+        written += len(docs)
+        if max_rows is not None and written >= max_rows:
+            break
+    if fmt == "json":
+        yield b"\n]\n"
+
+
+async def gzip_chunks(chunks, level=6):
+    """
+    Gzip an async stream of byte chunks incrementally.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def iter_results_json(docs, parser, solr_query_url, cursor=None):
+    """
+    Encode a streamed search as {"solr_query_url", "total_found", "results": [...],
+    "next_cursor"} while documents are still arriving. docs is an async iterator fed by
+    parser (see solr_client/streaming.py); output is flushed in RESULTS_FLUSH_BYTES chunks.
+    """
+    pending = []
+    size = 0
+    first = True
+    async for doc in docs:
+        if first:
+            pending.append(_results_header(solr_query_url, parser.num_found))
+        encoded = dumps_compact(doc)
+        pending.append(encoded if first else b"," + encoded)
+        first = False
+        size += len(encoded)
+        if size >= RESULTS_FLUSH_BYTES:
+            yield b"".join(pending)
+            pending, size = [], 0
+    if first:
+        pending.append(_results_header(solr_query_url, parser.num_found))
+    next_cursor = next_cursor_mark({"nextCursorMark": parser.next_cursor_mark}, cursor)
+    pending.append(b'],"next_cursor":' + dumps_compact(next_cursor) + b"}")
+    yield b"".join(pending)
+
+
+def _results_header(solr_query_url, num_found):
+    return (
+        b'{"solr_query_url":' + dumps_compact(solr_query_url)
+        + b',"total_found":' + dumps_compact(num_found)
+        + b',"results":['
+    )
@@ -1,64 +1,172 @@
 import os
-import logging
-from logging.handlers import TimedRotatingFileHandler
 import re
+import json
+import uuid
+import atexit
+import logging
+import queue
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Sensitive data patterns: (group name, pattern, replacement)
+SENSITIVE_PATTERNS = [
+    ("stripe_secret", r'sk_live_[a-zA-Z0-9]{24,}', '[STRIPE_SECRET_REDACTED]'),
+    ("stripe_public", r'pk_live_[a-zA-Z0-9]{24,}', '[STRIPE_PUBLIC_REDACTED]'),
+    ("stripe_test", r'sk_test_[a-zA-Z0-9]{24,}', '[STRIPE_TEST_SECRET_REDACTED]'),
+    ("stripe_restricted", r'rk_live_[a-zA-Z0-9]{24,}', '[STRIPE_RESTRICTED_REDACTED]'),
+    ("password", r'"password"\s*:\s*"[^"]*"', '"password": "[REDACTED]"'),
+    ("token", r'"token"\s*:\s*"[^"]*"', '"token": "[REDACTED]"'),
+    ("bearer", r'Bearer\s+[a-zA-Z0-9\-._~+/]+=*', 'Bearer [REDACTED]'),
+    ("authorization", r'Authorization:\s*[^\s]+', 'Authorization: [REDACTED]'),
+    # Add more patterns as needed (and a matching entry in SENSITIVE_MARKERS)
+]
+
+# One precompiled alternation; the matching group name selects the replacement
+SENSITIVE_RE = re.compile(
+    "|".join(f"(?P<{name}>{pattern})" for name, pattern, _ in SENSITIVE_PATTERNS),
+    flags=re.IGNORECASE,
+)
+REPLACEMENTS = {name: replacement for name, _, replacement in SENSITIVE_PATTERNS}
+
+# Lowercase substrings every sensitive match contains; messages without any skip the regex
+SENSITIVE_MARKERS = ("_live_", "sk_test_", "password", "token", "bearer", "authorization")
+
+# Per-request id, set by RequestIdMiddleware and stamped onto every log record
+request_id_var = ContextVar("request_id", default=None)
+
+_listener = None
+
+
 class SensitiveDataFilter(logging.Filter):
     """Filter to remove sensitive data from log records"""
 
     def filter(self, record):
-        # Sanitize the main message
-        if hasattr(record, 'msg') and record.msg:
-            record.msg = sanitize_message(record.msg)
+        # Sanitize the fully formatted message once, instead of msg and each arg
+        record.msg = sanitize_message(record.getMessage())
+        record.args = None
+        return True
 
-        # Sanitize args if present
-        if hasattr(record, 'args') and record.args:
-            record.args = tuple(sanitize_message(str(arg))
-                                for arg in record.args)
 
+class RequestContextFilter(logging.Filter):
+    """
+    Stamp the request id and any extra context fields onto the record.
+    Runs in the logging coroutine, where the request's context variables are visible.
+    """
+
+    def __init__(self, context_fields=None):
+        super().__init__()
+        self.context_fields = context_fields or {}
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        for name, getter in self.context_fields.items():
+            setattr(record, name, getter())
         return True
 
 
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line, with the request context fields."""
+
+    def __init__(self, context_fields=()):
+        super().__init__()
+        self.context_fields = tuple(context_fields)
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "function": record.funcName,
+            "line": record.lineno,
+            "request_id": getattr(record, "request_id", None),
+        }
+        for name in self.context_fields:
+            entry[name] = getattr(record, name, None)
+        entry["message"] = record.getMessage()
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
 def sanitize_message(message):
     """Remove sensitive data from log messages"""
     if not isinstance(message, str):
         message = str(message)
 
-    # Define patterns for sensitive data
-    sensitive_patterns = [
-        (r'sk_live_[a-zA-Z0-9]{24,}', '[STRIPE_SECRET_REDACTED]'),
-        (r'pk_live_[a-zA-Z0-9]{24,}', '[STRIPE_PUBLIC_REDACTED]'),
-        (r'sk_test_[a-zA-Z0-9]{24,}', '[STRIPE_TEST_SECRET_REDACTED]'),
-        (r'rk_live_[a-zA-Z0-9]{24,}', '[STRIPE_RESTRICTED_REDACTED]'),
-        (r'"password"\s*:\s*"[^"]*"', '"password": "[REDACTED]"'),
-        (r'"token"\s*:\s*"[^"]*"', '"token": "[REDACTED]"'),
-        (r'Bearer\s+[a-zA-Z0-9\-._~+/]+=*', 'Bearer [REDACTED]'),
-        (r'Authorization:\s*[^\s]+', 'Authorization: [REDACTED]'),
-        # Add more patterns as needed
-    ]
-
-    for pattern, replacement in sensitive_patterns:
-        message = re.sub(pattern, replacement, message, flags=re.IGNORECASE)
-    return message
-
-
-def setup_logger(logging_enabled=True):
+    # Cheap pre-check: most messages contain no marker and skip the regex entirely
+    lowered = message.lower()
+    if not any(marker in lowered for marker in SENSITIVE_MARKERS):
+        return message
+
+    return SENSITIVE_RE.sub(lambda m: REPLACEMENTS[m.lastgroup], message)
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware assigning each request an id (from X-Request-ID or a new one),
+    exposed to log records and echoed in the response headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(b"x-request-id")
+        request_id = incoming.decode("latin-1")[:64] if incoming else uuid.uuid4().hex[:16]
+        token = request_id_var.set(request_id)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
+
+
+def stop_logging():
+    """Flush queued records and stop the background writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logger(logging_enabled=True, json_lines=None, context_fields=None, log_filename=None):
+    """
+    Error logger whose file I/O runs on a background thread: the caller only enqueues.
+    json_lines defaults to LOG_FORMAT=json; context_fields maps extra record fields to
+    zero-argument callables read when the record is created (e.g. Solr time so far).
+    """
+    global _listener
     try:
         if not logging_enabled:
             return None
 
+        if json_lines is None:
+            json_lines = os.getenv("LOG_FORMAT", "text").lower() == "json"
+        context_fields = context_fields or {}
+
         # Create logs directory structure
         logs_folder = os.path.join(BASE_DIR, "Attachments", "logs")
         exception_folder = os.path.join(logs_folder, "exception")
 
         os.makedirs(exception_folder, exist_ok=True)
 
-        log_filename = os.path.join(exception_folder, "api_exceptions.txt")
+        log_filename = log_filename or os.path.join(exception_folder, "api_exceptions.txt")
 
         # Create handler with rotation to prevent huge log files
-        from logging.handlers import RotatingFileHandler
         handler = RotatingFileHandler(
             log_filename,
             maxBytes=10*1024*1024,  # 10MB
@@ -66,22 +174,33 @@ def setup_logger(logging_enabled=True):
         )
         handler.setLevel(logging.ERROR)
 
-        # Add sensitive data filter
+        # Add sensitive data filter (runs on the listener thread)
         sensitive_filter = SensitiveDataFilter()
         handler.addFilter(sensitive_filter)
 
-        # Improved formatter - less verbose
-        formatter = logging.Formatter(
-            "%(asctime)s | %(levelname)s | %(name)s:%(funcName)s:%(lineno)d | %(message)s"
-        )
+        if json_lines:
+            formatter = JsonLinesFormatter(context_fields)
+        else:
+            # Improved formatter - less verbose
+            formatter = logging.Formatter(
+                "%(asctime)s | %(levelname)s | %(name)s:%(funcName)s:%(lineno)d | %(message)s"
+            )
         handler.setFormatter(formatter)
 
+        # Records are queued by the caller and written by a QueueListener thread
+        stop_logging()
+        log_queue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.addFilter(RequestContextFilter(context_fields))
+        _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+
         # Get or create logger
         logger = logging.getLogger(__name__)
 
         # Clear existing handlers to prevent duplicates
         logger.handlers.clear()
-        logger.addHandler(handler)
+        logger.addHandler(queue_handler)
         logger.setLevel(logging.ERROR)
 
         # Don't propagate to avoid duplicate logs
@@ -95,7 +214,6 @@ def setup_logger(logging_enabled=True):
         return None
 
 
-logger = setup_logger(logging_enabled=True)
-
-
+atexit.register(stop_logging)
 
+logger = setup_logger(logging_enabled=True)
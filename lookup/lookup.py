@@ -0,0 +1,85 @@
+"""
+Bulk patent ID lookup
+Splits large ID lists into chunks fetched concurrently with POST bodies, via the
+terms query parser or real-time get, and merges the documents back in input order
+"""
+import asyncio
+
+from solr_client.solr_client import UNIQUE_KEY, decode_json
+
+LOOKUP_METHODS = ("terms", "get")
+
+
+def unique_ids(ids):
+    """
+    Stripped, non-empty IDs with duplicates removed, keeping first-seen order.
+    """
+    seen = set()
+    result = []
+    for raw in ids:
+        pid = str(raw).strip()
+        if pid and pid not in seen:
+            seen.add(pid)
+            result.append(pid)
+    return result
+
+
+def chunked(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def with_unique_key(fl, unique_key=UNIQUE_KEY):
+    """
+    Make sure a field list returns the unique key, which is needed to re-order results.
+    """
+    if not fl:
+        return fl
+    fields = [f.strip() for f in fl.split(",") if f.strip()]
+    if unique_key not in fields and "*" not in fields:
+        fields.append(unique_key)
+    return ",".join(fields)
+
+
+def chunk_request(ids, method, fl=None, unique_key=UNIQUE_KEY):
+    """
+    (path, form params) fetching one chunk of IDs.
+    terms: {!terms} is a single set query, so it is not bound by maxBooleanClauses.
+    get: real-time get reads by unique key, including documents not yet committed.
+    """
+    if method == "get":
+        path, data = "/get", {"ids": ",".join(ids), "wt": "json"}
+    else:
+        path = "/select"
+        data = {
+            "q": f"{{!terms f={unique_key}}}" + ",".join(ids),
+            "rows": len(ids),
+            "wt": "json",
+        }
+    if fl:
+        data["fl"] = with_unique_key(fl, unique_key)
+    return path, data
+
+
+async def lookup_ids(solr, ids, method="terms", fl=None, chunk_size=1000, concurrency=8):
+    """
+    Fetch documents for every ID. Returns (docs in input order, IDs not found, chunk count).
+    """
+    ids = unique_ids(ids)
+    chunks = chunked(ids, chunk_size)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(chunk):
+        path, data = chunk_request(chunk, method, fl)
+        async with semaphore:
+            response = await solr.post(path, data=data, query_class="lookup")
+        return decode_json(response)["response"]["docs"]
+
+    pages = await asyncio.gather(*(fetch(chunk) for chunk in chunks))
+
+    by_id = {}
+    for docs in pages:
+        for doc in docs:
+            by_id[str(doc.get(UNIQUE_KEY))] = doc
+    found = [by_id[pid] for pid in ids if pid in by_id]
+    not_found = [pid for pid in ids if pid not in by_id]
+    return found, not_found, len(chunks)
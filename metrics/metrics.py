@@ -0,0 +1,214 @@
+"""
+Request-level metrics
+Counters and latency histograms rendered in the Prometheus text format,
+with Solr upstream time split from local processing time per request
+"""
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Solr seconds spent on behalf of the current HTTP request
+_solr_seconds = ContextVar("solr_seconds", default=None)
+
+
+def current_solr_seconds():
+    """
+    Solr time spent so far by the current HTTP request, or None outside a request.
+    """
+    spent = _solr_seconds.get()
+    return round(spent[0], 6) if spent is not None else None
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            n, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        for n, v in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def inc(self, *label_values, amount=1):
+        label_values = tuple(str(v) for v in label_values)
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value, *label_values):
+        label_values = tuple(str(v) for v in label_values)
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [0] * (len(self.buckets) + 2)
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        for label_values, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(names, label_values + (bound,))} {cumulative}"
+                )
+            lines.append(
+                f"{self.name}_bucket{_format_labels(names, label_values + ('+Inf',))} {series[-1]}"
+            )
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {series[-2]}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """
+    Gauge read at scrape time: collect() returns [(label values, value), ...].
+    """
+
+    def __init__(self, name, documentation, labels, collect):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.collect = collect
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for label_values, value in self.collect():
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Metrics:
+    """
+    Registry of the application's metrics.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self.requests = self.counter(
+            "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+        )
+        self.request_seconds = self.histogram(
+            "http_request_duration_seconds", "End-to-end request latency", ("method", "route")
+        )
+        self.request_solr_seconds = self.histogram(
+            "http_request_solr_seconds", "Solr upstream time spent per request", ("method", "route")
+        )
+        self.request_local_seconds = self.histogram(
+            "http_request_local_seconds", "Local processing time per request (total minus Solr)", ("method", "route")
+        )
+        self.solr_requests = self.counter(
+            "solr_requests_total", "Solr requests by query class and status", ("query_class", "status")
+        )
+        self.solr_seconds = self.histogram(
+            "solr_request_duration_seconds", "Solr request latency", ("query_class",)
+        )
+        self.stage_seconds = self.histogram(
+            "app_stage_duration_seconds", "Local processing stages (decode, reshape, export)", ("stage",)
+        )
+
+    def counter(self, name, documentation, labels=()):
+        metric = Counter(name, documentation, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name, documentation, labels, collect):
+        metric = Gauge(name, documentation, labels, collect)
+        self._metrics.append(metric)
+        return metric
+
+    def observe_solr(self, query_class, seconds, status):
+        """
+        SolrClient observer: per-class Solr latency, also charged to the current request.
+        """
+        self.solr_requests.inc(query_class, status)
+        self.solr_seconds.observe(seconds, query_class)
+        spent = _solr_seconds.get()
+        if spent is not None:
+            spent[0] += seconds
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds.observe(time.perf_counter() - start, name)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording count, latency and the Solr / local split per route.
+    """
+
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        spent = [0.0]
+        token = _solr_seconds.set(spent)
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _solr_seconds.reset(token)
+            elapsed = time.perf_counter() - start
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            self.metrics.requests.inc(method, route, status[0])
+            self.metrics.request_seconds.observe(elapsed, method, route)
+            self.metrics.request_solr_seconds.observe(spent[0], method, route)
+            self.metrics.request_local_seconds.observe(max(elapsed - spent[0], 0.0), method, route)
@@ -0,0 +1,129 @@
+"""
+Central query planner
+Turns search requests into canonical q / fq / sort / rows params. The entity
+clause (names, IDs) goes in q. Reusable filters (status, date window, GAU) become
+separate fq clauses in a stable order, so Solr's filterCache is shared across users.
+"""
+from datetime import date
+
+# Searchable entity -> Solr field; names are matched lowercased
+ENTITY_FIELDS = {
+    "examiner": "examiner",
+    "lawfirm": "law_firm",
+    "prosecutor": "all_attorney_names",
+    "attorney": "all_attorney_names",
+}
+
+STATUS_FILTERS = {
+    "issued": "disposal_type:iss",
+}
+
+DEFAULT_SORT = "app_date desc"
+
+# search_type -> status filter, rolling window in years, sort, fixed row count
+SEARCH_TYPES = {
+    "latest_filed": {"status": None, "years": None, "sort": DEFAULT_SORT, "rows": None},
+    "latest_approved": {"status": "issued", "years": None, "sort": DEFAULT_SORT, "rows": None},
+    "count": {"status": None, "years": None, "sort": None, "rows": 0},
+    "last_10_years": {"status": None, "years": 10, "sort": DEFAULT_SORT, "rows": None},
+    "latest_10_approved": {"status": "issued", "years": None, "sort": DEFAULT_SORT, "rows": 10},
+}
+
+
+def quote(value):
+    """
+    Quote a value as a Solr phrase.
+    """
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def canonical_values(values, lower=False):
+    """
+    Stripped, de-duplicated and sorted values, so equal requests give equal queries.
+    """
+    cleaned = {str(v).strip().lower() if lower else str(v).strip() for v in values}
+    return sorted(v for v in cleaned if v)
+
+
+def terms_clause(field, values, lower=False):
+    """
+    field:"a" for one value, field:("a" OR "b") for several; None when empty.
+    """
+    values = canonical_values(values, lower)
+    if not values:
+        return None
+    if len(values) == 1:
+        return f"{field}:{quote(values[0])}"
+    return f"{field}:(" + " OR ".join(quote(v) for v in values) + ")"
+
+
+def years_ago(today, years):
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:  # Feb 29
+        return today.replace(year=today.year - years, day=28)
+
+
+def rolling_window_fq(years, today=None):
+    """
+    app_date filter for the last `years` years, computed from today. The clause only
+    changes once a day, so it stays a filterCache hit for every user in between.
+    """
+    today = today or date.today()
+    return f"app_date:[{years_ago(today, years).isoformat()}T00:00:00Z TO *]"
+
+
+def plan(q, filters=(), sort=None, rows=10):
+    """
+    Canonical params: q, then fq clauses de-duplicated and sorted, then sort and rows.
+    """
+    params = {"q": q or "*:*"}
+    fq = sorted({f for f in filters if f})
+    if fq:
+        params["fq"] = fq
+    if sort:
+        params["sort"] = sort
+    params["rows"] = rows
+    params["wt"] = "json"
+    return params
+
+
+def plan_search(entity, names, search_type="latest_filed", limit=10, today=None):
+    """
+    Plan an examiner / lawfirm / prosecutor / attorney search of a given search_type.
+    """
+    if search_type not in SEARCH_TYPES:
+        raise ValueError(f"Unknown search_type: {search_type}")
+    spec = SEARCH_TYPES[search_type]
+
+    q = terms_clause(ENTITY_FIELDS[entity], names, lower=True)
+    if q is None:
+        raise ValueError(f"No valid {entity} names provided")
+
+    filters = []
+    if spec["status"]:
+        filters.append(STATUS_FILTERS[spec["status"]])
+    if spec["years"]:
+        filters.append(rolling_window_fq(spec["years"], today))
+    rows = spec["rows"] if spec["rows"] is not None else limit
+    return plan(q, filters, spec["sort"], rows)
+
+
+def plan_gau_search(gaus, limit=10, sort=DEFAULT_SORT):
+    """
+    GAU searches match all documents through a cacheable gau fq.
+    """
+    gau_fq = terms_clause("gau", gaus)
+    if gau_fq is None:
+        raise ValueError("No valid GAUs provided")
+    return plan("*:*", [gau_fq], sort, limit)
+
+
+def plan_patent_lookup(patent_ids):
+    """
+    Look up patents by ID; rows covers every requested ID.
+    """
+    ids = canonical_values(patent_ids)
+    if not ids:
+        raise ValueError("No valid patent IDs provided")
+    return plan(terms_clause("id", ids), rows=len(ids))
@@ -0,0 +1,141 @@
+"""
+Execute-query proxy policy
+Client-supplied Solr URLs are parsed into params and rebuilt against our own
+Solr: the host and request handler must match SOLR_BASE_URL, rows and start are
+capped, a default fl and timeAllowed are injected, params that reach other
+hosts or handlers are refused, and the params are put in canonical order so
+equal queries share one cache key.
+"""
+import httpx
+
+from solr_client.solr_client import param_items
+
+# Params that switch the handler, fan out to other hosts or read remote content
+BLOCKED_PARAMS = {
+    "qt", "shards", "shards.qt", "collection", "stream.url", "stream.file",
+    "stream.body", "stream.contentType",
+}
+# Output formatting params replaced by wt=json
+DROPPED_PARAMS = {"wt", "indent", "json.wrf"}
+
+
+class UnsafeQueryError(ValueError):
+    """
+    A client query that the policy refuses to send to Solr.
+    """
+
+
+def parse_int(name, value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise UnsafeQueryError(f"{name} must be an integer, got {value!r}")
+
+
+class QueryPolicy:
+    """
+    Limits applied to every query passed through /execute-query.
+    """
+
+    def __init__(
+        self,
+        base_url,
+        paths=("/select",),
+        max_rows=1000,
+        max_start=10000,
+        default_fl=None,
+        time_allowed_ms=15000,
+    ):
+        self.base_url = httpx.URL((base_url or "").rstrip("/"))
+        self.paths = tuple(paths)
+        self.max_rows = max_rows
+        # Deeper offsets make every shard sort start + rows docs; cursor paging has no such cost
+        self.max_start = max_start
+        self.default_fl = default_fl
+        self.time_allowed_ms = time_allowed_ms
+
+    def handler_path(self, url):
+        """
+        The request handler path (e.g. "/select") of a Solr URL on our Solr host.
+        Relative URLs are read relative to the base URL.
+        """
+        url = httpx.URL(url)
+        base_path = self.base_url.path.rstrip("/")
+        if url.is_absolute_url:
+            if (url.scheme, url.host, url.port) != (
+                self.base_url.scheme, self.base_url.host, self.base_url.port
+            ):
+                raise UnsafeQueryError(f"Solr host {url.host!r} is not allowed")
+            if not url.path.startswith(base_path + "/"):
+                raise UnsafeQueryError(f"Solr path {url.path!r} is outside {base_path or '/'}")
+            path = url.path[len(base_path):]
+        else:
+            path = "/" + url.path.lstrip("/")
+        if path not in self.paths:
+            raise UnsafeQueryError(f"Solr handler {path!r} is not allowed; use {', '.join(self.paths)}")
+        return path
+
+    @staticmethod
+    def check_params(params):
+        """
+        The params as (key, value) pairs; UnsafeQueryError if any of them is blocked.
+        """
+        items = param_items(params)
+        blocked = sorted({k for k, _ in items if k in BLOCKED_PARAMS})
+        if blocked:
+            raise UnsafeQueryError(f"Solr params not allowed: {', '.join(blocked)}")
+        return items
+
+    def apply(self, params, cursor=False):
+        """
+        Canonical (key, value) pairs with the limits applied; cursor=True (or a cursorMark
+        param) for cursor requests, which ignore start and cannot be combined with timeAllowed.
+        """
+        items = self.check_params(params)
+
+        values = {}
+        for key, value in items:
+            if key not in DROPPED_PARAMS:
+                values.setdefault(key, []).append(str(value))
+        cursor = cursor or "cursorMark" in values
+
+        rows = parse_int("rows", values.get("rows", ["10"])[-1])
+        values["rows"] = [str(max(0, min(rows, self.max_rows)))]
+        if "start" in values:
+            start = parse_int("start", values["start"][-1])
+            if cursor:
+                del values["start"]
+            elif start > self.max_start:
+                raise UnsafeQueryError(
+                    f"start={start} is past the {self.max_start} limit; page with a cursor instead"
+                )
+            else:
+                values["start"] = [str(max(0, start))]
+
+        fl = ",".join(values.get("fl", []))
+        if self.default_fl and (not fl or fl.strip() == "*"):
+            values["fl"] = [self.default_fl]
+
+        if cursor:
+            values.pop("timeAllowed", None)
+        elif self.time_allowed_ms:
+            requested = parse_int("timeAllowed", values.get("timeAllowed", [self.time_allowed_ms])[-1])
+            if requested <= 0:
+                requested = self.time_allowed_ms
+            values["timeAllowed"] = [str(min(requested, self.time_allowed_ms))]
+
+        values["wt"] = ["json"]
+        return [(key, value) for key in sorted(values) for value in sorted(values[key])]
+
+    def normalize(self, url, cursor=False):
+        """
+        (handler path, canonical params) for a client-supplied Solr URL.
+        """
+        path = self.handler_path(url)
+        return path, self.apply(httpx.URL(url).params.multi_items(), cursor=cursor)
+
+    def url(self, path, params):
+        """
+        The full Solr URL actually queried, for display and logs.
+        """
+        return str(httpx.URL(f"{self.base_url}{path}", params=params))
@@ -0,0 +1,390 @@
+"""
+Pre-aggregated monthly rollups for date-range statistics
+Per (dimension, value, month) document counts plus per-month GAU and CPC
+breakdowns, stored in SQLite and filled incrementally from Solr
+"""
+import calendar
+import json
+import sqlite3
+import time
+from contextlib import closing
+from datetime import date, timedelta
+
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, every process refreshes
+    fcntl = None
+
+from solr_client.solr_client import decode_json
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup_counts (
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    month TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (dimension, month, value)
+);
+CREATE TABLE IF NOT EXISTS rollup_gau (
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    month TEXT NOT NULL,
+    gau TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (dimension, month, value, gau)
+);
+CREATE TABLE IF NOT EXISTS rollup_cpc (
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    month TEXT NOT NULL,
+    cpc TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (dimension, month, value, cpc)
+);
+CREATE TABLE IF NOT EXISTS rollup_months (
+    dimension TEXT NOT NULL,
+    month TEXT NOT NULL,
+    refreshed_at REAL NOT NULL,
+    num_found INTEGER,
+    PRIMARY KEY (dimension, month)
+);
+"""
+
+ROLLUP_TABLES = ("rollup_counts", "rollup_gau", "rollup_cpc", "rollup_months")
+
+# Sub-facet table per breakdown kind
+BREAKDOWN_TABLES = {"gau": "rollup_gau", "cpc": "rollup_cpc"}
+
+
+def month_key(d):
+    return f"{d.year:04d}-{d.month:02d}"
+
+
+def month_bounds(d):
+    last_day = calendar.monthrange(d.year, d.month)[1]
+    return d.replace(day=1), d.replace(day=last_day)
+
+
+def iter_months(first, last):
+    """
+    Yield the first day of every month from first to last inclusive.
+    """
+    current = first.replace(day=1)
+    while current <= last:
+        yield current
+        current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def split_range(from_date, to_date):
+    """
+    Split [from_date, to_date] into whole months and the partial (start, end) edges.
+    """
+    start = date.fromisoformat(from_date)
+    end = date.fromisoformat(to_date)
+    full_months, edges = [], []
+    for first_day in iter_months(start, end):
+        month_start, month_end = month_bounds(first_day)
+        lo, hi = max(start, month_start), min(end, month_end)
+        if lo == month_start and hi == month_end:
+            full_months.append(month_key(first_day))
+        else:
+            edges.append((lo.isoformat(), hi.isoformat()))
+    return full_months, edges
+
+
+def date_window_fq(start, end):
+    return f"app_date:[{start}T00:00:00Z TO {end}T23:59:59Z]"
+
+
+def encode_value(value):
+    return json.dumps(value)
+
+
+def solr_term(value):
+    """
+    Quote a decoded bucket value for use in an fq clause.
+    """
+    text = value if isinstance(value, str) else json.dumps(value)
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class RollupStore:
+    """
+    SQLite-backed rollup tables. Methods are blocking; call them from a worker thread.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._refresh_lock = None
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(rollup_months)")}
+            if "num_found" not in columns:  # stores created before num_found was tracked
+                conn.execute("ALTER TABLE rollup_months ADD COLUMN num_found INTEGER")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def try_lock_refresh(self):
+        """
+        Claim the background refresh for this process. When several worker processes
+        share the store only the first one refreshes it; the lock is released on exit.
+        """
+        if fcntl is None or self._refresh_lock is not None:
+            return True
+        lock_file = open(self.path + ".lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._refresh_lock = lock_file
+        return True
+
+    def replace_month(self, dimension, month, buckets, num_found=None):
+        """
+        Store one month of Solr terms buckets (with gaus / cpcs sub-facets)
+        and the month's document count they were computed from.
+        """
+        counts, gaus, cpcs = [], [], []
+        for b in buckets:
+            value = encode_value(b["val"])
+            counts.append((dimension, value, month, b["count"]))
+            for g in b.get("gaus", {}).get("buckets", []):
+                gaus.append((dimension, value, month, encode_value(g["val"]), g["count"]))
+            for c in b.get("cpcs", {}).get("buckets", []):
+                cpcs.append((dimension, value, month, encode_value(c["val"]), c["count"]))
+
+        with closing(self._connect()) as conn, conn:
+            for table in ("rollup_counts", "rollup_gau", "rollup_cpc"):
+                conn.execute(
+                    f"DELETE FROM {table} WHERE dimension = ? AND month = ?",
+                    (dimension, month),
+                )
+            conn.executemany("INSERT INTO rollup_counts VALUES (?, ?, ?, ?)", counts)
+            conn.executemany("INSERT INTO rollup_gau VALUES (?, ?, ?, ?, ?)", gaus)
+            conn.executemany("INSERT INTO rollup_cpc VALUES (?, ?, ?, ?, ?)", cpcs)
+            conn.execute(
+                "INSERT OR REPLACE INTO rollup_months VALUES (?, ?, ?, ?)",
+                (dimension, month, time.time(), num_found),
+            )
+
+    def refreshed_months(self, dimension):
+        """
+        {month: (refreshed_at, num_found)} for every month already stored for a dimension.
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT month, refreshed_at, num_found FROM rollup_months WHERE dimension = ?",
+                (dimension,),
+            ).fetchall()
+        return {month: (refreshed_at, num_found) for month, refreshed_at, num_found in rows}
+
+    def clear(self):
+        """
+        Drop every stored month, e.g. after a Solr re-index. Range statistics are answered
+        live from Solr until the background refresh has filled the months again.
+        """
+        with closing(self._connect()) as conn, conn:
+            (months,) = conn.execute("SELECT COUNT(*) FROM rollup_months").fetchone()
+            for table in ROLLUP_TABLES:
+                conn.execute(f"DELETE FROM {table}")
+        return months
+
+    def covers(self, dimension, first_month, last_month, expected):
+        with closing(self._connect()) as conn:
+            (stored,) = conn.execute(
+                "SELECT COUNT(*) FROM rollup_months "
+                "WHERE dimension = ? AND month BETWEEN ? AND ?",
+                (dimension, first_month, last_month),
+            ).fetchone()
+        return stored == expected
+
+    def totals(self, dimension, first_month, last_month):
+        """
+        {encoded value: document count} summed over the month range.
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT value, SUM(count) FROM rollup_counts "
+                "WHERE dimension = ? AND month BETWEEN ? AND ? GROUP BY value",
+                (dimension, first_month, last_month),
+            ).fetchall()
+        return dict(rows)
+
+    def breakdown(self, kind, dimension, values, first_month, last_month):
+        """
+        {encoded value: {encoded gau|cpc: count}} summed over the month range.
+        """
+        table = BREAKDOWN_TABLES[kind]
+        result = {v: {} for v in values}
+        if not values:
+            return result
+        placeholders = ",".join("?" for _ in values)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT value, {kind}, SUM(count) FROM {table} "
+                f"WHERE dimension = ? AND month BETWEEN ? AND ? AND value IN ({placeholders}) "
+                f"GROUP BY value, {kind}",
+                (dimension, first_month, last_month, *values),
+            ).fetchall()
+        for value, key, count in rows:
+            result[value][key] = count
+        return result
+
+
+def month_facet(field):
+    return {
+        "groups": {
+            "type": "terms",
+            "field": field,
+            "limit": -1,
+            "facet": {
+                "gaus": {"type": "terms", "field": "gau", "limit": -1},
+                "cpcs": {"type": "terms", "field": "cpc_classification", "limit": -1},
+            },
+        }
+    }
+
+
+async def refresh_month(solr, store, dimension, field, month):
+    """
+    Recompute one month of one dimension from Solr.
+    """
+    first_day = date.fromisoformat(f"{month}-01")
+    month_start, month_end = month_bounds(first_day)
+    params = {
+        "q": "*:*",
+        "fq": date_window_fq(month_start.isoformat(), month_end.isoformat()),
+        "rows": 0,
+        "wt": "json",
+        "json.facet": json.dumps(month_facet(field)),
+    }
+    response = await solr.get("/select", params=params, query_class="heavy_stats")
+    data = decode_json(response)
+    buckets = data.get("facets", {}).get("groups", {}).get("buckets", [])
+    num_found = data.get("response", {}).get("numFound")
+    await run_in_threadpool(store.replace_month, dimension, month, buckets, num_found)
+
+
+async def month_counts(solr, months):
+    """
+    {month: document count} for every month, from one Solr request with a query facet
+    per month. POSTed: a few hundred month windows do not fit in a URL.
+    """
+    facets = {}
+    for month in months:
+        month_start, month_end = month_bounds(date.fromisoformat(f"{month}-01"))
+        facets[f"m{month}"] = {
+            "type": "query",
+            "q": date_window_fq(month_start.isoformat(), month_end.isoformat()),
+        }
+    data = {"q": "*:*", "rows": 0, "wt": "json", "json.facet": json.dumps(facets)}
+    response = await solr.post("/select", data=data, query_class="stats")
+    result = decode_json(response).get("facets", {})
+    return {month: result.get(f"m{month}", {}).get("count") for month in months}
+
+
+async def fill_rollups(solr, store, dimensions, start_month, recent_months=2, max_age=86400):
+    """
+    Fill missing complete months, re-fill any month whose document count in Solr no longer
+    matches the count it was computed from (documents added, removed or re-dated), and
+    re-fill the most recent ones once they are max_age old to pick up edited fields.
+    The current (incomplete) month is never stored; it is answered live from Solr.
+    """
+    last_complete = date.today().replace(day=1) - timedelta(days=1)
+    months = [month_key(m) for m in iter_months(date.fromisoformat(f"{start_month}-01"), last_complete)]
+    recent = set(months[-recent_months:]) if recent_months else set()
+    now = time.time()
+    counts = await month_counts(solr, months) if months else {}
+
+    refreshed = 0
+    for dimension, field in dimensions.items():
+        stored = await run_in_threadpool(store.refreshed_months, dimension)
+        for month in months:
+            refreshed_at, num_found = stored.get(month, (None, None))
+            if (
+                refreshed_at is None
+                or num_found != counts[month]
+                or (month in recent and now - refreshed_at > max_age)
+            ):
+                await refresh_month(solr, store, dimension, field, month)
+                refreshed += 1
+    return refreshed
+
+
+def _sorted_buckets(counts, descending):
+    """
+    Solr-style bucket list ordered by count, then value.
+    """
+    items = sorted(counts.items(), key=lambda kv: kv[0])
+    items.sort(key=lambda kv: kv[1], reverse=descending)
+    return [{"val": json.loads(k), "count": c} for k, c in items]
+
+
+async def rollup_group_buckets(solr, store, dimension, field, from_date, to_date, limit, sort_order):
+    """
+    Answer a grouped date-range facet from rollups, querying Solr only for partial edge months.
+    Returns Solr-format terms buckets (with gaus / cpcs), or None when the rollups do not
+    cover the whole months of the range. A negative limit returns every value, as in Solr.
+    """
+    full_months, edges = split_range(from_date, to_date)
+    if not full_months:
+        return None
+    first, last = full_months[0], full_months[-1]
+    if not await run_in_threadpool(store.covers, dimension, first, last, len(full_months)):
+        return None
+
+    descending = sort_order != "asc"
+    edge_fq = " OR ".join(date_window_fq(a, b) for a, b in edges)
+
+    totals = await run_in_threadpool(store.totals, dimension, first, last)
+    if edges:
+        params = {
+            "q": "*:*",
+            "fq": edge_fq,
+            "rows": 0,
+            "wt": "json",
+            "json.facet": json.dumps({"groups": {"type": "terms", "field": field, "limit": -1}}),
+        }
+        response = await solr.get("/select", params=params, query_class="stats")
+        for b in decode_json(response).get("facets", {}).get("groups", {}).get("buckets", []):
+            key = encode_value(b["val"])
+            totals[key] = totals.get(key, 0) + b["count"]
+
+    top = _sorted_buckets(totals, descending)
+    if limit >= 0:
+        top = top[:limit]
+    values = [encode_value(b["val"]) for b in top]
+
+    gaus = await run_in_threadpool(store.breakdown, "gau", dimension, values, first, last)
+    cpcs = await run_in_threadpool(store.breakdown, "cpc", dimension, values, first, last)
+    if edges and values:
+        fq = [edge_fq]
+        if limit >= 0:
+            # Unlimited: every value is kept, so the edge facet needs no value filter
+            fq.append(f"{field}:(" + " OR ".join(solr_term(b["val"]) for b in top) + ")")
+        params = {
+            "q": "*:*",
+            "fq": fq,
+            "rows": 0,
+            "wt": "json",
+            "json.facet": json.dumps(month_facet(field)),
+        }
+        response = await solr.get("/select", params=params, query_class="stats")
+        for b in decode_json(response).get("facets", {}).get("groups", {}).get("buckets", []):
+            key = encode_value(b["val"])
+            if key not in gaus:
+                continue
+            for kind, merged in (("gaus", gaus[key]), ("cpcs", cpcs[key])):
+                for sub in b.get(kind, {}).get("buckets", []):
+                    sub_key = encode_value(sub["val"])
+                    merged[sub_key] = merged.get(sub_key, 0) + sub["count"]
+
+    for bucket, key in zip(top, values):
+        bucket["gaus"] = {"buckets": _sorted_buckets(gaus[key], descending)}
+        bucket["cpcs"] = {"buckets": _sorted_buckets(cpcs[key], True)[:20]}
+    return top
@@ -0,0 +1,142 @@
+"""
+Production server: N uvicorn worker processes sharing one listening socket
+SIGHUP reloads the application code with a rolling restart, SIGTERM / SIGINT stop
+the workers gracefully, and a worker that dies is replaced
+Usage: python serve.py [--workers N] [--host 0.0.0.0] [--port 8000]
+"""
+import argparse
+import logging
+import os
+import signal
+import threading
+import time
+
+import uvicorn
+from uvicorn._subprocess import get_subprocess
+
+APP = "app_advanced:app"
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def default_workers():
+    """
+    WEB_CONCURRENCY when set, else one worker per CPU.
+    """
+    return int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1)
+
+
+class Supervisor:
+    """
+    Like uvicorn's --workers supervisor, plus worker replacement and SIGHUP reloads.
+    """
+
+    def __init__(self, config, workers, reload_delay=2.0, graceful_timeout=30.0):
+        self.config = config
+        self.workers = workers
+        # Seconds a new worker gets to start serving before an old one is stopped
+        self.reload_delay = reload_delay
+        self.graceful_timeout = graceful_timeout
+        self.processes = []
+        self.sockets = []
+        self.should_exit = threading.Event()
+        self.should_reload = threading.Event()
+
+    def spawn(self):
+        server = uvicorn.Server(config=self.config)
+        process = get_subprocess(config=self.config, target=server.run, sockets=self.sockets)
+        process.start()
+        return process
+
+    def stop(self, process):
+        # SIGTERM: the worker stops accepting and finishes in-flight requests
+        process.terminate()
+        process.join(self.graceful_timeout + 5)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    def run(self):
+        self.sockets = [self.config.bind_socket()]
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: self.should_exit.set())
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, lambda *_: self.should_reload.set())
+
+        logger.info("Started supervisor [%s] with %s workers", os.getpid(), self.workers)
+        self.processes = [self.spawn() for _ in range(self.workers)]
+
+        while not self.should_exit.wait(0.5):
+            if self.should_reload.is_set():
+                self.should_reload.clear()
+                self.rolling_restart()
+            self.replace_dead()
+
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            self.stop(process)
+        logger.info("Stopped supervisor [%s]", os.getpid())
+
+    def replace_dead(self):
+        for process in list(self.processes):
+            if not process.is_alive():
+                logger.warning("Worker [%s] exited with %s; replacing it", process.pid, process.exitcode)
+                self.processes.remove(process)
+                self.processes.append(self.spawn())
+
+    def rolling_restart(self):
+        """
+        Replace workers one at a time so capacity never drops: start a new worker on the
+        new code, give it reload_delay seconds, then stop one old worker.
+        """
+        logger.info("Reloading %s workers", len(self.processes))
+        for old in list(self.processes):
+            new = self.spawn()
+            self.processes.append(new)
+            deadline = time.monotonic() + self.reload_delay
+            while time.monotonic() < deadline and new.is_alive() and not self.should_exit.is_set():
+                time.sleep(0.1)
+            if not new.is_alive():
+                logger.error("New worker exited with %s; keeping the running workers", new.exitcode)
+                self.processes.remove(new)
+                return
+            if self.should_exit.is_set():
+                return
+            self.processes.remove(old)
+            self.stop(old)
+        logger.info("Reload complete")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Patent Search API with several workers")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--graceful-timeout", type=float, default=30.0,
+                        help="seconds a stopping worker gets to finish in-flight requests")
+    parser.add_argument("--reload-delay", type=float, default=2.0,
+                        help="seconds a new worker gets to start before an old one stops")
+    args = parser.parse_args()
+
+    # Workers are separate processes: share the stats cache through SQLite by default
+    if args.workers > 1:
+        os.environ.setdefault("STATS_CACHE_BACKEND", "sqlite")
+
+    config = uvicorn.Config(
+        APP,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+    )
+    Supervisor(
+        config,
+        args.workers,
+        reload_delay=args.reload_delay,
+        graceful_timeout=args.graceful_timeout,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
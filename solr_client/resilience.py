@@ -0,0 +1,192 @@
+"""
+Solr resilience primitives
+Jittered retry schedule, a circuit breaker shared by every query class, and
+per-class admission limits, all used by SolrClient. State is per process.
+"""
+import asyncio
+import random
+import time
+
+import httpx
+
+# Transport failures where the request never reached Solr or the connection was
+# dropped under it (e.g. a stale keep-alive); safe to retry for idempotent requests
+RETRYABLE_ERRORS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.RemoteProtocolError,
+    httpx.ReadError,
+)
+# Proxy / overload statuses worth another attempt
+RETRYABLE_STATUSES = (502, 503, 504)
+
+
+class SolrUnavailableError(Exception):
+    """
+    Solr is failing fast: the circuit breaker is open.
+    """
+
+    def __init__(self, retry_after):
+        super().__init__(f"Solr is unavailable; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class SolrOverloadedError(Exception):
+    """
+    Too many requests of one query class are already running or waiting.
+    """
+
+    def __init__(self, query_class, retry_after=1.0):
+        super().__init__(f"Too many concurrent {query_class} queries; retry shortly")
+        self.query_class = query_class
+        self.retry_after = retry_after
+
+
+class SolrDeadlineError(Exception):
+    """
+    Solr stopped a query at timeAllowed, and partial results are not acceptable.
+    """
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: attempt n waits uniform(0, min(max_delay, base * 2**n)).
+    """
+
+    def __init__(self, attempts=3, base_delay=0.1, max_delay=2.0):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    @staticmethod
+    def retryable(error=None, status=None):
+        if error is not None:
+            return isinstance(error, RETRYABLE_ERRORS)
+        return status in RETRYABLE_STATUSES
+
+
+class CircuitBreaker:
+    """
+    Opens after `failures` consecutive failed requests and fails fast for `reset_timeout`
+    seconds; then lets one probe through (half-open) and closes again if it succeeds.
+    """
+
+    def __init__(self, failures=5, reset_timeout=30.0):
+        self.failure_threshold = failures
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        # When the half-open probe was let through; None while no probe is out
+        self.probe_started = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.probe_started is not None or time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_request(self):
+        """
+        Raise SolrUnavailableError unless a request may go to Solr now.
+        """
+        if self.opened_at is None or self.failure_threshold <= 0:
+            return
+        now = time.monotonic()
+        waited = now - self.opened_at
+        # A probe that never reported back (e.g. its request was cancelled) expires
+        probe_out = self.probe_started is not None and now - self.probe_started < self.reset_timeout
+        if waited < self.reset_timeout or probe_out:
+            raise SolrUnavailableError(max(1.0, self.reset_timeout - waited))
+        self.probe_started = now
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probe_started is not None or self.failures >= self.failure_threshold > 0:
+            self.opened_at = time.monotonic()
+            self.probe_started = None
+
+    @staticmethod
+    def is_failure(error=None, status=None):
+        """
+        Transport errors, timeouts and 5xx count against Solr; 4xx are the caller's fault.
+        A query Solr cut off at timeAllowed (SolrDeadlineError) was answered, so it does
+        not count: one slow heavy_stats class must not open the breaker for every class.
+        """
+        if error is not None:
+            return isinstance(error, httpx.TransportError)
+        return status is not None and status >= 500
+
+
+class Unlimited:
+    """
+    Admission for query classes without a limit.
+    """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+UNLIMITED = Unlimited()
+
+
+class AdmissionLimiter:
+    """
+    At most `limit` requests of a query class in flight; up to `max_waiting` more queue
+    for at most `wait_timeout` seconds, anything beyond is rejected at once.
+    """
+
+    def __init__(self, query_class, limit, max_waiting=0, wait_timeout=5.0):
+        self.query_class = query_class
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = None
+
+    async def __aenter__(self):
+        if self._semaphore is None:
+            # Created on first use so it belongs to the running event loop
+            self._semaphore = asyncio.Semaphore(self.limit)
+        if self._semaphore.locked():
+            if self.waiting >= self.max_waiting:
+                self.rejected += 1
+                raise SolrOverloadedError(self.query_class)
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.wait_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise SolrOverloadedError(self.query_class)
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.active -= 1
+        self._semaphore.release()
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,438 @@
+"""
+Shared Solr HTTP client
+One pooled httpx.AsyncClient per process, created and closed by the app lifespan.
+Every request runs under its query class's deadline (also sent to Solr as
+timeAllowed), admission limit and the shared circuit breaker; GETs are retried
+on transient failures (see resilience.py)
+"""
+import asyncio
+import json
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+from solr_client.resilience import (
+    UNLIMITED,
+    AdmissionLimiter,
+    CircuitBreaker,
+    RetryPolicy,
+    SolrDeadlineError,
+    SolrOverloadedError,
+    SolrUnavailableError,
+)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# Per-endpoint timeouts (seconds), keyed by query class
+DEFAULT_TIMEOUTS = {
+    "lookup": 30.0,
+    "search": 30.0,
+    "stats": 60.0,
+    "heavy_stats": 120.0,
+    "export": 120.0,
+}
+
+# Query classes whose results must be complete: a timeAllowed cut-off raises
+# SolrDeadlineError instead of returning partial facet counts
+STRICT_CLASSES = ("stats", "heavy_stats")
+
+# Default concurrency limits per process; other classes are not limited
+DEFAULT_ADMISSION = {
+    "stats": 8,
+    "heavy_stats": 4,
+}
+
+# Share of a class's deadline given to Solr as timeAllowed, so Solr stops
+# working on a query shortly before we would stop waiting for it
+TIME_ALLOWED_FRACTION = 0.8
+
+PARTIAL_RESULTS_RE = re.compile(rb'"partialResults"\s*:\s*true')
+
+UNIQUE_KEY = "id"
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def decode_json(response):
+    """
+    Decode a Solr response body; orjson when installed, else the standard library.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(response.content)
+    return json.loads(response.content)
+
+
+def params_from_url(url):
+    """
+    Extract the query parameters of a built Solr URL as a list of (key, value) pairs.
+    """
+    return list(httpx.URL(url).params.multi_items())
+
+
+def param_items(params):
+    """
+    Flatten a params dict (list values allowed) or pair list into (key, value) pairs.
+    """
+    items = params.items() if isinstance(params, dict) else params
+    flat = []
+    for key, value in items:
+        if isinstance(value, (list, tuple)):
+            flat.extend((key, v) for v in value)
+        else:
+            flat.append((key, value))
+    return flat
+
+
+def ensure_unique_sort(sort, unique_key=UNIQUE_KEY):
+    """
+    Append the unique key as a tiebreaker so the sort is total (required by cursorMark).
+    """
+    clauses = [c.strip() for c in (sort or "").split(",") if c.strip()]
+    if not any(c.split()[0] == unique_key for c in clauses):
+        clauses.append(f"{unique_key} asc")
+    return ", ".join(clauses)
+
+
+def apply_cursor(params, cursor, unique_key=UNIQUE_KEY):
+    """
+    Rewrite params for one cursorMark page: drop start, enforce the tiebreaker sort.
+    timeAllowed is dropped too; Solr refuses it on cursor requests.
+    """
+    items = param_items(params)
+    sort = ", ".join(str(v) for k, v in items if k == "sort")
+    paged = [(k, v) for k, v in items if k not in ("sort", "start", "cursorMark", "timeAllowed")]
+    paged += [("sort", ensure_unique_sort(sort, unique_key)), ("cursorMark", cursor)]
+    return paged
+
+
+def next_cursor_mark(data, cursor):
+    """
+    The cursor for the following page, or None once the result set is exhausted.
+    """
+    next_cursor = data.get("nextCursorMark")
+    if not next_cursor or next_cursor == cursor:
+        return None
+    return next_cursor
+
+
+class SolrClient:
+    """
+    Pooled, keep-alive Solr client shared by every endpoint.
+    """
+
+    def __init__(
+        self,
+        base_url,
+        max_connections=100,
+        max_keepalive_connections=20,
+        keepalive_expiry=30.0,
+        http2=True,
+        connect_timeout=5.0,
+        timeouts=None,
+        time_allowed_fraction=TIME_ALLOWED_FRACTION,
+        retry=None,
+        breaker=None,
+        admission=None,
+        admission_queue=16,
+        admission_wait=5.0,
+    ):
+        self.base_url = (base_url or "").rstrip("/")
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        # HTTP/2 needs the optional `h2` package; fall back to HTTP/1.1 keep-alive
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.connect_timeout = connect_timeout
+        # Per-class deadline: the whole request, retries included, must finish within it
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.time_allowed_fraction = time_allowed_fraction
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.admission = {
+            query_class: AdmissionLimiter(query_class, limit, admission_queue, admission_wait)
+            for query_class, limit in {**DEFAULT_ADMISSION, **(admission or {})}.items()
+            if limit > 0
+        }
+        # Optional callable(query_class, seconds, status) run after every request
+        self.observer = None
+        self._client = None
+
+    @classmethod
+    def from_env(cls, base_url):
+        """
+        Build a client from SOLR_* environment variables.
+        """
+        return cls(
+            base_url,
+            max_connections=_env_int("SOLR_MAX_CONNECTIONS", 100),
+            max_keepalive_connections=_env_int("SOLR_MAX_KEEPALIVE", 20),
+            keepalive_expiry=_env_float("SOLR_KEEPALIVE_EXPIRY", 30.0),
+            http2=_env_bool("SOLR_HTTP2", True),
+            connect_timeout=_env_float("SOLR_CONNECT_TIMEOUT", 5.0),
+            timeouts={
+                name: _env_float(f"SOLR_TIMEOUT_{name.upper()}", default)
+                for name, default in DEFAULT_TIMEOUTS.items()
+            },
+            time_allowed_fraction=_env_float("SOLR_TIME_ALLOWED_FRACTION", TIME_ALLOWED_FRACTION),
+            retry=RetryPolicy(
+                attempts=_env_int("SOLR_RETRY_ATTEMPTS", 3),
+                base_delay=_env_float("SOLR_RETRY_BASE_DELAY", 0.1),
+                max_delay=_env_float("SOLR_RETRY_MAX_DELAY", 2.0),
+            ),
+            breaker=CircuitBreaker(
+                failures=_env_int("SOLR_BREAKER_FAILURES", 5),
+                reset_timeout=_env_float("SOLR_BREAKER_RESET", 30.0),
+            ),
+            admission={
+                name: _env_int(f"SOLR_MAX_CONCURRENT_{name.upper()}", default)
+                for name, default in DEFAULT_ADMISSION.items()
+            },
+            admission_queue=_env_int("SOLR_ADMISSION_QUEUE", 16),
+            admission_wait=_env_float("SOLR_ADMISSION_WAIT", 5.0),
+        )
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=self.limits,
+                http2=self.http2,
+                timeout=self.timeout_for("search"),
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            raise RuntimeError("SolrClient is not started")
+        return self._client
+
+    def timeout_for(self, query_class, remaining=None):
+        read = self.timeouts.get(query_class, self.timeouts["search"])
+        if remaining is not None:
+            read = max(0.001, min(read, remaining))
+        return httpx.Timeout(read, connect=min(self.connect_timeout, read))
+
+    def time_allowed_ms(self, query_class):
+        """
+        The timeAllowed sent with a query class, or None when disabled.
+        """
+        if not self.time_allowed_fraction:
+            return None
+        timeout = self.timeouts.get(query_class, self.timeouts["search"])
+        return max(1, int(timeout * self.time_allowed_fraction * 1000))
+
+    def with_time_allowed(self, path, params, query_class):
+        """
+        Params with timeAllowed added, unless already set or paging with cursorMark
+        (Solr rejects cursorMark together with timeAllowed).
+        """
+        ms = self.time_allowed_ms(query_class)
+        if ms is None:
+            return params
+        existing = param_items(params) if params else list(httpx.URL(str(path)).params.multi_items())
+        if any(k in ("timeAllowed", "cursorMark") for k, _ in existing):
+            return params
+        if isinstance(params, dict):
+            return {**params, "timeAllowed": ms}
+        # Params given with an absolute URL are merged into its query string
+        return (param_items(params) if params else []) + [("timeAllowed", ms)]
+
+    def admit(self, query_class):
+        limiter = self.admission.get(query_class)
+        return limiter if limiter is not None else UNLIMITED
+
+    def build_url(self, path="/select", params=None):
+        """
+        Build a full Solr URL without executing it (used by /build/* endpoints).
+        """
+        return httpx.URL(f"{self.base_url}{path}", params=params)
+
+    def _observe(self, query_class, seconds, status):
+        if self.observer:
+            self.observer(query_class, seconds, status)
+
+    def _check_breaker(self, query_class):
+        try:
+            self.breaker.before_request()
+        except SolrUnavailableError:
+            self._observe(query_class, 0.0, "circuit_open")
+            raise
+
+    async def _request(self, method, path, query_class, retry=False, **kwargs):
+        """
+        Send one logical request: admission, circuit breaker, then attempts until success,
+        a non-retryable outcome, the retry budget or the class deadline runs out.
+        """
+        try:
+            async with self.admit(query_class):
+                deadline = time.monotonic() + self.timeouts.get(query_class, self.timeouts["search"])
+                attempt = 0
+                while True:
+                    self._check_breaker(query_class)
+                    response, error = await self._attempt(method, path, query_class, deadline, **kwargs)
+                    status = response.status_code if response is not None else None
+                    if CircuitBreaker.is_failure(error, status):
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.record_success()
+
+                    attempt += 1
+                    if retry and attempt < self.retry.attempts and RetryPolicy.retryable(error, status):
+                        delay = self.retry.delay(attempt - 1)
+                        if time.monotonic() + delay < deadline:
+                            await asyncio.sleep(delay)
+                            continue
+                    if error is not None:
+                        raise error
+                    response.raise_for_status()
+                    return response
+        except SolrOverloadedError:
+            self._observe(query_class, 0.0, "overloaded")
+            raise
+
+    async def _attempt(self, method, path, query_class, deadline, **kwargs):
+        """
+        (response, None) or (None or response, error) for a single HTTP attempt.
+        """
+        start = time.perf_counter()
+        status = "error"
+        remaining = deadline - time.monotonic()
+        try:
+            response = await self.client.request(
+                method, path, timeout=self.timeout_for(query_class, remaining), **kwargs
+            )
+            status = response.status_code
+        except httpx.TransportError as e:
+            return None, e
+        finally:
+            self._observe(query_class, time.perf_counter() - start, status)
+        if query_class in STRICT_CLASSES and PARTIAL_RESULTS_RE.search(response.content[:4096]):
+            return response, SolrDeadlineError(
+                f"Solr stopped this {query_class} query at timeAllowed; the counts would be incomplete"
+            )
+        return response, None
+
+    async def get(self, path="/select", params=None, query_class="search"):
+        """
+        GET a Solr path (relative to the base URL) or an absolute Solr URL.
+        Retried with jittered backoff on connection failures and 502/503/504.
+        """
+        params = self.with_time_allowed(path, params, query_class)
+        return await self._request("GET", path, query_class, retry=True, params=params)
+
+    async def post(self, path="/select", data=None, query_class="search"):
+        """
+        POST form-encoded params to a Solr path; for queries too long for a URL.
+        """
+        data = self.with_time_allowed(path, data or {}, query_class)
+        return await self._request("POST", path, query_class, data=data)
+
+    @asynccontextmanager
+    async def stream(self, path="/select", params=None, query_class="search"):
+        """
+        GET a Solr path and yield the response before its body is read (see streaming.py).
+        Not retried: the body may already be partly forwarded when a failure shows up.
+        """
+        params = self.with_time_allowed(path, params, query_class)
+        async with self.admit(query_class):
+            self._check_breaker(query_class)
+            start = time.perf_counter()
+            status = "error"
+            try:
+                async with self.client.stream(
+                    "GET", path, params=params, timeout=self.timeout_for(query_class)
+                ) as response:
+                    status = response.status_code
+                    response.raise_for_status()
+                    yield response
+                self.breaker.record_success()
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                raise
+            except httpx.TransportError:
+                self.breaker.record_failure()
+                raise
+            finally:
+                self._observe(query_class, time.perf_counter() - start, status)
+
+    def resilience_stats(self):
+        """
+        Circuit breaker state and admission limiter occupancy.
+        """
+        return {
+            "breaker": {"state": self.breaker.state, "failures": self.breaker.failures},
+            "admission": {name: limiter.stats() for name, limiter in self.admission.items()},
+        }
+
+    def pool_stats(self):
+        """
+        Connection pool utilization, read from the httpcore pool behind the client.
+        """
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        idle = sum(1 for c in connections if c.is_idle())
+        return {
+            "max": self.limits.max_connections,
+            "open": len(connections),
+            "idle": idle,
+            "active": len(connections) - idle,
+            "waiting": len(getattr(pool, "_requests", [])),
+        }
+
+    async def iter_cursor(self, params, page_size=1000, path="/select", query_class="export"):
+        """
+        Page through a whole result set with cursorMark, yielding one page of docs at a time.
+        Only the current page is held in memory.
+        """
+        base = [(k, v) for k, v in param_items(params) if k != "rows"]
+        base.append(("rows", page_size))
+
+        cursor = "*"
+        while cursor is not None:
+            response = await self.get(
+                path, params=apply_cursor(base, cursor), query_class=query_class
+            )
+            data = decode_json(response)
+            docs = data["response"]["docs"]
+            if docs:
+                yield docs
+            cursor = next_cursor_mark(data, cursor)
@@ -0,0 +1,105 @@
+"""
+Incremental Solr JSON response parsing
+Yields documents one at a time as response bytes arrive, instead of buffering
+the whole body and building the full object tree with response.json()
+"""
+import codecs
+import json
+import re
+
+DOCS_START_RE = re.compile(r'"docs"\s*:\s*\[')
+NUM_FOUND_RE = re.compile(r'"numFound"\s*:\s*(\d+)')
+NEXT_CURSOR_RE = re.compile(r'"nextCursorMark"\s*:\s*"((?:[^"\\]|\\.)*)"')
+WHITESPACE = " \t\r\n"
+
+# Consumed text kept in the buffer before it is compacted
+COMPACT_AT = 64 * 1024
+
+
+class SolrDocStream:
+    """
+    Push parser for a Solr /select JSON response. feed() returns the documents completed
+    by each chunk. numFound is known once the docs array starts, nextCursorMark after close().
+    Key quotes inside JSON strings are always escaped, so the "docs":[ marker cannot
+    be matched inside the echoed request params.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._state = "header"
+        self._tail = []
+        self.num_found = None
+        self.next_cursor_mark = None
+
+    def feed(self, chunk):
+        self._buffer += self._decoder.decode(chunk)
+        docs = []
+        if self._state == "header":
+            self._read_header()
+        if self._state == "docs":
+            self._read_docs(docs)
+        if self._state == "tail":
+            self._tail.append(self._buffer[self._pos:])
+            self._buffer, self._pos = "", 0
+        return docs
+
+    def close(self):
+        """
+        Finish the stream; raises ValueError if the response was truncated or malformed.
+        """
+        self._buffer += self._decoder.decode(b"", final=True)
+        if self._state != "tail":
+            raise ValueError(f"Truncated Solr response (stopped in {self._state})")
+        tail = "".join(self._tail)
+        match = NEXT_CURSOR_RE.search(tail)
+        if match:
+            self.next_cursor_mark = json.loads(f'"{match.group(1)}"')
+
+    def _read_header(self):
+        match = DOCS_START_RE.search(self._buffer)
+        if not match:
+            return
+        found = NUM_FOUND_RE.search(self._buffer, 0, match.start())
+        if found:
+            self.num_found = int(found.group(1))
+        self._pos = match.end()
+        self._state = "docs"
+
+    def _read_docs(self, docs):
+        buffer, pos = self._buffer, self._pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in WHITESPACE + ",":
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == "]":
+                pos += 1
+                self._state = "tail"
+                break
+            try:
+                doc, end = self._json.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # document continues in the next chunk
+            docs.append(doc)
+            pos = end
+
+        if pos > COMPACT_AT or self._state == "tail":
+            self._buffer, self._pos = buffer[pos:], 0
+        else:
+            self._pos = pos
+
+
+async def iter_docs(solr, path="/select", params=None, query_class="search", parser=None):
+    """
+    Stream a Solr query and yield its documents one at a time.
+    Pass a SolrDocStream as parser to read numFound / nextCursorMark.
+    """
+    parser = parser or SolrDocStream()
+    async with solr.stream(path, params=params, query_class=query_class) as response:
+        async for chunk in response.aiter_bytes():
+            for doc in parser.feed(chunk):
+                yield doc
+    parser.close()
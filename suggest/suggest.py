@@ -0,0 +1,278 @@
+"""
+Typeahead suggestions
+In-memory prefix index of distinct field values (examiner, law firm, attorney,
+assignee, GAU) with their document counts, built from paged Solr terms facets.
+Lookups are a bisect into a sorted key array; prefixes whose range is too large
+to scan have their top values precomputed, so every lookup is bounded.
+The same dumps feed the entity resolution indexes (entities.py).
+With several workers only one queries Solr; it writes each dump to a shared
+directory and the other workers build their indexes from those files.
+"""
+import asyncio
+import heapq
+import json
+import os
+import re
+import tempfile
+import time
+import traceback
+from array import array
+from bisect import bisect_left
+
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, every process dumps
+    fcntl = None
+
+from entities.entities import EntityIndex
+from exports.json_stream import dumps_compact
+from solr_client.solr_client import decode_json
+
+# Suggest type -> Solr field
+SUGGEST_FIELDS = {
+    "examiner": "examiner",
+    "lawfirm": "law_firm",
+    "prosecutor": "all_attorney_names",
+    "assignee": "assignee_last",
+    "gau": "gau",
+}
+# Suggest types that also get an EntityIndex for name resolution
+RESOLVE_TYPES = ("examiner", "lawfirm", "prosecutor")
+
+MAX_LIMIT = 20
+# Prefix ranges up to this size are ranked at query time; larger ones are precomputed
+SCAN_LIMIT = 2000
+# Terms facet page size used to dump a field's values
+DUMP_PAGE_SIZE = 50000
+# Seconds between checks for a newer shared dump by workers that do not dump
+DUMP_POLL_INTERVAL = 60.0
+# Sorts after any character that appears in a key
+KEY_END = "\U0010ffff"
+
+WHITESPACE_RE = re.compile(r"\s+")
+WORD_START_RE = re.compile(r"(?<=[\s,.&(/-])(?=\w)")
+
+
+def normalize(text):
+    """
+    Lookup form: casefolded, whitespace collapsed.
+    """
+    return WHITESPACE_RE.sub(" ", str(text).casefold()).strip()
+
+
+class PrefixIndex:
+    """
+    Sorted normalized keys with the value each one points to. Every word start of a
+    value is indexed too, so "smith" finds "john smith". Immutable once built.
+    """
+
+    def __init__(self, items):
+        values, counts = [], array("I")
+        entries = []
+        for value, count in items:
+            position = len(values)
+            values.append(str(value))
+            counts.append(min(int(count), 0xFFFFFFFF))
+            key = normalize(value)
+            starts = [0] + [m.start() for m in WORD_START_RE.finditer(key)]
+            entries.extend((key[s:], position) for s in dict.fromkeys(starts))
+        entries.sort()
+
+        self.values = values
+        self.counts = counts
+        self.keys = [key for key, _ in entries]
+        self.positions = array("I", (position for _, position in entries))
+        self.top = {}
+        self._precompute_top()
+
+    def __len__(self):
+        return len(self.values)
+
+    def _range(self, prefix, lo=0, hi=None):
+        hi = len(self.keys) if hi is None else hi
+        start = bisect_left(self.keys, prefix, lo, hi)
+        end = bisect_left(self.keys, prefix + KEY_END, start, hi)
+        return start, end
+
+    def _rank(self, start, end, limit):
+        """
+        Distinct values of keys[start:end], highest count first.
+        """
+        positions = dict.fromkeys(self.positions[start:end])
+        return heapq.nlargest(limit, positions, key=self.counts.__getitem__)
+
+    def _precompute_top(self):
+        pending = [("", 0, len(self.keys))]
+        while pending:
+            prefix, lo, hi = pending.pop()
+            if hi - lo <= SCAN_LIMIT:
+                continue
+            self.top[prefix] = self._rank(lo, hi, MAX_LIMIT)
+            depth = len(prefix) + 1
+            i = lo
+            while i < hi:
+                if len(self.keys[i]) < depth:
+                    i += 1
+                    continue
+                child = self.keys[i][:depth]
+                _, end = self._range(child, i, hi)
+                pending.append((child, i, end))
+                i = end
+
+    def search(self, prefix, limit=10):
+        """
+        [(value, count)] for values with a word starting with prefix, most frequent first.
+        """
+        prefix = normalize(prefix)
+        limit = max(1, min(limit, MAX_LIMIT))
+        top = self.top.get(prefix)
+        if top is None:
+            start, end = self._range(prefix)
+            top = self._rank(start, end, limit)
+        return [(self.values[p], self.counts[p]) for p in top[:limit]]
+
+
+async def dump_field_values(solr, field, page_size=DUMP_PAGE_SIZE):
+    """
+    Every (value, document count) of a field, paged through a terms facet in index order.
+    """
+    items = []
+    offset = 0
+    while True:
+        params = {
+            "q": "*:*",
+            "rows": 0,
+            "wt": "json",
+            "json.facet": (
+                f'{{"values":{{"type":"terms","field":"{field}","limit":{page_size},'
+                f'"offset":{offset},"sort":"index asc","mincount":1}}}}'
+            ),
+        }
+        response = await solr.get("/select", params=params, query_class="heavy_stats")
+        buckets = decode_json(response).get("facets", {}).get("values", {}).get("buckets", [])
+        items.extend((b["val"], b["count"]) for b in buckets)
+        if len(buckets) < page_size:
+            return items
+        offset += page_size
+
+
+class SuggestService:
+    """
+    One PrefixIndex per suggest type (plus an EntityIndex per RESOLVE_TYPES entry),
+    rebuilt in the background and swapped in whole.
+    The field dumps are shared through files in dump_dir: the process holding the
+    dump lock refreshes them from Solr, every process builds its indexes from them.
+    """
+
+    def __init__(self, solr, fields=None, refresh_interval=6 * 3600.0, page_size=DUMP_PAGE_SIZE,
+                 dump_dir=None, poll_interval=DUMP_POLL_INTERVAL):
+        self.solr = solr
+        self.fields = fields or SUGGEST_FIELDS
+        self.refresh_interval = refresh_interval
+        self.page_size = page_size
+        self.dump_dir = str(dump_dir or os.path.join(tempfile.gettempdir(), "patent_suggest"))
+        self.poll_interval = min(poll_interval, refresh_interval)
+        self.indexes = {}
+        self.entities = {}
+        self.built_at = {}
+        # Modification time of the dump each index was built from
+        self.dumped_at = {}
+        self._dump_lock = None
+        # Optional callable(suggest type, formatted traceback) run when a build fails
+        self.on_error = None
+
+    def ready(self, kind):
+        return kind in self.indexes
+
+    def search(self, kind, prefix, limit=10):
+        return self.indexes[kind].search(prefix, limit)
+
+    def resolver(self, kind):
+        """
+        The EntityIndex of a type, or None until it is built.
+        """
+        return self.entities.get(kind)
+
+    def try_lock_dump(self):
+        """
+        Claim the Solr dumps for this process. When several worker processes share
+        dump_dir only the first one dumps; the lock is released on exit.
+        """
+        if fcntl is None or self._dump_lock is not None:
+            return True
+        os.makedirs(self.dump_dir, exist_ok=True)
+        lock_file = open(os.path.join(self.dump_dir, "dump.lock"), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._dump_lock = lock_file
+        return True
+
+    def _dump_path(self, kind):
+        return os.path.join(self.dump_dir, f"{kind}.json")
+
+    def _dump_mtime(self, kind):
+        try:
+            return os.path.getmtime(self._dump_path(kind))
+        except OSError:
+            return None
+
+    def _write_dump(self, kind, items):
+        os.makedirs(self.dump_dir, exist_ok=True)
+        path = self._dump_path(kind)
+        partial = f"{path}.{os.getpid()}.partial"
+        with open(partial, "wb") as f:
+            f.write(dumps_compact(items))
+        os.replace(partial, path)
+        return os.path.getmtime(path)
+
+    def _read_dump(self, kind):
+        path = self._dump_path(kind)
+        mtime = os.path.getmtime(path)
+        with open(path, "rb") as f:
+            return [tuple(item) for item in json.loads(f.read())], mtime
+
+    async def build(self, kind, dump=True):
+        """
+        Rebuild the indexes of a type when its shared dump has changed. With dump=True
+        a dump older than refresh_interval (or a missing one) is first refreshed from Solr.
+        """
+        mtime = await run_in_threadpool(self._dump_mtime, kind)
+        if dump and (mtime is None or time.time() - mtime >= self.refresh_interval):
+            items = await dump_field_values(self.solr, self.fields[kind], self.page_size)
+            mtime = await run_in_threadpool(self._write_dump, kind, items)
+        elif mtime is None or mtime == self.dumped_at.get(kind):
+            return
+        else:
+            items, mtime = await run_in_threadpool(self._read_dump, kind)
+        self.indexes[kind] = await run_in_threadpool(PrefixIndex, items)
+        if kind in RESOLVE_TYPES:
+            self.entities[kind] = await run_in_threadpool(EntityIndex, items)
+        self.built_at[kind] = time.time()
+        self.dumped_at[kind] = mtime
+
+    async def refresh_loop(self):
+        """
+        Keep the indexes current. The worker holding the dump lock queries Solr once
+        the dumps are refresh_interval old; the others pick up each new dump within
+        poll_interval, retry the lock, and take over if that worker exits.
+        """
+        while True:
+            dump = await run_in_threadpool(self.try_lock_dump)
+            for kind in self.fields:
+                try:
+                    await self.build(kind, dump)
+                except Exception:
+                    if self.on_error:
+                        self.on_error(kind, traceback.format_exc())
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self):
+        return {
+            kind: {"values": len(index), "keys": len(index.keys), "built_at": self.built_at[kind]}
+            for kind, index in self.indexes.items()
+        }
@@ -0,0 +1,23 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app_advanced
+
+
+@pytest.fixture
+def client():
+    return TestClient(app_advanced.app)
+
+
+def test_flush_refused_without_configured_token(client, monkeypatch):
+    monkeypatch.setattr(app_advanced, "ADMIN_TOKEN", None)
+    assert client.post("/admin/cache/flush").status_code == 403
+    assert client.post("/admin/cache/flush", headers={"X-Admin-Token": ""}).status_code == 403
+
+
+def test_flush_needs_matching_token(client, monkeypatch):
+    monkeypatch.setattr(app_advanced, "ADMIN_TOKEN", "s3cret")
+    assert client.post("/admin/cache/flush", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    response = client.post("/admin/cache/flush", headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 200
+    assert "flushed" in response.json()
@@ -0,0 +1,61 @@
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app_advanced import app, error_response
+from solr_client.resilience import SolrDeadlineError, SolrOverloadedError
+
+
+@pytest.fixture
+def client():
+    # No lifespan: these requests must be answered before Solr is ever contacted
+    return TestClient(app)
+
+
+def test_error_response_passes_http_exceptions_through():
+    error = HTTPException(status_code=400, detail="No results to convert")
+    assert error_response(error) is error
+
+
+@pytest.mark.parametrize(
+    "error, status",
+    [
+        (SolrOverloadedError("stats", retry_after=2.0), 503),
+        (httpx.ConnectError("refused"), 503),
+        (SolrDeadlineError("cut off"), 504),
+        (httpx.ReadTimeout("slow"), 504),
+        (RuntimeError("boom"), 500),
+    ],
+)
+def test_error_response_status(error, status):
+    assert error_response(error).status_code == status
+
+
+def test_overload_sets_retry_after():
+    response = error_response(SolrOverloadedError("stats", retry_after=3.0))
+    assert response.headers == {"Retry-After": "3"}
+
+
+@pytest.mark.parametrize("path", ["/download/json/query", "/download/excel/query"])
+def test_export_without_query_is_400(client, path):
+    response = client.post(path, json={})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Provide solr_query_url or params"
+
+
+def test_legacy_excel_download_without_results_is_400(client):
+    response = client.post("/download/excel", json={})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "No results to convert"
+
+
+
+@pytest.mark.parametrize(
+    "extra",
+    [{"page_size": 0}, {"page_size": 1_000_000}, {"max_rows": 0}, {"max_rows": -5}],
+)
+def test_export_bounds(client, extra):
+    body = {"params": {"q": "*:*"}, **extra}
+    assert client.post("/download/json/query", json=body).status_code == 422
+    assert client.post("/export/jobs", json=body).status_code == 422
@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from exports.arrow import _column, docs_to_batch, export_schema, iter_query_arrow  # noqa: E402
+
+
+def test_timestamp_accepts_whole_and_fractional_seconds():
+    docs = [
+        {"app_date": "2020-01-02T03:04:05Z"},
+        {"app_date": "2020-01-02T03:04:05.123Z"},
+        {},
+    ]
+    column = _column(docs, "app_date", "timestamp")
+    assert column.type == pa.timestamp("ms", tz="UTC")
+    assert column.to_pylist() == [
+        datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        datetime(2020, 1, 2, 3, 4, 5, 123000, tzinfo=timezone.utc),
+        None,
+    ]
+
+
+def test_list_wraps_bare_values():
+    docs = [{"gau": ["1600", 1700]}, {"gau": "2100"}, {}]
+    column = _column(docs, "gau", "list")
+    assert column.type == pa.list_(pa.string())
+    assert column.to_pylist() == [["1600", "1700"], ["2100"], None]
+
+
+def test_int32_from_strings():
+    column = _column([{"year": "2020"}, {"year": 2021}, {}], "year", "int32")
+    assert column.type == pa.int32()
+    assert column.to_pylist() == [2020, 2021, None]
+
+
+def test_string_flattens_other_values():
+    docs = [{"f": "a"}, {"f": ["b", "c"]}, {"f": 3}, {"f": {"k": 1}}, {}]
+    column = _column(docs, "f", "string")
+    assert column.to_pylist() == ["a", "b, c", "3", '{"k": 1}', None]
+
+
+def test_batch_follows_schema_order():
+    schema = export_schema(["id", "app_date", "gau"])
+    batch = docs_to_batch([{"id": "1", "gau": "1600", "app_date": "2020-01-02T00:00:00Z"}], schema)
+    assert batch.schema == schema
+    assert batch.column(2).to_pylist() == [["1600"]]
+
+
+class PagedSolr:
+    def __init__(self, pages):
+        self.pages = pages
+
+    async def iter_cursor(self, params, page_size=1000):
+        for page in self.pages:
+            yield page
+
+
+def test_arrow_stream_round_trip():
+    async def collect():
+        pages = [[{"id": str(i), "gau": "1600"} for i in range(start, start + 3)] for start in (0, 3)]
+        chunks = iter_query_arrow(PagedSolr(pages), [], ["id", "gau"], max_rows=5)
+        return b"".join([chunk async for chunk in chunks])
+
+    table = pa.ipc.open_stream(asyncio.run(collect())).read_all()
+    assert table.column("id").to_pylist() == ["0", "1", "2", "3", "4"]
+    assert table.column("gau").to_pylist() == [["1600"]] * 5
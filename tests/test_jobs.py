@@ -0,0 +1,39 @@
+import pytest
+
+from export_jobs.jobs import parse_byte_range
+
+
+def test_no_header():
+    assert parse_byte_range(None, 100) is None
+    assert parse_byte_range("", 100) is None
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("bytes=0-9", (0, 9)),
+        ("bytes=10-", (10, 99)),
+        ("bytes=-10", (90, 99)),
+        ("bytes=-500", (0, 99)),
+        ("bytes=90-500", (90, 99)),
+        ("Bytes = 5-5", (5, 5)),
+    ],
+)
+def test_satisfiable(header, expected):
+    assert parse_byte_range(header, 100) == expected
+
+
+@pytest.mark.parametrize(
+    "header",
+    [
+        "bytes=100-",
+        "bytes=20-10",
+        "bytes=-0",
+        "bytes=0-1,5-6",
+        "items=0-9",
+        "bytes=a-b",
+    ],
+)
+def test_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_byte_range(header, 100)
@@ -0,0 +1,80 @@
+import pytest
+
+from query_proxy.proxy import QueryPolicy, UnsafeQueryError
+
+BASE = "http://solr.internal:8983/solr/patents"
+
+
+@pytest.fixture
+def policy():
+    return QueryPolicy(BASE, max_rows=100, max_start=1000, default_fl="id,title", time_allowed_ms=5000)
+
+
+def test_canonical_params(policy):
+    path, params = policy.normalize(f"{BASE}/select?rows=5&q=examiner:smith&wt=xml&indent=true")
+    assert path == "/select"
+    assert params == [
+        ("fl", "id,title"),
+        ("q", "examiner:smith"),
+        ("rows", "5"),
+        ("timeAllowed", "5000"),
+        ("wt", "json"),
+    ]
+
+
+def test_param_order_does_not_matter(policy):
+    a = policy.normalize(f"{BASE}/select?q=*:*&fq=gau:1600&fq=year:2020&rows=10")
+    b = policy.normalize(f"{BASE}/select?rows=10&fq=year:2020&q=*:*&fq=gau:1600")
+    assert a == b
+
+
+def test_limits(policy):
+    _, params = policy.normalize(f"{BASE}/select?q=*:*&rows=100000&start=-3&timeAllowed=60000&fl=*")
+    params = dict(params)
+    assert params["rows"] == "100"
+    assert params["start"] == "0"
+    assert params["timeAllowed"] == "5000"
+    assert params["fl"] == "id,title"
+
+
+def test_relative_url(policy):
+    assert policy.normalize("/select?q=*:*")[0] == "/select"
+
+
+def test_start_past_limit(policy):
+    with pytest.raises(UnsafeQueryError, match="cursor"):
+        policy.normalize(f"{BASE}/select?q=*:*&start=5000")
+
+
+def test_cursor_drops_start_and_time_allowed(policy):
+    _, params = policy.normalize(f"{BASE}/select?q=*:*&start=5000&cursorMark=*&timeAllowed=10")
+    keys = [k for k, _ in params]
+    assert "start" not in keys
+    assert "timeAllowed" not in keys
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "http://evil.example:8983/solr/patents/select?q=*:*",
+        "https://solr.internal:8983/solr/patents/select?q=*:*",
+        "http://solr.internal:8984/solr/patents/select?q=*:*",
+        "http://solr.internal:8983/solr/other/select?q=*:*",
+        f"{BASE}/update?commit=true",
+        f"{BASE}/select?q=*:*&shards=evil:8983/solr",
+        f"{BASE}/select?q=*:*&qt=/update",
+        f"{BASE}/select?q=*:*&stream.url=http://evil.example/",
+        f"{BASE}/select?q=*:*&rows=ten",
+    ],
+)
+def test_refused(policy, url):
+    with pytest.raises(UnsafeQueryError):
+        policy.normalize(url)
+
+
+def test_check_params_accepts_dicts_and_pairs():
+    assert QueryPolicy.check_params({"q": "*:*", "fq": ["a", "b"]}) == [
+        ("q", "*:*"), ("fq", "a"), ("fq", "b"),
+    ]
+    with pytest.raises(UnsafeQueryError, match="shards"):
+        QueryPolicy.check_params([("q", "*:*"), ("shards", "x")])
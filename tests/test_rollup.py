@@ -0,0 +1,126 @@
+import asyncio
+import json
+from datetime import date, timedelta
+
+import httpx
+
+from rollup.rollup import RollupStore, fill_rollups, month_key, rollup_group_buckets, split_range
+
+
+def test_whole_months_only():
+    assert split_range("2023-01-01", "2023-03-31") == (["2023-01", "2023-02", "2023-03"], [])
+
+
+def test_partial_edges():
+    months, edges = split_range("2023-01-15", "2023-04-10")
+    assert months == ["2023-02", "2023-03"]
+    assert edges == [("2023-01-15", "2023-01-31"), ("2023-04-01", "2023-04-10")]
+
+
+def test_range_inside_one_month():
+    assert split_range("2023-05-02", "2023-05-20") == ([], [("2023-05-02", "2023-05-20")])
+
+
+def test_leap_february_is_whole():
+    assert split_range("2024-02-01", "2024-02-29") == (["2024-02"], [])
+    assert split_range("2023-02-01", "2023-02-28") == (["2023-02"], [])
+
+
+def test_across_year_end():
+    months, edges = split_range("2022-12-01", "2023-01-31")
+    assert months == ["2022-12", "2023-01"]
+    assert edges == []
+
+
+def test_single_day():
+    assert split_range("2023-06-30", "2023-06-30") == ([], [("2023-06-30", "2023-06-30")])
+
+
+class FakeSolr:
+    """
+    Month counts from `counts` (default 5); records the months rebuilt.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.refreshed = []
+
+    async def post(self, path, data=None, query_class="search"):
+        facets = json.loads(data["json.facet"])
+        return httpx.Response(200, json={
+            "facets": {name: {"count": self.counts.get(name[1:], 5)} for name in facets}
+        })
+
+    async def get(self, path, params=None, query_class="search"):
+        month = params["fq"][len("app_date:["):][:7]
+        self.refreshed.append(month)
+        return httpx.Response(200, json={
+            "response": {"numFound": self.counts.get(month, 5)},
+            "facets": {"groups": {"buckets": [{"val": "smith", "count": 1}]}},
+        })
+
+
+def test_fill_rollups_refills_changed_months(tmp_path):
+    solr = FakeSolr()
+    store = RollupStore(tmp_path / "rollup.sqlite3")
+    dimensions = {"examiner": "examiner"}
+    start = month_key(date.today().replace(day=1) - timedelta(days=100))
+
+    filled = asyncio.run(fill_rollups(solr, store, dimensions, start))
+    assert filled == len(solr.refreshed) > 0
+    assert asyncio.run(fill_rollups(solr, store, dimensions, start)) == 0
+
+    solr.refreshed.clear()
+    solr.counts[start] = 7
+    assert asyncio.run(fill_rollups(solr, store, dimensions, start)) == 1
+    assert solr.refreshed == [start]
+
+    assert store.clear() == filled
+    assert store.refreshed_months("examiner") == {}
+
+
+class EdgeSolr:
+    """
+    Answers the edge-month facet queries of rollup_group_buckets with one extra value.
+    """
+
+    def __init__(self):
+        self.fqs = []
+
+    async def get(self, path, params=None, query_class="search"):
+        self.fqs.append(params["fq"])
+        bucket = {"val": "d", "count": 4, "gaus": {"buckets": [{"val": "1600", "count": 4}]}}
+        return httpx.Response(200, json={"facets": {"groups": {"buckets": [bucket]}}})
+
+
+def filled_store(tmp_path):
+    store = RollupStore(tmp_path / "rollup.sqlite3")
+    buckets = [{"val": v, "count": c} for v, c in (("a", 3), ("b", 2), ("c", 1))]
+    for month in ("2023-01", "2023-02"):
+        store.replace_month("examiner", month, buckets, num_found=6)
+    return store
+
+
+def group_values(solr, store, to_date, limit):
+    buckets = asyncio.run(rollup_group_buckets(
+        solr, store, "examiner", "examiner", "2023-01-01", to_date, limit, "desc"
+    ))
+    return [(b["val"], b["count"]) for b in buckets]
+
+
+def test_group_limit_matches_solr(tmp_path):
+    store = filled_store(tmp_path)
+    solr = EdgeSolr()
+    assert group_values(solr, store, "2023-02-28", -1) == [("a", 6), ("b", 4), ("c", 2)]
+    assert group_values(solr, store, "2023-02-28", 2) == [("a", 6), ("b", 4)]
+    assert group_values(solr, store, "2023-02-28", 0) == []
+    assert solr.fqs == []
+
+
+def test_unlimited_group_with_edges(tmp_path):
+    store = filled_store(tmp_path)
+    solr = EdgeSolr()
+    values = group_values(solr, store, "2023-03-10", -1)
+    assert values == [("a", 6), ("b", 4), ("d", 4), ("c", 2)]
+    # The edge breakdown query needs no value filter when every value is kept
+    assert solr.fqs[1] == ["app_date:[2023-03-01T00:00:00Z TO 2023-03-10T23:59:59Z]"]
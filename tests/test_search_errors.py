@@ -0,0 +1,40 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app_advanced import app
+
+
+@pytest.fixture
+def client():
+    # No lifespan: planner errors are answered before Solr is ever contacted
+    return TestClient(app)
+
+
+@pytest.mark.parametrize(
+    "path, body, detail",
+    [
+        ("/search/examiner", {"examiners": [" "], "search_type": "count"}, "No valid examiner names provided"),
+        ("/search/prosecutor", {"prosecutors": [], "search_type": "count"}, "No valid prosecutor names provided"),
+        ("/search/gau", {"gaus": [""]}, "No valid GAUs provided"),
+        ("/search/patent", {"patent_ids": [" "]}, "No valid patent IDs provided"),
+        ("/build/examiner-query", {"examiners": [""], "search_type": "count"}, "No valid examiner names provided"),
+        ("/build/lawfirm-query", {"lawfirms": [""], "search_type": "count"}, "No valid lawfirm names provided"),
+        ("/build/attorney-query", {"attorneys": [""]}, "No valid attorney names provided"),
+        ("/build/gau-query", {"gaus": []}, "No valid GAUs provided"),
+        ("/build/patent-query", {"patent_ids": [""]}, "No valid patent IDs provided"),
+    ],
+)
+def test_planner_errors_are_400(client, path, body, detail):
+    response = client.post(path, json=body)
+    assert response.status_code == 400
+    assert response.json()["detail"] == detail
+
+
+def test_batch_reports_sub_query_errors(client):
+    body = {"queries": [{"type": "patent", "values": []}, {"key": "g", "type": "gau", "values": [""]}]}
+    response = client.post("/search/batch", json=body)
+    assert response.status_code == 200
+    assert response.json()["results"] == [
+        {"key": "patent", "type": "patent", "error": "No valid patent IDs provided", "status": 400},
+        {"key": "g", "type": "gau", "error": "No valid GAUs provided", "status": 400},
+    ]
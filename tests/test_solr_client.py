@@ -0,0 +1,23 @@
+from solr_client.solr_client import apply_cursor, ensure_unique_sort, next_cursor_mark
+
+
+def test_apply_cursor_rewrites_paging_params():
+    params = [
+        ("q", "*:*"), ("start", "20"), ("timeAllowed", "15000"),
+        ("sort", "app_date desc"), ("cursorMark", "old"), ("rows", "50"),
+    ]
+    assert apply_cursor(params, "AoE") == [
+        ("q", "*:*"), ("rows", "50"), ("sort", "app_date desc, id asc"), ("cursorMark", "AoE"),
+    ]
+
+
+def test_unique_sort_is_added_once():
+    assert ensure_unique_sort("") == "id asc"
+    assert ensure_unique_sort("id desc") == "id desc"
+    assert ensure_unique_sort("app_date desc,id asc") == "app_date desc, id asc"
+
+
+def test_next_cursor_mark_stops_when_unchanged():
+    assert next_cursor_mark({"nextCursorMark": "B"}, "A") == "B"
+    assert next_cursor_mark({"nextCursorMark": "A"}, "A") is None
+    assert next_cursor_mark({}, "*") is None
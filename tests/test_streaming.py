@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from solr_client.streaming import SolrDocStream
+
+RESPONSE = {
+    "responseHeader": {"status": 0, "params": {"q": 'title:"\\"docs\\":["'}},
+    "response": {
+        "numFound": 3,
+        "start": 0,
+        "docs": [
+            {"id": "1", "title": "Café ☃ ]}"},
+            {"id": "2", "gau": ["1600", "1700"]},
+            {"id": "3", "nested": {"a": [1, {"b": "]"}]}},
+        ],
+    },
+    "nextCursorMark": "AoE/\"3\"",
+}
+BODY = json.dumps(RESPONSE, ensure_ascii=False).encode("utf-8")
+
+
+def parse(chunk_size):
+    parser = SolrDocStream()
+    docs = []
+    for i in range(0, len(BODY), chunk_size):
+        docs.extend(parser.feed(BODY[i:i + chunk_size]))
+    parser.close()
+    return parser, docs
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, len(BODY)])
+def test_docs_in_order_for_any_chunking(chunk_size):
+    parser, docs = parse(chunk_size)
+    assert docs == RESPONSE["response"]["docs"]
+    assert parser.num_found == 3
+    assert parser.next_cursor_mark == 'AoE/"3"'
+
+
+def test_docs_marker_inside_params_is_ignored():
+    parser = SolrDocStream()
+    head = BODY[: BODY.index(b'"response"')]
+    assert parser.feed(head) == []
+    assert parser.num_found is None
+
+
+def test_docs_are_returned_as_soon_as_complete():
+    parser = SolrDocStream()
+    first_end = BODY.index(b'{"id": "2"')
+    assert [d["id"] for d in parser.feed(BODY[:first_end])] == ["1"]
+    assert parser.num_found == 3
+
+
+def test_empty_result():
+    parser = SolrDocStream()
+    assert parser.feed(b'{"response":{"numFound":0,"start":0,"docs":[]}}') == []
+    parser.close()
+    assert parser.num_found == 0
+    assert parser.next_cursor_mark is None
+
+
+def test_truncated_response_raises():
+    parser = SolrDocStream()
+    parser.feed(BODY[: BODY.index(b'{"id": "3"') + 5])
+    with pytest.raises(ValueError):
+        parser.close()
@@ -0,0 +1,47 @@
+import asyncio
+
+import httpx
+
+from suggest.suggest import SuggestService
+
+FIELDS = {"examiner": "examiner", "gau": "gau"}
+
+
+class TermsSolr:
+    """
+    Answers terms facet dumps with fixed values; counts the requests.
+    """
+
+    def __init__(self):
+        self.requests = 0
+
+    async def get(self, path, params=None, query_class="search"):
+        self.requests += 1
+        buckets = [{"val": "SMITH, JOHN", "count": 3}, {"val": "SMYTHE, JANE", "count": 1}]
+        return httpx.Response(200, json={"facets": {"values": {"buckets": buckets}}})
+
+
+def test_only_the_lock_holder_queries_solr(tmp_path):
+    first, second = TermsSolr(), TermsSolr()
+    owner = SuggestService(first, fields=FIELDS, dump_dir=tmp_path)
+    other = SuggestService(second, fields=FIELDS, dump_dir=tmp_path)
+
+    async def build_all(service):
+        dump = service.try_lock_dump()
+        for kind in FIELDS:
+            await service.build(kind, dump)
+        return dump
+
+    assert asyncio.run(build_all(owner)) is True
+    assert asyncio.run(build_all(other)) is False
+    assert first.requests == len(FIELDS)
+    assert second.requests == 0
+    assert other.search("examiner", "sm") == [("SMITH, JOHN", 3), ("SMYTHE, JANE", 1)]
+    assert other.resolver("examiner") is not None
+
+    # A fresh dump is reused, not queried again, and unchanged dumps are not rebuilt
+    built_at = dict(other.built_at)
+    asyncio.run(build_all(owner))
+    asyncio.run(build_all(other))
+    assert first.requests == len(FIELDS)
+    assert other.built_at == built_at
@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from trends.trends import plan_trend
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_top_n_needs_a_positive_limit(limit):
+    with pytest.raises(ValueError, match="limit"):
+        plan_trend("examiner", "2023-01-01", "2023-12-31", limit=limit)
+
+
+def test_explicit_values_ignore_limit():
+    params, periods, values = plan_trend("examiner", "2023-01-01", "2023-03-31", values=["a", " a", "b"], limit=0)
+    assert values == ["a", "b"]
+    assert len(periods) == 3
+    assert set(json.loads(params["json.facet"])) == {"periods", "s0", "s1"}
+
+
+def test_top_n_facet():
+    params, _, values = plan_trend("examiner", "2023-01-01", "2023-12-31", limit=5)
+    assert values is None
+    assert json.loads(params["json.facet"])["top"]["limit"] == 5
+
+
+def test_too_many_cells():
+    with pytest.raises(ValueError, match="too large"):
+        plan_trend("examiner", "2000-01-01", "2023-12-31", interval="day", limit=100)
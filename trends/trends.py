@@ -0,0 +1,167 @@
+"""
+Time-series trends from range facets
+One Solr request returns per-period document counts for several entities: a
+date range facet nested under a query facet per requested value, or under a
+terms facet for the top values. Results are reshaped into a columnar payload
+(one shared period axis, one count array per series) that charts directly.
+"""
+from datetime import date, timedelta
+
+from exports.json_stream import dumps_compact
+from query_planner.planner import STATUS_FILTERS, plan, terms_clause
+from rollup.rollup import date_window_fq
+
+DATE_FIELD = "app_date"
+
+# interval -> Solr date math gap
+INTERVALS = {
+    "day": "+1DAY",
+    "week": "+7DAYS",
+    "month": "+1MONTH",
+    "year": "+1YEAR",
+}
+
+# Cap on periods x series, so a day interval over decades is rejected up front
+MAX_CELLS = 200000
+
+
+def period_start(d, interval):
+    """
+    First day of the period containing d; weeks start on Monday.
+    """
+    if interval == "week":
+        return d - timedelta(days=d.weekday())
+    if interval == "month":
+        return d.replace(day=1)
+    if interval == "year":
+        return d.replace(month=1, day=1)
+    return d
+
+
+def next_period(d, interval):
+    if interval == "day":
+        return d + timedelta(days=1)
+    if interval == "week":
+        return d + timedelta(days=7)
+    if interval == "month":
+        return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return d.replace(year=d.year + 1)
+
+
+def period_starts(from_date, to_date, interval):
+    """
+    Start dates of every period overlapping [from_date, to_date].
+    """
+    current = period_start(from_date, interval)
+    starts = []
+    while current <= to_date:
+        starts.append(current)
+        current = next_period(current, interval)
+    return starts
+
+
+def range_facet(start, end, interval):
+    return {
+        "type": "range",
+        "field": DATE_FIELD,
+        "start": f"{start.isoformat()}T00:00:00Z",
+        "end": f"{end.isoformat()}T00:00:00Z",
+        "gap": INTERVALS[interval],
+    }
+
+
+def plan_trend(field, from_date, to_date, interval="month", values=None, limit=10, status=None):
+    """
+    Params for one trend request. Returns (params, period start dates, series values);
+    series values is None in top-N mode, where Solr picks the `limit` largest values.
+    Raises ValueError for an invalid window or an oversized result.
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"Unknown interval: {interval}")
+    try:
+        start, end = date.fromisoformat(from_date), date.fromisoformat(to_date)
+    except ValueError:
+        raise ValueError("from_date and to_date must be valid YYYY-MM-DD dates")
+    if end < start:
+        raise ValueError("to_date is before from_date")
+
+    periods = period_starts(start, end, interval)
+    # De-duplicated, in request order: series come back in the order they were asked for
+    values = list(dict.fromkeys(v.strip() for v in values or [] if v.strip())) or None
+    if not values and limit < 1:
+        # A terms facet with limit <= 0 would be unbounded (or empty) under the cell cap
+        raise ValueError("limit must be at least 1")
+    series = len(values) if values else limit
+    if len(periods) * (series + 1) > MAX_CELLS:
+        raise ValueError(
+            f"{len(periods)} {interval} periods x {series} series is too large; "
+            "use a coarser interval or a shorter window"
+        )
+
+    periods_facet = range_facet(periods[0], next_period(periods[-1], interval), interval)
+    facet = {"periods": periods_facet}
+    if values:
+        for i, value in enumerate(values):
+            facet[f"s{i}"] = {
+                "type": "query",
+                "q": terms_clause(field, [value]),
+                "facet": {"periods": periods_facet},
+            }
+    else:
+        facet["top"] = {
+            "type": "terms",
+            "field": field,
+            "limit": limit,
+            "sort": "count desc",
+            "facet": {"periods": periods_facet},
+        }
+
+    filters = [date_window_fq(from_date, to_date)]
+    if status:
+        filters.append(STATUS_FILTERS[status])
+    params = plan("*:*", filters, rows=0)
+    params["json.facet"] = dumps_compact(facet).decode()
+    return params, periods, values
+
+
+def period_counts(facet, index):
+    """
+    Counts aligned to the period axis from a nested "periods" range facet.
+    """
+    counts = [0] * len(index)
+    for bucket in facet.get("periods", {}).get("buckets", []):
+        position = index.get(str(bucket["val"])[:10])
+        if position is not None:
+            counts[position] = bucket["count"]
+    return counts
+
+
+def shape_trend(facets, periods, values):
+    """
+    Columnar trend: {"periods": [...], "total": [...], "series": [{"name", "count", "counts"}]}.
+    """
+    index = {p.isoformat(): i for i, p in enumerate(periods)}
+    if values:
+        named = [(value, facets.get(f"s{i}", {})) for i, value in enumerate(values)]
+    else:
+        named = [(b["val"], b) for b in facets.get("top", {}).get("buckets", [])]
+    return {
+        "periods": list(index),
+        "total": period_counts(facets, index),
+        "series": [
+            {"name": name, "count": facet.get("count", 0), "counts": period_counts(facet, index)}
+            for name, facet in named
+        ],
+    }
+
+
+def iter_trend_json(result):
+    """
+    Encode a trend payload one series at a time.
+    """
+    series = result["series"]
+    header = {k: v for k, v in result.items() if k != "series"}
+    yield dumps_compact(header)[:-1] + b',"series":['
+    for i, item in enumerate(series):
+        yield (b"," if i else b"") + dumps_compact(item)
+    yield b"]}"